@@ -1,4 +1,7 @@
 #!/usr/bin/env python3
+import os
+import mmap
+import json
 import socket
 import argparse
 import numpy as np
@@ -11,16 +14,21 @@ Minimal example of a Python driver connecting to i-PI and exchanging energy, for
 
 
 def recv_data(sock, data):
-    """Fetches binary data from i-PI socket."""
-    blen = data.itemsize * data.size
-    buf = np.zeros(blen, np.byte)
+    """Fetches binary data from i-PI socket. Arrays are filled in place,
+    without allocating an intermediate buffer."""
+    if np.isscalar(data):
+        buf = np.zeros(1, data.dtype)
+        recv_data(sock, buf)
+        return buf[0]
 
+    view = memoryview(data).cast("B")
+    blen = len(view)
     bpos = 0
     while bpos < blen:
         timeout = False
         try:
             bpart = 1
-            bpart = sock.recv_into(buf[bpos:], blen - bpos)
+            bpart = sock.recv_into(view[bpos:], blen - bpos)
         except socket.timeout:
             print(" @SOCKET:   Timeout in status recvall, trying again!")
             timeout = True
@@ -28,10 +36,7 @@ def recv_data(sock, data):
         if not timeout and bpart == 0:
             raise RuntimeError("Socket disconnected!")
         bpos += bpart
-    if np.isscalar(data):
-        return np.frombuffer(buf[0:blen], data.dtype)[0]
-    else:
-        return np.frombuffer(buf[0:blen], data.dtype).reshape(data.shape)
+    return data
 
 
 def send_data(sock, data):
@@ -43,6 +48,21 @@ def send_data(sock, data):
     sock.send(buf)
 
 
+def send_buffers(sock, buffers):
+    """Sends a list of buffers (bytes or contiguous arrays) to the i-PI
+    socket using scatter-gather sendmsg calls, so that the arrays are sent
+    without being copied into a single bytestring."""
+
+    views = [memoryview(b).cast("B") for b in buffers]
+    while views:
+        sent = sock.sendmsg(views)
+        while views and sent >= len(views[0]):
+            sent -= len(views[0])
+            views.pop(0)
+        if views and sent > 0:
+            views[0] = views[0][sent:]
+
+
 HDRLEN = 12  # number of characters of the default message strings
 
 
@@ -53,6 +73,51 @@ def Message(mystr):
     return str.ljust(str.upper(mystr), HDRLEN).encode()
 
 
+MESSAGE = {
+    msg: Message(msg)
+    for msg in [
+        "status",
+        "needinit",
+        "havedata",
+        "ready",
+        "init",
+        "posdata",
+        "getforce",
+        "forceready",
+        "exit",
+        "caps",
+        "shminit",
+        "posdatashm",
+        "forceshm",
+        "posdatabatch",
+        "forcebatch",
+    ]
+}
+
+
+def attach_shm(path, nat):
+    """Maps the shared-memory file created by i-PI for a system of nat
+    atoms, returning the mmap object and views to cell, positions,
+    potential, forces and virial (see SharedMemoryBuffer in
+    ipi/interfaces/sockets.py for the layout)."""
+
+    fd = os.open(path, os.O_RDWR)
+    try:
+        shm = mmap.mmap(fd, 8 * (28 + 6 * nat))
+    finally:
+        os.close(fd)
+    data = np.frombuffer(shm, np.float64)
+    n3 = 3 * nat
+    views = {
+        "cell": data[0:9].reshape((3, 3)),
+        "pos": data[18 : 18 + n3].reshape((nat, 3)),
+        "pot": data[18 + n3 : 19 + n3],
+        "force": data[19 + n3 : 19 + 2 * n3].reshape((nat, 3)),
+        "vir": data[19 + 2 * n3 :].reshape((3, 3)),
+    }
+    return shm, views
+
+
 def run_driver(
     unix=False,
     address="",
@@ -60,8 +125,24 @@ def run_driver(
     driver=Dummy_driver(),
     f_verbose=False,
     sockets_prefix="/tmp/ipi_",
+    shmem=False,
+    batch_size=1,
 ):
-    """Minimal socket client for i-PI."""
+    """Minimal socket client for i-PI.
+
+    If shmem is True, the client advertises that it can exchange positions
+    and forces through a shared-memory file, which only works if it runs on
+    the same node as i-PI. The socket then only carries short messages.
+
+    If batch_size is larger than one, the client advertises that it can
+    receive up to batch_size structures in a single POSDATABATCH message,
+    which are passed as lists to the driver so that PES that support
+    batched evaluation can process them together.
+
+    The data are received into buffers that are reused at every step, and
+    the driver is given copies of the cell and positions, so that it can
+    keep references to them.
+    """
 
     # Opens a socket to i-PI
     if unix:
@@ -73,31 +154,53 @@ def run_driver(
         sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         sock.connect((address, port))
 
+    caps = {}
+    if shmem:
+        caps["shmem"] = True
+    if batch_size > 1:
+        caps["batch"] = batch_size
+    if caps:
+        caps = json.dumps(caps).encode()
+        send_buffers(sock, [MESSAGE["caps"], np.array([len(caps)], np.int32), caps])
+    shm = None
+    f_shm = False
+
     f_init = False
     f_data = False
 
-    # initializes structure arrays
+    # initializes structure arrays. these are allocated once, and then
+    # filled in place at each step
     cell = np.zeros((3, 3), float)
     icell = np.zeros((3, 3), float)
     pos = np.zeros(0, float)
+    nat_buf = np.zeros(1, np.int32)
+    # per-structure arrays for batched requests, and the batched results
+    batch_cells, batch_pos = [], []
+    batch_results = None
 
     # initializes return arrays
     pot = 0.0
     force = np.zeros(0, float)
     vir = np.zeros((3, 3), float)
+    # preallocated buffers for the scalars sent back along with the forces
+    potnat_buf = np.zeros(12, np.byte)
+    pot_buf = potnat_buf[:8].view(np.float64)
+    natout_buf = potnat_buf[8:].view(np.int32)
+    xlen_buf = np.zeros(1, np.int32)
+    header = bytearray(HDRLEN)
     while True:  # ah the infinite loop!
-        header = sock.recv(HDRLEN)
+        recv_data(sock, header)
         if f_verbose:
             print("Received ", header)
-        if header == Message("STATUS"):
+        if header == MESSAGE["status"]:
             # responds to a status request
             if not f_init:
-                sock.sendall(Message("NEEDINIT"))
+                sock.sendall(MESSAGE["needinit"])
             elif f_data:
-                sock.sendall(Message("HAVEDATA"))
+                sock.sendall(MESSAGE["havedata"])
             else:
-                sock.sendall(Message("READY"))
-        elif header == Message("INIT"):
+                sock.sendall(MESSAGE["ready"])
+        elif header == MESSAGE["init"]:
             # initialization
             rid = recv_data(sock, np.int32())
             initlen = recv_data(sock, np.int32())
@@ -105,28 +208,81 @@ def run_driver(
             if f_verbose:
                 print(rid, initstr)
             f_init = True  # we are initialized now
-        elif header == Message("POSDATA"):
+        elif header == MESSAGE["posdata"]:
             # receives structural information
-            cell = recv_data(sock, cell)
-            icell = recv_data(
-                sock, icell
-            )  # inverse of the cell. mostly useless legacy stuff
-            nat = recv_data(sock, np.int32())
+            recv_data(sock, cell)
+            recv_data(sock, icell)  # inverse of the cell. mostly useless legacy stuff
+            nat = recv_data(sock, nat_buf)[0]
             if len(pos) == 0:
                 # shapes up the position array
-                pos.resize((nat, 3), refcheck=False)
-                force.resize((nat, 3), refcheck=False)
+                pos = np.zeros((nat, 3), float)
             else:
                 if len(pos) != nat:
                     raise RuntimeError("Atom number changed during i-PI run")
-            pos = recv_data(sock, pos)
+            recv_data(sock, pos)
 
             ##### THIS IS THE TIME TO DO SOMETHING WITH THE POSITIONS!
-            pot, force, vir, extras = driver(cell, pos)
+            pot, force, vir, extras = driver(cell.copy(), pos.copy())
+            batch_results = None
             f_data = True
-        elif header == Message("GETFORCE"):
-            sock.sendall(Message("FORCEREADY"))
-
+            f_shm = False
+        elif header == MESSAGE["shminit"]:
+            # (re)maps the shared-memory file that i-PI uses for the data
+            nat, pathlen = recv_data(sock, np.zeros(2, np.int32))
+            path = recv_data(sock, np.zeros(pathlen, np.byte)).tobytes().decode()
+            if shm is not None:
+                # the mmap can only be closed once no view refers to it
+                shm_views = pos = None
+                shm.close()
+            shm, shm_views = attach_shm(path, nat)
+            pos = np.zeros((nat, 3), float)
+        elif header == MESSAGE["posdatashm"]:
+            # positions have been written in shared memory
+            pos = shm_views["pos"]
+            pot, force, vir, extras = driver(shm_views["cell"].copy(), pos.copy())
+            f_data = True
+            f_shm = True
+        elif header == MESSAGE["posdatabatch"]:
+            # receives several structures, and evaluates them in one call
+            nstruct = recv_data(sock, nat_buf)[0]
+            while len(batch_cells) < nstruct:
+                batch_cells.append(np.zeros((3, 3), float))
+                batch_pos.append(np.zeros(0, float))
+            for i in range(nstruct):
+                recv_data(sock, batch_cells[i])
+                recv_data(sock, icell)
+                nat = recv_data(sock, nat_buf)[0]
+                if batch_pos[i].shape != (nat, 3):
+                    batch_pos[i] = np.zeros((nat, 3), float)
+                recv_data(sock, batch_pos[i])
+
+            batch_results = driver(
+                [c.copy() for c in batch_cells[:nstruct]],
+                [p.copy() for p in batch_pos[:nstruct]],
+            )
+            f_data = True
+            f_shm = False
+        elif header == MESSAGE["getforce"] and batch_results is not None:
+            # sends back the results for all the structures of the batch
+            buffers = [MESSAGE["forcebatch"], np.array([len(batch_results)], np.int32)]
+            for (pot, force, vir, extras), bpos in zip(batch_results, batch_pos):
+                if force.size != bpos.size or vir.size != 9:
+                    raise ValueError(
+                        "driver returned forces or virial with the wrong size"
+                    )
+                extras = extras.encode("utf-8")
+                buffers += [
+                    np.array([pot], np.float64),
+                    np.array([len(bpos)], np.int32),
+                    np.ascontiguousarray(force, np.float64),
+                    np.ascontiguousarray(vir, np.float64),
+                    np.array([len(extras)], np.int32),
+                    extras,
+                ]
+            send_buffers(sock, buffers)
+            batch_results = None
+            f_data = False
+        elif header == MESSAGE["getforce"]:
             # sanity check in the returned values (catches bugs and inconsistencies in the implementation)
             if not isinstance(force, np.ndarray) and force.dtype == np.float64:
                 raise ValueError(
@@ -140,27 +296,50 @@ def run_driver(
                     "numpy.ndarray containing 64-bit floating points values"
                 )
 
-            if len(force.flatten()) != len(pos.flatten()):
+            if force.size != pos.size:
                 raise ValueError(
                     "driver returned forces with the wrong size: number of "
                     "atoms and dimensions must match positions"
                 )
 
-            if len(vir.flatten()) != 9:
+            if vir.size != 9:
                 raise ValueError(
                     "driver returned a virial tensor which does not have 9 components"
                 )
 
-            send_data(sock, np.float64(pot))
-            send_data(sock, np.int32(nat))
-            send_data(sock, force)
-            send_data(sock, vir)
-            send_data(sock, np.int32(len(extras)))
-            sock.sendall(extras.encode("utf-8"))
+            extras = extras.encode("utf-8")
+            if f_shm:
+                # results go in shared memory, only extras go through the socket
+                shm_views["pot"][0] = pot
+                shm_views["force"][:] = force.reshape((-1, 3))
+                shm_views["vir"][:] = vir.reshape((3, 3))
+                xlen_buf[0] = len(extras)
+                send_buffers(sock, [MESSAGE["forceshm"], xlen_buf, extras])
+                f_data = False
+                continue
+
+            # sends header, energy, forces, virial and extras in one go
+            pot_buf[0] = pot
+            natout_buf[0] = nat
+            xlen_buf[0] = len(extras)
+            send_buffers(
+                sock,
+                [
+                    MESSAGE["forceready"],
+                    potnat_buf,
+                    np.ascontiguousarray(force, np.float64),
+                    np.ascontiguousarray(vir, np.float64),
+                    xlen_buf,
+                    extras,
+                ],
+            )
 
             f_data = False
-        elif header == Message("EXIT"):
+        elif header == MESSAGE["exit"]:
             print("Received exit message from i-PI. Bye bye!")
+            if shm is not None:
+                shm_views = pos = None
+                shm.close()
             return
 
 
@@ -220,6 +399,18 @@ if __name__ == "__main__":
         help="""Parameters required to run the driver. Comma-separated list of values
         """,
     )
+    parser.add_argument(
+        "--shmem",
+        action="store_true",
+        default=False,
+        help="Exchange positions and forces with i-PI through shared memory. Requires the driver to run on the same node as i-PI.",
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=1,
+        help="Maximum number of structures that i-PI can send to the driver in a single batch.",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -244,4 +435,6 @@ if __name__ == "__main__":
         driver=d_f,
         f_verbose=args.verbose,
         sockets_prefix=args.sockets_prefix,
+        shmem=args.shmem,
+        batch_size=args.batch_size,
     )
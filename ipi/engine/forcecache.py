@@ -0,0 +1,181 @@
+"""Contains a cache of the results of force evaluations.
+
+A ForceCache stores the energy, forces, virial and extras computed by a
+forcefield for a given configuration, so that the forcefield can answer a
+request for a configuration it has already seen without evaluating it again.
+Configurations are identified by a hash of the positions, the cell, the list
+of active atoms and the name and parameters of the forcefield, after rounding
+the coordinates to a grid of a given tolerance. Results are kept in memory up to a maximum
+number, and can also be stored in a file, so that they can be reused across
+different runs (e.g. when restarting a geometry optimization).
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import os
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ipi.utils.messages import verbosity, info, warning
+
+__all__ = ["ForceCache"]
+
+
+class ForceCache:
+    """Least-recently-used cache of force evaluations, with an optional
+    persistent store on disk.
+
+    Attributes:
+        size: The maximum number of results kept in memory.
+        tolerance: The spacing of the grid on which the positions and the cell
+            are rounded before hashing. If zero, configurations must be
+            identical to be considered the same.
+        filename: The name of the file in which results are stored, or an
+            empty string if they are only kept in memory.
+        hits: The number of requests that have been answered from the cache.
+        misses: The number of requests that had to be evaluated.
+    """
+
+    def __init__(self, size=1000, tolerance=0.0, filename=""):
+        """Initialises ForceCache.
+
+        Args:
+            size: The maximum number of results kept in memory.
+            tolerance: The tolerance (in atomic units) below which two
+                configurations are considered to be the same.
+            filename: The name of the file in which the results are stored.
+                Results already present in the file are reused.
+        """
+
+        self.size = size
+        self.tolerance = tolerance
+        self.filename = filename
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        # the file is an append-only sequence of pickled (key, result) pairs,
+        # and we only keep in memory the offset at which each record starts
+        self._index = {}
+        self._file = None
+        if self.filename != "":
+            self._open()
+
+    def _open(self):
+        """Opens the store on disk, indexing the results it already contains,
+        and discarding any incomplete record at the end of the file."""
+
+        self._file = open(self.filename, "a+b")
+        self._file.seek(0)
+        end = 0
+        while True:
+            try:
+                key, _ = pickle.load(self._file)
+            except EOFError:
+                break
+            except Exception:
+                warning(
+                    " @ForceCache: Discarding a damaged record at the end of "
+                    + self.filename,
+                    verbosity.low,
+                )
+                break
+            self._index[key] = end
+            end = self._file.tell()
+        self._file.truncate(end)
+        info(
+            " @ForceCache: Read %d results from %s" % (len(self._index), self.filename),
+            verbosity.low,
+        )
+
+    def key(self, pos, cell, active, pars, offset=0.0, ffield=""):
+        """Returns the hash identifying a configuration.
+
+        Args:
+            pos: The (folded) atomic positions.
+            cell: The cell matrix.
+            active: The indices of the active coordinates.
+            pars: The string of parameters passed to the forcefield.
+            offset: The energy offset of the forcefield.
+            ffield: The name of the forcefield, so that forcefields sharing
+                the same file do not answer each other's requests.
+        """
+
+        h = hashlib.blake2b(digest_size=20)
+        for x in (pos, cell):
+            if self.tolerance > 0:
+                x = np.rint(np.asarray(x) / self.tolerance).astype(np.int64)
+            else:
+                x = np.asarray(x, np.float64)
+            h.update(np.ascontiguousarray(x).tobytes())
+        h.update(np.ascontiguousarray(active, np.int64).tobytes())
+        h.update(("%s|%s|%r" % (ffield, pars, offset)).encode())
+        return h.digest()
+
+    def get(self, key):
+        """Returns a copy of the result stored for key, or None if there is
+        none."""
+
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+            elif self._file is not None and key in self._index:
+                self._file.seek(self._index[key])
+                _, result = pickle.load(self._file)
+                self._remember(key, result)
+
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return _copy_result(result)
+
+    def add(self, key, result):
+        """Stores a copy of result as the result for key."""
+
+        result = _copy_result(result)
+        with self._lock:
+            self._remember(key, result)
+            if self._file is not None and key not in self._index:
+                self._file.seek(0, os.SEEK_END)
+                self._index[key] = self._file.tell()
+                pickle.dump((key, result), self._file, pickle.HIGHEST_PROTOCOL)
+                self._file.flush()
+
+    def _remember(self, key, result):
+        """Adds a result to the in-memory LRU list."""
+
+        if self.size <= 0:
+            return
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    def close(self):
+        """Closes the store on disk, if there is one."""
+
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _copy_result(result):
+    """Copies a [pot, forces, virial, extras] list, so that the cached
+    values cannot be modified by whoever uses them."""
+
+    pot, f, vir, extras = result
+    if isinstance(extras, dict):
+        extras = dict(extras)
+    return [pot, np.array(f, copy=True), np.array(vir, copy=True), extras]
@@ -47,12 +47,43 @@ class ForceRequest(dict):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self._event_done = threading.Event()
+        self._event_done = DoneEvent()
 
     def __eq__(self, y):
         """Overwrites the standard equals function."""
         return self is y
 
+    def add_done_callback(self, func):
+        """Calls func() when the request is done (or right away if it is)."""
+        self._event_done.add_callback(func)
+
+
+class DoneEvent(threading.Event):
+    """A threading.Event that also runs a list of callbacks when it is set,
+    so that objects waiting on a request (e.g. the polling loop of a forcefield
+    that combines the results of other forcefields) can be woken up without
+    polling.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._callbacks = []
+        self._cblock = threading.Lock()
+
+    def set(self):
+        with self._cblock:
+            super().set()
+            callbacks, self._callbacks = self._callbacks, []
+        for func in callbacks:
+            func()
+
+    def add_callback(self, func):
+        with self._cblock:
+            if not self.is_set():
+                self._callbacks.append(func)
+                return
+        func()
+
 
 class ForceField:
     """Base forcefield class.
@@ -75,6 +106,11 @@ class ForceField:
         _doloop: A list of booleans. Used to decide when to stop running the
             polling loop.
         _threadlock: Python handle used to lock the thread held in _thread.
+        _wakeup: An event used to wake up the polling loop when there is
+            something new to do, e.g. a new request has been queued.
+        cache: An optional ForceCache holding the results of previous
+            evaluations, used to answer requests for configurations that
+            have already been computed.
     """
 
     def __init__(
@@ -118,6 +154,18 @@ class ForceField:
         self._thread = None
         self._doloop = [False]
         self._threadlock = threading.Lock()
+        self._wakeup = threading.Event()
+        self.cache = None
+
+    def set_cache(self, cache):
+        """Attaches a ForceCache to the forcefield, so that configurations
+        that have already been evaluated are not computed again.
+
+        Args:
+            cache: A ForceCache object, or None to disable caching.
+        """
+
+        self.cache = cache
 
     def bind(self, output_maker=None):
         """Binds the FF, at present just to allow for
@@ -203,14 +251,49 @@ class ForceField:
             template.update(fields)
             newreq = ForceRequest(template)
 
+        if self.cache is not None:
+            key = self.cache.key(
+                pbcpos,
+                fields["cell"][0],
+                self.iactive,
+                par_str,
+                self.offset,
+                ffield=self.name,
+            )
+            result = self.cache.get(key)
+            if result is not None:
+                # answers straight away, without handing the request to the
+                # polling loop
+                newreq["result"] = result
+                newreq["t_dispatched"] = newreq["t_finished"] = time.time()
+                newreq["status"] = "Done"
+                newreq._event_done.set()
+                return newreq
+            # the result is stored when the request is released
+            newreq["cache_key"] = key
+
         with self._threadlock:
             self.requests.append(newreq)
 
-        if not self.threaded:
+        if self.threaded:
+            self.notify()
+        else:
             self.poll()
 
         return newreq
 
+    def notify(self):
+        """Wakes up the polling loop."""
+
+        self._wakeup.set()
+
+    def poll_timeout(self):
+        """Returns the longest time the polling loop should wait for a
+        notification before polling again, or None if it can wait until
+        it is notified, e.g. of a new request."""
+
+        return None
+
     def poll(self):
         """Polls the forcefield object to check if it has finished."""
 
@@ -232,7 +315,8 @@ class ForceField:
         """Polling loop.
 
         Loops over the different requests, checking to see when they have
-        finished.
+        finished. Between polls, waits to be notified of new requests or
+        completed sub-requests, or for at most poll_timeout() seconds.
         """
 
         info(
@@ -240,7 +324,8 @@ class ForceField:
             verbosity.low,
         )
         while self._doloop[0]:
-            time.sleep(self.latency)
+            self._wakeup.wait(self.poll_timeout())
+            self._wakeup.clear()
             if len(self.requests) > 0:
                 self.poll()
 
@@ -257,6 +342,11 @@ class ForceField:
         if "thread" in request:
             request["thread"].join()
 
+        if self.cache is not None and request["status"] == "Done":
+            key = request.pop("cache_key", None)
+            if key is not None:
+                self.cache.add(key, request["result"])
+
         with self._threadlock if lock else nullcontext():
             if request in self.requests:
                 try:
@@ -269,11 +359,20 @@ class ForceField:
                     raise
 
     def stop(self):
-        """Dummy stop method."""
+        """Stops the polling loop, and closes the cache (if any)."""
 
+        if self.cache is not None:
+            info(
+                " @ForceField (%s): %d requests answered from the cache, %d evaluated"
+                % (self.name, self.cache.hits, self.cache.misses),
+                verbosity.low,
+            )
+            self.cache.close()
         self._doloop[0] = False
         for r in self.requests:
             r["status"] = "Exit"
+            r._event_done.set()
+        self.notify()
 
     def start(self):
         """Spawns a new thread.
@@ -358,11 +457,39 @@ class FFSocket(ForceField):
         self.socket.requests = self.requests
         self.socket.offset = self.offset
 
+    def queue(self, atoms, cell, reqid=-1, template=None):
+        """Adds a request, and wakes up the socket interface if it is
+        waiting for events."""
+
+        newreq = super(FFSocket, self).queue(atoms, cell, reqid, template)
+        self.socket.notify()
+        return newreq
+
     def poll(self):
         """Function to check the status of the client calculations."""
 
         self.socket.poll()
 
+    def poll_timeout(self):
+        """The clients must be checked periodically, unless the interface
+        is event-driven."""
+
+        return self.latency
+
+    def _poll_loop(self):
+        """Polling loop. If the interface is event-driven, this blocks on
+        the socket events rather than sleeping between polls."""
+
+        if not self.socket.event_driven:
+            return super(FFSocket, self)._poll_loop()
+
+        info(
+            f" @ForceField ({self.name}): Starting the event-driven socket loop.",
+            verbosity.low,
+        )
+        while self._doloop[0]:
+            self.socket.poll_events()
+
     def start(self):
         """Spawns a new thread."""
 
@@ -373,6 +500,7 @@ class FFSocket(ForceField):
         """Closes the socket and the thread."""
 
         super(FFSocket, self).stop()
+        self.socket.notify()
         if self._thread is not None:
             # must wait until loop has ended before closing the socket
             self._thread.join()
@@ -511,6 +639,11 @@ class FFDirect(ForceField):
                 if self._batch_idle_cycles >= self._batch_idle_threshold:
                     self.launch_batch()
 
+    def poll_timeout(self):
+        """Incomplete batches are flushed after a few idle polling cycles."""
+
+        return self.latency if len(self.request_batch) > 0 else None
+
     def _process_results(self, results, request):
         # ensure forces and virial have the correct shape to fit the results
         results[0] -= self.offset
@@ -1379,6 +1512,12 @@ class FFCommittee(ForceField):
             ff.start()
         super(FFCommittee, self).start()
 
+    def set_cache(self, cache):
+        if cache is not None:
+            raise ValueError(
+                "A committee cannot cache its results: enable the cache in its members instead"
+            )
+
     def queue(self, atoms, cell, reqid=-1):
         # launches requests for all of the committee FF objects
         ffh = []
@@ -1392,6 +1531,9 @@ class FFCommittee(ForceField):
             atoms, cell, reqid, template=dict(ff_handles=ffh)
         )
         req["t_dispatched"] = time.time()
+        # the polling loop is woken up as the members of the committee finish
+        for ff_r in ffh:
+            ff_r.add_done_callback(self.notify)
         return req
 
     def check_finish(self, r):
@@ -1696,6 +1838,12 @@ class FFRotations(ForceField):
         super().start()
         self.ff.start()
 
+    def set_cache(self, cache):
+        if cache is not None:
+            raise ValueError(
+                "ffrotations cannot cache its results: enable the cache in the inner forcefield instead"
+            )
+
     def queue(self, atoms, cell, reqid=-1):
         # launches requests for all of the rotations FF objects
         ffh = []  # this is the list of "inner" FF requests
@@ -1734,7 +1882,12 @@ class FFRotations(ForceField):
         req = ForceField.queue(
             self, atoms, cell, reqid, template=dict(ff_handles=ffh, rots=rots)
         )
-        req["status"] = "Running"
+        # the polling loop may have already gathered the results
+        with self._threadlock:
+            if req["status"] == "Queued":
+                req["status"] = "Running"
+        for ff_r in ffh:
+            ff_r.add_done_callback(self.notify)
         req["t_dispatched"] = time.time()
         return req
 
@@ -1817,7 +1970,8 @@ class FFRotations(ForceField):
         """Polls the forcefield object to check if it has finished."""
 
         with self._threadlock:
-            for r in self.requests:
+            # iterates over a copy, as finished requests are released
+            for r in self.requests[:]:
                 if "ff_handles" in r and r["status"] != "Done" and self.check_finish(r):
                     r["t_finished"] = time.time()
                     self.gather(r)
@@ -2112,6 +2266,12 @@ class FFCavPhSocket(FFSocket):
 
         self._getallcount = 0
 
+    def set_cache(self, cache):
+        if cache is not None:
+            raise ValueError(
+                "ffcavphsocket cannot cache its results, as each request is split over the independent baths"
+            )
+
     def calc_dipole_xyz_mm(self, pos, n_bath, charge_array_bath):
         """
         Calculate the x, y, and z components of total dipole moment for a single molecular subsystem (bath)
@@ -2292,6 +2452,7 @@ class FFCavPhSocket(FFSocket):
             for newreq in newreq_lst:
                 self.requests.append(newreq)
                 self._getallcount += 1
+        self.socket.notify()
 
         if not self.threaded:
             self.poll()
@@ -21,6 +21,7 @@ import numpy as np
 
 from ipi.utils.softexit import softexit
 from ipi.utils.messages import verbosity, warning, info
+from ipi.utils.tracing import request_tracer
 from ipi.utils.depend import *
 from ipi.utils.nmtransform import nm_rescale
 from ipi.engine.beads import Beads
@@ -46,6 +47,7 @@ class ForceBead:
           of the system.
        uid: A unique id number identifying each of the different bead's
           forcefields.
+       index: The index of the replica the forces are computed for.
        request: A dictionary containing information about the currently
           running job.
        _threadlock: Python handle used to lock the thread used to run the
@@ -72,10 +74,14 @@ class ForceBead:
         # ufvx is a list [ u, f, vir, extra ]  which stores the results of the force calculation
         self._ufvx = depend_value(name="ufvx", func=self.get_all)
         self._threadlock = threading.Lock()
+        # signals that the current request has been released
+        self._released = threading.Condition(self._threadlock)
         self.request = None
         self._getallcount = 0
 
-    def bind(self, atoms, cell, ff, output_maker):
+    def bind(
+        self, atoms, cell, ff, output_maker, fbuffer=None, virbuffer=None, index=-1
+    ):
         """Binds atoms, cell and a forcefield template to the ForceBead object.
 
         Args:
@@ -84,6 +90,11 @@ class ForceBead:
            ff: A forcefield object which can calculate the potential, virial
               and forces given an unit cell and atom positions of one replica
               of the system.
+           fbuffer: An optional array of 3*natoms elements in which the force
+              is stored, e.g. a row of the forces of all the replicas.
+           virbuffer: An optional 3x3 array in which the virial is stored.
+           index: The index of the replica, used to label the requests when
+              they are traced.
         """
 
         global fbuid  # assign a unique identifier to each forcebead object
@@ -95,6 +106,7 @@ class ForceBead:
         self.atoms = atoms
         self.cell = cell
         self.ff = ff
+        self.index = index
 
         # ufvx depends on the atomic positions and on the cell
         self._ufvx.add_dependency(self.atoms._q)
@@ -105,16 +117,20 @@ class ForceBead:
             name="pot", func=self.get_pot, dependencies=[self._ufvx]
         )
 
+        if virbuffer is None:
+            virbuffer = np.zeros((3, 3), float)
         self._vir = depend_array(
             name="vir",
-            value=np.zeros((3, 3), float),
+            value=virbuffer,
             func=self.get_vir,
             dependencies=[self._ufvx],
         )
 
+        if fbuffer is None:
+            fbuffer = np.zeros(atoms.natoms * 3, float)
         self._f = depend_array(
             name="f",
-            value=np.zeros(atoms.natoms * 3, float),
+            value=fbuffer,
             func=self.get_f,
             dependencies=[self._ufvx],
         )
@@ -189,22 +205,23 @@ class ForceBead:
             ),
             verbosity.debug,
         )
+        if request_tracer.enabled:
+            request_tracer.record(request, self.ff.name, self.index, time.time())
 
         # data has been collected, so the request can be released and a slot
         # freed up for new calculations
         result = request["result"]
 
-        # reduce the reservation count (and wait for all calls to return)
-        with self._threadlock:
+        # reduce the reservation count, and release the request just once,
+        # when all the calls have returned
+        with self._released:
             self._getallcount -= 1
-
-        # releases just once, but wait for all requests to be complete
-        if self._getallcount == 0:
-            self.ff.release(request)
-            self.request = None
-        else:
-            while self._getallcount > 0:
-                time.sleep(latency)
+            if self._getallcount == 0:
+                self.ff.release(request)
+                self.request = None
+                self._released.notify_all()
+            else:
+                self._released.wait_for(lambda: self.request is not request)
 
         return result
 
@@ -360,17 +377,31 @@ class ForceComponent:
 
         self.ff = fflist[self.ffield]
 
+        # the forces and virials of the replicas are stored in contiguous
+        # arrays, and those of each ForceBead are views of one of their rows
+        fbuffer = np.zeros((self.nbeads, 3 * self.natoms), float)
+        virbuffer = np.zeros((self.nbeads, 3, 3), float)
+        self._gatherlock = threading.Lock()
+
         self._forces = []
         self.beads = beads
         for b in range(self.nbeads):
             new_force = ForceBead()
-            new_force.bind(beads[b], cell, self.ff, output_maker=output_maker)
+            new_force.bind(
+                beads[b],
+                cell,
+                self.ff,
+                output_maker=output_maker,
+                fbuffer=fbuffer[b],
+                virbuffer=virbuffer[b],
+                index=b,
+            )
             self._forces.append(new_force)
 
         # f is a big array which assembles the forces on individual beads
         self._f = depend_array(
             name="f",
-            value=np.zeros((self.nbeads, 3 * self.natoms)),
+            value=fbuffer,
             func=self.f_gather,
             dependencies=[self._forces[b]._f for b in range(self.nbeads)],
         )
@@ -384,7 +415,7 @@ class ForceComponent:
         )
         self._virs = depend_array(
             name="virs",
-            value=np.zeros((self.nbeads, 3, 3), float),
+            value=virbuffer,
             func=self.vir_gather,
             dependencies=[self._forces[b]._vir for b in range(self.nbeads)],
         )
@@ -421,6 +452,37 @@ class ForceComponent:
             is_tainted = self._forces[b].queue() or is_tainted
         return is_tainted
 
+    def gather(self):
+        """Collects the results of all the replicas.
+
+        Reads the results of the force calculations once for each replica,
+        storing them directly in the arrays of the forces, potentials and
+        virials of the component, and marks the per-replica and the
+        component-level quantities as up to date.
+        """
+
+        self.queue()
+        with self._gatherlock:
+            f = dstrip(self._f)
+            pots = dstrip(self._pots)
+            virs = dstrip(self._virs)
+            for b, fb in enumerate(self._forces):
+                ufvx = fb.ufvx
+                pots[b] = ufvx[0]
+                f[b] = ufvx[1]
+                virs[b] = ufvx[2]
+                fb._pot.set(ufvx[0], manual=False)
+            # the virial is stored in upper triangular form
+            virs[:, 1, 0] = 0.0
+            virs[:, 2, 0:2] = 0.0
+
+            for fb in self._forces:
+                fb._f.taint(taintme=False)
+                fb._vir.taint(taintme=False)
+            self._f.taint(taintme=False)
+            self._pots.taint(taintme=False)
+            self._virs.taint(taintme=False)
+
     def pot_gather(self):
         """Obtains the potential energy for each replica.
 
@@ -428,8 +490,8 @@ class ForceComponent:
            A list of the potential energy of each replica of the system.
         """
 
-        self.queue()
-        return np.array([b.pot for b in self._forces], float)
+        self.gather()
+        return self._pots._value
 
     def extra_gather(self):
         """Obtains the extra string information for each replica.
@@ -479,8 +541,8 @@ class ForceComponent:
            A list of the virial of each replica of the system.
         """
 
-        self.queue()
-        return np.array([b.vir for b in self._forces], float)
+        self.gather()
+        return self._virs._value
 
     def f_gather(self):
         """Obtains the force vector for each replica.
@@ -490,12 +552,8 @@ class ForceComponent:
            array for replica i of the system.
         """
 
-        newf = np.zeros((self.nbeads, 3 * self.natoms), float)
-        self.queue()
-        for b in range(self.nbeads):
-            newf[b] = dstrip(self._forces[b].f)
-
-        return newf
+        self.gather()
+        return self._f._value
 
     def get_vir(self):
         """Sums the virial of each replica.
@@ -996,7 +1054,7 @@ class Forces:
             self._pots.add_dependency(fc._weight)
             self._virs.add_dependency(fc._weight)
 
-    def clone(self, beads, cell):
+    def clone(self, beads, cell, contract=True):
         """Duplicates the force object, so that it can be used to compute forces
         using the same forcefields, but with a separate beads and cell object
         (that can e.g. be created by cloning existing beads and cell objects).
@@ -1008,6 +1066,10 @@ class Forces:
         Args:
            beads: Beads object that the clone should be bound to
            cell: Cell object that the clone should be bound to
+           contract: If False, all the force components are evaluated on every
+              bead, ignoring their ring-polymer contraction settings. Used when
+              the beads are independent structures rather than the replicas
+              of a ring polymer.
 
         Returns: The copy of the Forces object
         """
@@ -1023,12 +1085,25 @@ class Forces:
                 "The 'cell' argument must be provided and be a Cell object."
             )
 
+        fcomp = self.fcomp
+        if not contract:
+            fcomp = [
+                ForceComponent(
+                    ffield=fc.ffield,
+                    name=fc.name,
+                    nbeads=0,
+                    weight=fc.weight,
+                    mts_weights=fc.mts_weights,
+                    interpolate_extras=fc.interpolate_extras,
+                    epsilon=fc.epsilon,
+                )
+                for fc in self.fcomp
+            ]
+
         nforce = Forces()
         nbeads = beads
         ncell = cell
-        nforce.bind(
-            nbeads, ncell, self.fcomp, self.ff, self.open_paths, self.output_maker
-        )
+        nforce.bind(nbeads, ncell, fcomp, self.ff, self.open_paths, self.output_maker)
         return nforce
 
     def dump_state(self):
@@ -220,7 +220,7 @@ def init_vector(
 
     mode = iif.mode
     value = iif.value
-    if mode == "xyz" or mode == "pdb" or mode == "ase":
+    if mode == "xyz" or mode == "pdb" or mode == "ase" or mode == "ipb":
         rq = init_beads(iif, nbeads, dimension, units, cell_units).q
     elif mode == "chk":
         if momenta:
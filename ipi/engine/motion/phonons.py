@@ -23,9 +23,11 @@ import numpy as np
 
 
 from ipi.engine.motion import Motion
+from ipi.engine.beads import Beads
 from ipi.utils.depend import dstrip
 from ipi.utils.softexit import softexit
 from ipi.utils.messages import verbosity, info
+from ipi.utils.phonontools import external_modes, project_modes
 
 
 class DynMatrixMover(Motion):
@@ -43,6 +45,8 @@ class DynMatrixMover(Motion):
         refdynmat=np.zeros(0, float),
         prefix="",
         asr="none",
+        batch=1,
+        done=np.zeros(0, bool),
     ):
         """Initialises DynMatrixMover.
         Args:
@@ -50,6 +54,10 @@ class DynMatrixMover(Motion):
                   motion will be constrained or not. Defaults to False.
         dynmatrix : A 3Nx3N array that stores the dynamic matrix.
         refdynmatrix : A 3Nx3N array that stores the refined dynamic matrix.
+        batch : Number of rows of the dynamic matrix whose displaced
+                structures are evaluated together.
+        done : A 3N array that flags the rows of the dynamic matrix that
+               have been computed.
         """
 
         super(DynMatrixMover, self).__init__(fixcom=fixcom, fixatoms_dof=fixatoms_dof)
@@ -68,11 +76,15 @@ class DynMatrixMover(Motion):
         self.deltae = energy_shift
         self.dynmatrix = dynmat
         self.refdynmatrix = refdynmat
+        self.done = done
         self.frefine = False
         self.U = None
         self.V = None
         self.prefix = prefix
         self.asr = asr
+        self.batch = batch
+        if self.batch > 1 and self.mode != "fd":
+            raise ValueError("Batched evaluation is only implemented for mode='fd'.")
 
         if self.prefix == "":
             self.prefix = "phonons"
@@ -100,6 +112,34 @@ class DynMatrixMover(Motion):
         self.dbeads = self.beads.clone()
         self.dcell = self.cell.clone()
         self.dforces = self.forces.clone(self.dbeads, self.dcell)
+        self._bforces = {}
+
+    def displaced_forces(self, q):
+        """Computes the forces for several displaced structures at once.
+
+        The structures are the beads of a separate Beads object, so that all the
+        force requests are queued together and can be evaluated in parallel by
+        the connected clients. Ring-polymer contraction is disabled, as the
+        structures are independent.
+
+        Args:
+        q : A (nstruct, 3N) array with the displaced positions.
+
+        Returns: A (nstruct, 3N) array with the forces.
+        """
+
+        nstruct = len(q)
+        if nstruct not in self._bforces:
+            bbeads = Beads(self.beads.natoms, nstruct)
+            bbeads.m[:] = self.beads.m
+            bbeads.names[:] = self.beads.names
+            self._bforces[nstruct] = (
+                bbeads,
+                self.forces.clone(bbeads, self.dcell, contract=False),
+            )
+        bbeads, bforces = self._bforces[nstruct]
+        bbeads.q = q
+        return dstrip(bforces.f).copy()
 
     def step(self, step=None):
         """Executes one step of phonon computation."""
@@ -199,93 +239,8 @@ class DynMatrixMover(Motion):
         if self.asr == "none":
             return dm
 
-        if self.asr == "crystal":
-            # Computes the centre of mass.
-            com = (
-                np.dot(
-                    np.transpose(self.beads.q.reshape((self.beads.natoms, 3))), self.m
-                )
-                / self.m.sum()
-            )
-            qminuscom = self.beads.q.reshape((self.beads.natoms, 3)) - com
-            # Computes the moment of inertia tensor.
-            moi = np.zeros((3, 3), float)
-            for k in range(self.beads.natoms):
-                moi -= (
-                    np.dot(
-                        np.cross(qminuscom[k], np.identity(3)),
-                        np.cross(qminuscom[k], np.identity(3)),
-                    )
-                    * self.m[k]
-                )
-
-            U = (np.linalg.eig(moi))[1]
-            R = np.dot(qminuscom, U)
-            D = np.zeros((3, 3 * self.beads.natoms), float)
-
-            # Computes the vectors along rotations.
-            D[0] = np.tile([1, 0, 0], self.beads.natoms) / self.ism
-            D[1] = np.tile([0, 1, 0], self.beads.natoms) / self.ism
-            D[2] = np.tile([0, 0, 1], self.beads.natoms) / self.ism
-
-            # Computes unit vecs.
-            for k in range(3):
-                D[k] = D[k] / np.linalg.norm(D[k])
-
-            # Computes the transformation matrix.
-            transfmatrix = np.eye(3 * self.beads.natoms) - np.dot(D.T, D)
-            r = np.dot(transfmatrix.T, np.dot(dm, transfmatrix))
-            return r
-
-        elif self.asr == "poly":
-            # Computes the centre of mass.
-            com = (
-                np.dot(
-                    np.transpose(self.beads.q.reshape((self.beads.natoms, 3))), self.m
-                )
-                / self.m.sum()
-            )
-            qminuscom = self.beads.q.reshape((self.beads.natoms, 3)) - com
-            # Computes the moment of inertia tensor.
-            moi = np.zeros((3, 3), float)
-            for k in range(self.beads.natoms):
-                moi -= (
-                    np.dot(
-                        np.cross(qminuscom[k], np.identity(3)),
-                        np.cross(qminuscom[k], np.identity(3)),
-                    )
-                    * self.m[k]
-                )
-
-            U = (np.linalg.eig(moi))[1]
-            R = np.dot(qminuscom, U)
-            D = np.zeros((6, 3 * self.beads.natoms), float)
-
-            # Computes the vectors along translations and rotations.
-            D[0] = np.tile([1, 0, 0], self.beads.natoms) / self.ism
-            D[1] = np.tile([0, 1, 0], self.beads.natoms) / self.ism
-            D[2] = np.tile([0, 0, 1], self.beads.natoms) / self.ism
-            for i in range(3 * self.beads.natoms):
-                iatom = i // 3
-                idof = np.mod(i, 3)
-                D[3, i] = (
-                    R[iatom, 1] * U[idof, 2] - R[iatom, 2] * U[idof, 1]
-                ) / self.ism[i]
-                D[4, i] = (
-                    R[iatom, 2] * U[idof, 0] - R[iatom, 0] * U[idof, 2]
-                ) / self.ism[i]
-                D[5, i] = (
-                    R[iatom, 0] * U[idof, 1] - R[iatom, 1] * U[idof, 0]
-                ) / self.ism[i]
-
-            # Computes unit vecs.
-            for k in range(6):
-                D[k] = D[k] / np.linalg.norm(D[k])
-
-            # Computes the transformation matrix.
-            transfmatrix = np.eye(3 * self.beads.natoms) - np.dot(D.T, D)
-            r = np.dot(transfmatrix.T, np.dot(dm, transfmatrix))
-            return r
+        D = external_modes(self.asr, self.beads.q, self.m, self.ism)[0]
+        return project_modes(dm, D)
 
 
 class DummyPhononCalculator:
@@ -344,10 +299,26 @@ class FDPhononCalculator(DummyPhononCalculator):
                 ((self.dm.beads.q.size, self.dm.beads.q.size))
             )
 
+        # rows that are already known, e.g. because they were computed as part
+        # of a batch before the simulation was restarted
+        if self.dm.done.size != self.dm.beads.q.size:
+            if self.dm.done.size == 0:
+                self.dm.done = np.zeros(self.dm.beads.q.size, bool)
+            else:
+                raise ValueError("Size of the computed rows does not match system size")
+
     def step(self, step=None):
         """Computes one row of the dynamic matrix."""
 
-        if step not in self.dm.fixatoms_dof:
+        if step in self.dm.fixatoms_dof:
+            info(" We have skipped the dof # {}.".format(step), verbosity.low)
+        elif self.dm.done[step]:
+            info(
+                " The dof # {} has already been computed.".format(step), verbosity.high
+            )
+        elif self.dm.batch > 1:
+            self.step_batch(step)
+        else:
             # initializes the finite deviation
             dev = np.zeros(3 * self.dm.beads.natoms, float)
             dev[step] = self.dm.deltax
@@ -363,8 +334,37 @@ class FDPhononCalculator(DummyPhononCalculator):
             )
             self.dm.dynmatrix[step] = dmrow
             self.dm.refdynmatrix[step] = dmrow
-        else:
-            info(" We have skipped the dof # {}.".format(step), verbosity.low)
+            self.dm.done[step] = True
+
+    def step_batch(self, step):
+        """Computes the rows of the dynamic matrix for the next dm.batch
+        degrees of freedom that are neither fixed nor already known, starting
+        from step, evaluating all the displaced structures in parallel."""
+
+        rows = []
+        for k in range(step, len(self.dm.done)):
+            if len(rows) == self.dm.batch:
+                break
+            if not self.dm.done[k] and k not in self.dm.fixatoms_dof:
+                rows.append(k)
+        rows = np.asarray(rows)
+
+        # displaces each d.o.f. by +delta and -delta.
+        q = np.tile(dstrip(self.dm.beads.q[0]), (2 * len(rows), 1))
+        q[2 * np.arange(len(rows)), rows] += self.dm.deltax
+        q[2 * np.arange(len(rows)) + 1, rows] -= self.dm.deltax
+        f = self.dm.displaced_forces(q)
+
+        # computes the rows of force-constant matrix
+        dmrows = (
+            (f[1::2] - f[0::2])
+            / (2 * self.dm.deltax)
+            * self.dm.ism[rows, np.newaxis]
+            * self.dm.ism
+        )
+        self.dm.dynmatrix[rows] = dmrows
+        self.dm.refdynmatrix[rows] = dmrows
+        self.dm.done[rows] = True
 
     def transform(self):
         dm = self.dm.dynmatrix.copy()
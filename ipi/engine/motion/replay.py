@@ -7,11 +7,14 @@
 
 import time
 import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from fnmatch import fnmatch
 
 from ipi.engine.motion import Motion
 from ipi.utils.softexit import softexit
 from ipi.utils.io import read_file, read_file_raw
+from ipi.utils.io.io_index import FrameIndex, INDEX_MODES
 from ipi.utils.io.inputs.io_xml import xml_parse_file
 from ipi.utils.units import unit_to_internal
 from ipi.utils.messages import verbosity, info
@@ -28,6 +31,9 @@ class Replay(Motion):
 
     Attributes:
         intraj: The input trajectory file.
+        rstep: The index of the next frame (per bead) that will be read.
+        findex: For XYZ and PDB files, the FrameIndex objects used to read
+            frames directly, or None.
         ptime: The time taken in updating the velocities.
         qtime: The time taken in updating the positions.
         ttime: The time taken in applying the thermostat steps.
@@ -58,7 +64,8 @@ class Replay(Motion):
                 "Replay can only read from PDB or XYZ files -- or a single frame from a CHK file"
             )
         # Posibility to read beads from separate XYZ files by a wildcard
-        if any(char in self.intraj.value for char in "*?[]"):
+        wildcard = any(char in self.intraj.value for char in "*?[]")
+        if wildcard:
             infilelist = []
             for file in sorted(os.listdir(".")):
                 if fnmatch(file, self.intraj.value):
@@ -87,10 +94,58 @@ class Replay(Motion):
             infilelist_sorted, _ = zip(
                 *sorted(zip(infilelist, bead_map_list), key=lambda t: t[1])
             )
-            self.rfile = [open(f, "r") for f in infilelist_sorted]
+            infilelist = list(infilelist_sorted)
         else:  # no wildcard
-            self.rfile = open(self.intraj.value, "r")
+            infilelist = [self.intraj.value]
+
+        if self.intraj.mode in INDEX_MODES:
+            self.findex = [FrameIndex(f, self.intraj.mode) for f in infilelist]
+            self.rfile = self.findex
+        else:
+            self.findex = None
+            self.rfile = [open(f, "r") for f in infilelist]
+        if not wildcard:
+            self.rfile = self.rfile[0]
         self.rstep = 0
+        self._prefetch = None
+        self._executor = None
+
+    def read_frames(self, istep):
+        """Reads from the indexed trajectories the positions and cells for
+        all the beads at replay step istep.
+
+        Returns:
+            A list of (positions, cell) tuples, in internal units.
+        """
+
+        nbeads = len(self.beads)
+        conv = unit_to_internal("length", self.intraj.units, 1.0)
+        frames = []
+        for bindex in range(nbeads):
+            if isinstance(self.rfile, list):
+                myframe = self.findex[bindex].read(istep)
+            else:
+                # a single file holds the beads one after the other
+                myframe = self.findex[0].read(istep * nbeads + bindex)
+            frames.append((myframe["atoms"].q * conv, myframe["cell"].h * conv))
+        return frames
+
+    def fetch_frames(self, istep):
+        """Returns the frames for replay step istep, using the ones read in
+        the background if available, and starts reading the next ones."""
+
+        if self._prefetch is not None and self._prefetch[0] == istep:
+            frames = self._prefetch[1].result()
+        else:
+            frames = self.read_frames(istep)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        self._prefetch = (
+            istep + 1,
+            self._executor.submit(self.read_frames, istep + 1),
+        )
+        return frames
 
     def step(self, step=None):
         """Does one replay time step."""
@@ -110,6 +165,26 @@ class Replay(Motion):
                     verbosity.low,
                 )
                 softexit.trigger(status="bad", message=" # Error in replay input.")
+
+        if self.findex is not None:
+            # jumps directly to the frames for this step, as in a restart
+            if step is not None and step > self.rstep:
+                self.rstep = step
+            try:
+                frames = self.fetch_frames(self.rstep)
+                for b, (q, h) in zip(self.beads, frames):
+                    b.q[:] = q
+                # do not assign cell if it contains an invalid value (typically missing cell in the input)
+                if np.linalg.det(h) > 0:
+                    self.cell.h[:] = h
+            except EOFError:
+                softexit.trigger(
+                    status="success", message=" # Finished reading re-run trajectory"
+                )
+            self.rstep += 1
+            self.qtime += time.time()
+            return
+
         while True:
             self.rstep += 1
             try:
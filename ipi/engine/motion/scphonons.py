@@ -20,9 +20,9 @@ along with this program. If not, see <http.//www.gnu.org/licenses/>.
 
 __all__ = ["SCPhononsMover"]
 
-import os
 import numpy as np
 from ipi.engine.motion.motion import Motion
+from ipi.engine.beads import Beads
 
 from ipi.utils.depend import dstrip
 from ipi.utils.phonontools import apply_asr
@@ -106,8 +106,11 @@ class SCPhononsMover(Motion):
     def bind(self, ens, beads, nm, cell, bforce, prng, omaker):
         super(SCPhononsMover, self).bind(ens, beads, nm, cell, bforce, prng, omaker)
 
+        # Evaluates all the samples of an iteration at once if nparallel is zero
+        self.nbatch = self.nparallel if self.nparallel > 0 else self.max_steps
+
         # Raises error if nparallel is not a factor of max_steps
-        if self.max_steps % self.nparallel != 0:
+        if self.max_steps % self.nbatch != 0:
             raise ValueError(
                 "Number of parallel force evaluations is not a factor of the maximum number of Monte Carlo steps."
             )
@@ -132,9 +135,15 @@ class SCPhononsMover(Motion):
 
         # Creates duplicate classes to simplify computation of forces.
         self.dof = 3 * self.beads.natoms
-        self.dbeads = self.beads.clone(nbeads=self.nparallel)
+        # the displaced configurations are stored as the beads of dbeads, so
+        # that the forces of a whole batch are requested at the same time.
+        # They are independent, so no ring-polymer contraction is applied
+        self.dbeads = Beads(self.beads.natoms, self.nbatch)
+        self.dbeads.q[:] = dstrip(self.beads.q)[0]
+        self.dbeads.m[:] = dstrip(self.beads.m)
+        self.dbeads.names[:] = dstrip(self.beads.names)
         self.dcell = self.cell.clone()
-        self.dforces = self.forces.clone(self.dbeads, self.dcell)
+        self.dforces = self.forces.clone(self.dbeads, self.dcell, contract=False)
 
         # Sets temperature.
         self.temp = self.ensemble.temp
@@ -199,6 +208,46 @@ class SCPhononsMover(Motion):
             self.phononator.displace()
 
 
+def load_samples(filename, dof):
+    """
+    Reads the samples stored by the SCP mover in a binary file.
+
+    Each record holds the SCP iteration, the index of the sample, its
+    potential energy, position and force, as 2 * dof + 3 doubles. Records
+    are only ever appended, so a record replaces any earlier one for the
+    same sample, and an incomplete record at the end of the file is ignored.
+
+    Args:
+        filename: The name of the file.
+        dof: The number of degrees of freedom of the system.
+
+    Returns:
+        A dictionary with a (x, v, f) tuple for each SCP iteration, with the
+        configurations, potential energies and forces of the samples from
+        the first one up to the first one that is missing.
+    """
+
+    width = 2 * dof + 3
+    try:
+        data = np.fromfile(filename, dtype=float)
+    except (IOError, OSError):
+        return {}
+    data = data[: len(data) // width * width].reshape((-1, width))
+
+    samples = {}
+    for isc in np.unique(data[:, 0]).astype(int):
+        rows = {}
+        for row in data[data[:, 0] == isc]:
+            rows[int(row[1])] = row
+        nrows = 0
+        while nrows in rows:
+            nrows += 1
+        if nrows > 0:
+            rows = np.asarray([rows[i] for i in range(nrows)])
+            samples[isc] = (rows[:, 3 : 3 + dof], rows[:, 2], rows[:, 3 + dof :])
+    return samples
+
+
 class DummyPhononator:
     """No-op phononator"""
 
@@ -251,6 +300,15 @@ class SCPhononator(DummyPhononator):
         self.precheck = self.dm.precheck
         self.checkweights = self.dm.checkweights
 
+        # Reads the samples stored by a previous run, and appends new ones.
+        self.samples = self.dm.output_maker.get_output(
+            self.dm.prefix + ".samples", mode="ab"
+        )
+        self.stored = load_samples(self.samples.filename, self.dm.dof)
+        # drops an incomplete record left by a run that stopped while writing
+        width = 8 * (2 * self.dm.dof + 3)
+        self.samples.out.truncate(self.samples.out.tell() // width * width)
+
     def reset(self):
         """
         Resets the variables for a new round of phonon evaluation.
@@ -314,53 +372,46 @@ class SCPhononator(DummyPhononator):
         outfile.close_stream()
         info(" @SCP: Saving the minimum potential.", verbosity.medium)
 
-        if os.path.exists(
-            self.dm.output_maker.prefix
-            + "."
-            + self.dm.prefix
-            + ".x."
-            + str(self.dm.isc)
-        ):
-            info(
-                " @SCP: Loading %8d configurations from file." % (self.dm.max_steps,),
-                verbosity.medium,
-            )
-            self.x[self.dm.isc] = np.loadtxt(
-                self.dm.output_maker.prefix
-                + "."
-                + self.dm.prefix
-                + ".x."
-                + str(self.dm.isc)
-            )
-        else:
+        info(
+            " @SCP: Generating %8d new configurations to be sampled."
+            % (self.dm.max_steps,),
+            verbosity.medium,
+        )
+        # Creates the configurations that are to be sampled, in pairs of
+        # opposite displacements.
+        npairs = (self.dm.max_steps + 1) // 2
+        irng = self.dm.isc * self.dm.max_steps // 2 + 1 + np.arange(npairs)
+        x = self.dm.fginv(self.dm.random_sequence[irng])
+
+        # picks the elements of the vectors in a random order.
+        # this introduces a degree of randomness in the sobol-like PRNGs
+        x = x[:, self.dm.random_shuffle]
+
+        # Transforms the "normal" random numbers into displacements.
+        x = np.dot(x, self.dm.sqtD.T) * self.dm.isqm3
+        xq = np.zeros((2 * npairs, self.dm.dof))
+        xq[0::2] = self.dm.beads.q[-1] + x
+        xq[1::2] = self.dm.beads.q[-1] - x
+        self.x[self.dm.isc] = xq[: self.dm.max_steps]
+
+        # Reuses the samples of this iteration that have been evaluated already.
+        nstored = 0
+        if self.dm.isc in self.stored:
+            x, v, f = self.stored[self.dm.isc]
+            nstored = min(len(v), self.dm.max_steps)
+            nstored -= nstored % self.dm.nbatch
+            self.x[self.dm.isc, :nstored] = x[:nstored]
+            self.v[self.dm.isc, :nstored] = v[:nstored]
+            self.f[self.dm.isc, :nstored] = f[:nstored]
             info(
-                " @SCP: Generating %8d new configurations to be sampled."
-                % (self.dm.max_steps,),
+                " @SCP: Loading %8d samples from file." % (nstored,),
                 verbosity.medium,
             )
-            # Creates a list of configurations that are to be sampled.
-            while self.dm.imc <= self.dm.max_steps:
-                irng = (self.dm.isc) * self.dm.max_steps // 2 + (self.dm.imc + 1) // 2
-                x = self.dm.fginv(self.dm.random_sequence[irng])
-
-                # picks the elements of the vector in a random order.
-                # this introduces a degree of randomness in the sobol-like PRNGs
-                x = x[self.dm.random_shuffle]
-
-                # Transforms the "normal" random number and stores it.
-                x = np.dot(self.dm.isqM, np.dot(self.dm.sqtD, x))
-                self.x[self.dm.isc, self.dm.imc - 1] = (self.dm.beads.q + x.T)[-1]
-                self.dm.imc += 1
-
-                # Performs an inversion to the displacement and samples another configuration.
-                x = -x
-                self.x[self.dm.isc, self.dm.imc - 1] = (self.dm.beads.q + x.T)[-1]
-                self.dm.imc += 1
-
-        # Resets the number of MC steps to 1.
-        self.dm.imc = 1
+
+        self.dm.imc = 1 + nstored
         info(
-            " @SCP: Performing %8d new force evaluations." % (self.dm.max_steps,),
+            " @SCP: Performing %8d new force evaluations."
+            % (self.dm.max_steps - nstored,),
             verbosity.medium,
         )
 
@@ -369,81 +420,40 @@ class SCPhononator(DummyPhononator):
         Executes one monte carlo step.
         """
 
-        if os.path.exists(
-            self.dm.output_maker.prefix
-            + "."
-            + self.dm.prefix
-            + ".x."
-            + str(self.dm.isc)
-        ):
-            info(
-                " @SCP: Loading %8d forces from file." % (self.dm.max_steps,),
-                verbosity.medium,
-            )
-            self.f[self.dm.isc] = np.loadtxt(
-                self.dm.output_maker.prefix
-                + "."
-                + self.dm.prefix
-                + ".f."
-                + str(self.dm.isc)
-            )
-            self.v[self.dm.isc] = np.loadtxt(
-                self.dm.output_maker.prefix
-                + "."
-                + self.dm.prefix
-                + ".v."
-                + str(self.dm.isc)
-            )
-            self.dm.imc += len(self.f[self.dm.isc])
-        else:
-            imcmin = self.dm.imc - 1
-            imcmax = self.dm.imc - 1 + self.dm.nparallel
+        imcmin = self.dm.imc - 1
+        imcmax = self.dm.imc - 1 + self.dm.nbatch
 
-            x = self.x[self.dm.isc, imcmin:imcmax]
-            self.dm.dbeads.q = x
+        x = self.x[self.dm.isc, imcmin:imcmax]
+        self.dm.dbeads.q = x
 
-            v = dstrip(self.dm.dforces.pots).copy()
-            f = dstrip(self.dm.dforces.f).copy()
+        v = dstrip(self.dm.dforces.pots).copy()
+        f = dstrip(self.dm.dforces.f).copy()
 
-            self.v[self.dm.isc, imcmin:imcmax] = v[:]
-            self.f[self.dm.isc, imcmin:imcmax] = f[:]
+        self.v[self.dm.isc, imcmin:imcmax] = v[:]
+        self.f[self.dm.isc, imcmin:imcmax] = f[:]
 
-            self.dm.imc += self.dm.nparallel
+        # Appends the new samples to the binary file.
+        samples = np.column_stack(
+            (np.full(len(v), self.dm.isc), np.arange(imcmin, imcmax), v, x, f)
+        )
+        self.samples.write(samples.tobytes())
+        self.samples.out.flush()
+
+        self.dm.imc += self.dm.nbatch
 
     def print_energetics(self):
         """
         Prints the energetics of the sampled configurations.
         """
 
-        # prints the sampled configurations.
-        outfile = self.dm.output_maker.get_output(
-            self.dm.prefix + ".x." + str(self.dm.isc)
-        )
-        np.savetxt(outfile, self.x[self.dm.isc])
-        outfile.close_stream()
-        info(" @SCP: Saving the sampled configurations.", verbosity.medium)
-
-        # prints the potential energy of the sampled configurations.
-        outfile = self.dm.output_maker.get_output(
-            self.dm.prefix + ".v." + str(self.dm.isc)
-        )
-        np.savetxt(outfile, self.v[self.dm.isc])
-        outfile.close_stream()
+        # the sampled configurations, their potential energy and forces have
+        # been written to the binary file as soon as they were evaluated.
         info(
-            " @SCP: Saving the potential energy of the sampled configurations.",
+            " @SCP: The sampled configurations are stored in %s."
+            % (self.samples.filename,),
             verbosity.medium,
         )
 
-        # prints the sampled configurations.
-        outfile = self.dm.output_maker.get_output(
-            self.dm.prefix + ".f." + str(self.dm.isc)
-        )
-        np.savetxt(outfile, self.f[self.dm.isc])
-        outfile.close_stream()
-        info(
-            " @SCP: Saving the forces of the sampled configurations.", verbosity.medium
-        )
-
         self.dm.isc += 1
         self.dm.imc = 0
 
@@ -913,9 +913,10 @@ class NormalModes:
                             new_pnm[k, a] = pq[0] * sm[k,a]
                             new_qnm[k, a] = pq[1] / sm[k,a]
                 """
-            # updates the "real" vectors
-            self.pnm[1:] = new_pnm
-            self.qnm[1:] = new_qnm
+            # updates the "real" vectors, propagating the taints once
+            with dbatch():
+                self.pnm[1:] = new_pnm
+                self.qnm[1:] = new_qnm
 
     def get_kins(self):
         """Gets the MD kinetic energy for all the normal modes.
@@ -9,6 +9,9 @@ and the restart files.
 # See the "licenses" directory for full license information.
 
 import os
+import queue
+import threading
+from copy import deepcopy
 
 import numpy as np
 
@@ -19,6 +22,7 @@ from ipi.utils.depend import *
 import ipi.utils.io as io
 from ipi.utils.io.inputs.io_xml import *
 from ipi.utils.io import open_backup
+from ipi.utils.inputvalue import InputArray
 from ipi.engine.properties import getkey
 from ipi.engine.atoms import *
 from ipi.engine.cell import *
@@ -30,6 +34,7 @@ __all__ = [
     "TrajectoryOutput",
     "CheckpointOutput",
     "OutputList",
+    "OutputQueue",
     "OutputMaker",
     "BaseOutput",
 ]
@@ -75,9 +80,83 @@ class OutputList(list):
     """A simple decorated list to save the output prefix and bring it
     back to the initialization phase of the simulation"""
 
-    def __init__(self, prefix, olist):
+    def __init__(self, prefix, olist, queue=0):
         super(OutputList, self).__init__(olist)
         self.prefix = prefix
+        self.queue = queue
+
+
+class OutputQueue:
+    """Writes out properties and trajectories on a separate thread.
+
+    The outputs take a snapshot of the data at the end of each step, and
+    submit a function that formats and writes it out. The functions are
+    executed in order by the writer thread, so that the disk I/O does not
+    hold up the main loop. The queue is bounded: when it is full, submitting
+    blocks until the writer catches up.
+
+    Attributes:
+       maxsize: The maximum number of pending writes.
+    """
+
+    def __init__(self, maxsize=16):
+        """Initializes the queue and starts the writer thread.
+
+        Args:
+           maxsize: The maximum number of pending writes.
+        """
+
+        self.maxsize = maxsize
+        self._queue = queue.Queue(maxsize)
+        self._error = None
+        self._thread = threading.Thread(
+            target=self._run, name="output_writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        """Executes the submitted writes until a None is received."""
+
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                func, args = job
+                func(*args)
+            except Exception as err:
+                if self._error is None:
+                    self._error = err
+            finally:
+                self._queue.task_done()
+
+    def _raise(self):
+        """Raises in the calling thread errors that occurred while writing."""
+
+        if self._error is not None:
+            err, self._error = self._error, None
+            raise err
+
+    def submit(self, func, *args):
+        """Queues func(*args) for execution by the writer thread, waiting if
+        there are already maxsize pending writes."""
+
+        self._raise()
+        self._queue.put((func, args))
+
+    def flush(self):
+        """Waits until all the pending writes have been completed."""
+
+        self._queue.join()
+        self._raise()
+
+    def stop(self):
+        """Completes the pending writes and terminates the writer thread."""
+
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise()
 
 
 class OutputMaker:
@@ -112,10 +191,13 @@ class BaseOutput(object):
         self.stride = stride
         self.filename = filename
         self.out = None
+        self.writer = None
 
     def softexit(self):
         """Emergency call when i-pi must exit quickly"""
 
+        if self.writer is not None:
+            self.writer.flush()
         self.close_stream()
 
     def close_stream(self):
@@ -158,6 +240,16 @@ class BaseOutput(object):
         if self.out is not None:
             return self.out.write(data)
 
+    def submit(self, func, *args):
+        """Calls func(*args), or hands it over to the writer thread if an
+        OutputQueue has been assigned to this output. In the latter case, the
+        arguments must not be modified afterwards."""
+
+        if self.writer is None:
+            func(*args)
+        else:
+            self.writer.submit(func, *args)
+
     def active(self):
         """Whether we will output at this step"""
 
@@ -275,7 +367,8 @@ class PropertyOutput(BaseOutput):
 
         if not self.active():
             return
-        self.out.write("  ")
+
+        values = []
         for what in self.outlist:
             try:
                 quantity, dimension, unit = self.system.properties[what]
@@ -283,6 +376,28 @@ class PropertyOutput(BaseOutput):
                     quantity = unit_to_user(dimension, unit, quantity)
             except KeyError:
                 raise KeyError(what + " is not a recognized property")
+            if hasattr(quantity, "__len__"):
+                quantity = np.array(quantity)
+            values.append(quantity)
+
+        doflush = False
+        self.nout += 1
+        if self.flush > 0 and self.nout >= self.flush:
+            doflush = True
+            self.nout = 0
+
+        self.submit(self.write_line, values, doflush)
+
+    def write_line(self, values, flush=False):
+        """Writes out one line with the values of the properties.
+
+        Args:
+           values: A list with the values of the properties, in user units.
+           flush: Whether the output stream should be flushed to disk.
+        """
+
+        self.out.write("  ")
+        for quantity in values:
             if not hasattr(quantity, "__len__"):
                 self.out.write(write_type(float, quantity) + "   ")
             else:
@@ -291,10 +406,8 @@ class PropertyOutput(BaseOutput):
 
         self.out.write("\n")
 
-        self.nout += 1
-        if self.flush > 0 and self.nout >= self.flush:
+        if flush:
             self.force_flush()
-            self.nout = 0
 
 
 class TrajectoryOutput(BaseOutput):
@@ -467,35 +580,26 @@ class TrajectoryOutput(BaseOutput):
         data, dimension, units = self.system.trajs[
             self.what
         ]  # gets the trajectory data that must be printed
+        step = self.system.simul.step + 1
+        h = dstrip(self.system.cell.h).copy()
+        if self.writer is not None:
+            # the frames are written later, so we need a snapshot of the data
+            if isinstance(data, np.ndarray):
+                data = np.array(data)
+            else:
+                data = deepcopy(data)
+
         # quick-and-dirty way to check if a trajectory is "global" or per-bead
         # Checks to see if there is a list of files or just a single file.
         if hasattr(self.out, "__getitem__"):
             if self.ibead < 0:
-                for b in range(len(self.out)):
-                    if self.out[b] is not None:
-                        self.write_traj(
-                            data,
-                            self.what,
-                            self.out[b],
-                            b,
-                            format=self.format,
-                            dimension=dimension,
-                            units=units,
-                            cell_units=self.cell_units,
-                            flush=doflush,
-                        )
+                targets = [
+                    (self.what, self.out[b], b)
+                    for b in range(len(self.out))
+                    if self.out[b] is not None
+                ]
             elif self.ibead < len(self.out):
-                self.write_traj(
-                    data,
-                    self.what,
-                    self.out[self.ibead],
-                    self.ibead,
-                    format=self.format,
-                    dimension=dimension,
-                    units=units,
-                    cell_units=self.cell_units,
-                    flush=doflush,
-                )
+                targets = [(self.what, self.out[self.ibead], self.ibead)]
             else:
                 raise ValueError(
                     "Selected bead index "
@@ -504,16 +608,38 @@ class TrajectoryOutput(BaseOutput):
                     + self.what
                 )
         else:
+            targets = [(getkey(self.what), self.out, 0)]
+
+        self.submit(
+            self.write_frames, targets, data, dimension, units, doflush, step, h
+        )
+
+    def write_frames(self, targets, data, dimension, units, flush, step, h):
+        """Prints out the frames of a trajectory for one step.
+
+        Args:
+           targets: A list of (what, stream, bead index) tuples.
+           data: The trajectory data.
+           dimension: The dimension of the data.
+           units: The units the data should be printed in.
+           flush: Whether the output streams should be flushed to disk.
+           step: The step number printed in the frame title.
+           h: The cell matrix.
+        """
+
+        for what, stream, b in targets:
             self.write_traj(
                 data,
-                getkey(self.what),
-                self.out,
-                b=0,
+                what,
+                stream,
+                b,
                 format=self.format,
                 dimension=dimension,
                 units=units,
                 cell_units=self.cell_units,
-                flush=doflush,
+                flush=flush,
+                step=step,
+                h=h,
             )
 
     def write_traj(
@@ -527,6 +653,8 @@ class TrajectoryOutput(BaseOutput):
         units="automatic",
         cell_units="automatic",
         flush=True,
+        step=None,
+        h=None,
     ):
         """Prints out a frame of a trajectory for the specified quantity and bead.
 
@@ -538,19 +666,26 @@ class TrajectoryOutput(BaseOutput):
            cell_units: The units used to specify the cell parameters.
            flush: A boolean which specifies whether to flush the output buffer
               after each write to file or not.
+           step: The step number printed in the frame title. Defaults to the
+              current step of the simulation.
+           h: The cell matrix. Defaults to the current cell.
         """
 
+        if step is None:
+            step = self.system.simul.step + 1
+        if h is None:
+            h = self.system.cell.h
+
         key = getkey(what)
         if key in ["extras", "extras_component_raw", "extras_bias"]:
             if key == "extras_component_raw":
                 stream.write(
                     " #%s(%s)# Step:  %10d  Bead:  %5d  \n"
-                    % (key.upper(), self.extra_type, self.system.simul.step + 1, b)
+                    % (key.upper(), self.extra_type, step, b)
                 )
             else:
                 stream.write(
-                    " #%s(%s)# Step:  %10d \n"
-                    % (key.upper(), self.extra_type, self.system.simul.step + 1)
+                    " #%s(%s)# Step:  %10d \n" % (key.upper(), self.extra_type, step)
                 )
             if self.extra_type == "raw":
                 stream.write(str(data))
@@ -637,7 +772,7 @@ class TrajectoryOutput(BaseOutput):
             fatom.q[:] = data
 
         fcell = Cell()
-        fcell.h = self.system.cell.h
+        fcell.h = h
 
         if units == "":
             units = "automatic"
@@ -648,7 +783,7 @@ class TrajectoryOutput(BaseOutput):
             fatom,
             fcell,
             stream,
-            title=("Step:  %10d  Bead:   %5d " % (self.system.simul.step + 1, b)),
+            title=("Step:  %10d  Bead:   %5d " % (step, b)),
             key=key,
             dimension=dimension,
             units=units,
@@ -674,9 +809,13 @@ class CheckpointOutput:
           on whether 'filename_step' exists already.
        simul: The simulation object to get the data to be output from.
        status: An input simulation object used to write out the checkpoint file.
+       format: Either 'xml', to write all the data in the checkpoint file, or
+          'npy', to write the larger arrays as binary files.
     """
 
-    def __init__(self, filename="restart", stride=1000, overwrite=True, step=0):
+    def __init__(
+        self, filename="restart", stride=1000, overwrite=True, step=0, format="xml"
+    ):
         """Initializes a checkpoint output proxy.
 
         Args:
@@ -687,15 +826,22 @@ class CheckpointOutput:
               If False, will output to 'filename_step'. Note that no check is done
               on whether 'filename_step' exists already.
            step: The number of checkpoint files that have been created so far.
+           format: The format of the checkpoint, 'xml' or 'npy'.
         """
 
         self.filename = filename
         self.stride = stride
         self._step = depend_value(name="step", value=step)
         self.overwrite = overwrite
+        self.format = format
         self._storing = False
         self._continued = False
 
+        # state of the binary checkpoint writer
+        self._writer = None
+        self._error = None
+        self._written = {}
+
     def bind(self, simul):
         """Binds output proxy to simulation object.
 
@@ -709,6 +855,10 @@ class CheckpointOutput:
         self.status = isimulation.InputSimulation()
         self.status.store(simul)
 
+        if self.format == "npy":
+            # makes sure the last checkpoint is complete before exiting
+            softexit.register_function(self.flush)
+
     def active(self):
         """Whether we will output at this step"""
 
@@ -754,6 +904,10 @@ class CheckpointOutput:
         if not self.active():
             return
 
+        # trajectories and properties must be on disk before the checkpoint
+        if getattr(self.simul, "outqueue", None) is not None:
+            self.simul.outqueue.flush()
+
         # function to use to open files
         open_function = open_backup
 
@@ -770,13 +924,118 @@ class CheckpointOutput:
             self.store()
             self.status.step.store(self.simul.step + 1)
 
-        with open_function(filename, "w") as check_file:
-            info_string = get_identification_info_xml()
-            check_file.write(info_string + "\n")
-            check_file.write(self.status.write(name="simulation"))
+        if self.format == "npy":
+            self.write_npy(filename, open_function)
+        else:
+            with open_function(filename, "w") as check_file:
+                info_string = get_identification_info_xml()
+                check_file.write(info_string + "\n")
+                check_file.write(self.status.write(name="simulation"))
 
         # Do not use backed up file open on subsequent writes.
         self._continued = True
 
+    def write_npy(self, filename, open_function):
+        """Writes a checkpoint in which the larger arrays are saved as binary
+        .npy files in the directory self.filename + '_data', and referenced
+        from the XML file with mode='npy'.
+
+        An array file is only written again if the array has changed since the
+        last checkpoint. The files are written by a background thread, from
+        the arrays held by self.status, which are not modified in place by
+        later calls to store().
+
+        Args:
+           filename: The name of the XML checkpoint file.
+           open_function: The function used to open the XML file.
+        """
+
+        # waits for the previous checkpoint to be complete
+        self.flush()
+
+        datadir = self.filename + "_data"
+        os.makedirs(datadir, exist_ok=True)
+
+        previous = {fname for arr, fname in self._written.values()}
+        arrays = []
+        towrite = []
+        for path, arr in _input_arrays(self.status):
+            if arr.value is None or np.size(arr.value) < NPY_MINSIZE:
+                continue
+            last = self._written.get(path)
+            if (
+                last is not None
+                and last[0].dtype == arr.value.dtype
+                and np.array_equal(last[0], arr.value)
+            ):
+                fname = last[1]
+            else:
+                fname = os.path.join(datadir, "%s_%d.npy" % (path, self.step))
+                towrite.append((fname, arr.value))
+                self._written[path] = (arr.value, fname)
+            arrays.append((arr, fname))
+
+        for arr, fname in arrays:
+            arr.mode.store("npy")
+            arr._text = fname
+        try:
+            xml = get_identification_info_xml() + "\n"
+            xml += self.status.write(name="simulation")
+        finally:
+            for arr, fname in arrays:
+                arr.mode.store("manual")
+
+        current = {fname for arr, fname in arrays}
+        stale = previous - current
+        self._written = {k: v for k, v in self._written.items() if v[1] in current}
+
+        def dump():
+            try:
+                for fname, value in towrite:
+                    np.save(fname, value)
+                with open_function(filename, "w") as check_file:
+                    check_file.write(xml)
+                if self.overwrite:
+                    # files that were only referenced by the previous checkpoint
+                    for fname in stale:
+                        if os.path.exists(fname):
+                            os.remove(fname)
+            except Exception as err:
+                self._error = err
+
+        self._writer = threading.Thread(target=dump, name="checkpoint")
+        self._writer.start()
+
+    def flush(self):
+        """Waits until the checkpoint that is being written in the background
+        has been completed."""
+
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        if self._error is not None:
+            err, self._error = self._error, None
+            raise err
+
 
 dproperties(CheckpointOutput, ["step"])
+
+# arrays smaller than this are written in the XML file also for npy checkpoints
+NPY_MINSIZE = 100
+
+
+def _input_arrays(inp, path=""):
+    """Iterates over all the InputArray objects contained in an Input object,
+    yielding (path, array) pairs. The path is built from the tag names,
+    adding the index in the list of dynamic fields for repeated tags."""
+
+    if isinstance(inp, InputArray):
+        yield path, inp
+        return
+    prefix = path + "." if path != "" else ""
+    for f in inp.instancefields:
+        yield from _input_arrays(inp.__dict__[f], prefix + f)
+    count = {}
+    for f, v in inp.extra:
+        count[f] = count.get(f, -1) + 1
+        yield from _input_arrays(v, prefix + f + str(count[f]))
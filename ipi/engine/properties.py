@@ -218,6 +218,8 @@ class Properties:
           estimator.
        dforces: A dummy Forces object used in the Yamamoto kinetic energy
           estimator.
+       _DISPLACED_CHUNK: The largest number of displaced copies of the system
+          whose forces are requested at once by the per-atom estimators.
        system: The System object containing the data to be output.
        ensemble: An ensemble object giving the objects necessary for producing
           the correct ensemble.
@@ -233,6 +235,7 @@ class Properties:
     _DEFAULT_FINDIFF = 1e-4
     _DEFAULT_FDERROR = 1e-5
     _DEFAULT_MINFID = 1e-8
+    _DISPLACED_CHUNK = 64
 
     def __init__(self):
         """Initialises Properties."""
@@ -984,6 +987,7 @@ class Properties:
         self.dbeads = system.beads.clone()
         self.dcell = system.cell.clone()
         self.dforces = system.forces.clone(self.dbeads, self.dcell)
+        self._dclones = []  # more dummy beads and forces, see displaced_forces
         self.fqref = None
         self._threadlock = (
             system._propertylock
@@ -1938,6 +1942,41 @@ class Properties:
 
         return kst
 
+    def displaced_forces(self, qlist):
+        """Computes the forces for several displaced copies of the beads.
+
+        Each configuration is assigned to a separate clone of the beads and of
+        the forces, and the force requests for up to _DISPLACED_CHUNK of them
+        are queued before waiting for any result, so that they can be evaluated
+        in parallel by the connected clients.
+
+        Args:
+           qlist: An iterable of (nbeads, 3*natoms) arrays of displaced positions.
+
+        Yields:
+           A (beads, forces) pair for each configuration, in order. The objects
+           are reused for the next chunk, so results should be read right away.
+        """
+
+        self.dcell.h = self.cell.h
+        qlist = iter(qlist)
+        while True:
+            chunk = []
+            for q in qlist:
+                if len(chunk) == len(self._dclones):
+                    dbeads = self.beads.clone()
+                    dforces = self.forces.clone(dbeads, self.dcell)
+                    self._dclones.append((dbeads, dforces))
+                dbeads, dforces = self._dclones[len(chunk)]
+                dbeads.q = q
+                dforces.queue()
+                chunk.append((dbeads, dforces))
+                if len(chunk) == self._DISPLACED_CHUNK:
+                    break
+            if len(chunk) == 0:
+                return
+            yield from chunk
+
     def opening(self, bead):
         """Path opening function, used in linlin momentum distribution
         estimator.
@@ -1983,15 +2022,22 @@ class Properties:
         nb = self.beads.nbeads
         nx_tot = 0.0
         ncount = 0
-        for i in range(nat):
-            if atom != "" and iatom != i and latom != self.beads.names[i]:
-                continue
-
+        atoms = [
+            i
+            for i in range(nat)
+            if atom == "" or iatom == i or latom == self.beads.names[i]
+        ]
+        shift = np.outer([self.opening(b) for b in range(nb)], u)
+
+        def displaced():
+            for i in atoms:
+                dq = q.copy()
+                dq[:, 3 * i : 3 * (i + 1)] += shift
+                yield dq
+
+        for i, (dbeads, dforces) in zip(atoms, self.displaced_forces(displaced())):
             mass = self.beads.m[i]
-            self.dbeads.q[:] = q
-            for b in range(nb):
-                self.dbeads.q[b, 3 * i : 3 * (i + 1)] += self.opening(b) * u
-            dV = self.dforces.pot - self.forces.pot
+            dV = dforces.pot - self.forces.pot
 
             n0 = np.exp(-mass * u_size / (2.0 * beta * Constants.hbar**2))
             nx_tot += n0 * np.exp(-dV * beta / float(self.beads.nbeads))
@@ -2251,35 +2297,35 @@ class Properties:
         #        f = dstrip(self.forces.f)
         qc = dstrip(self.beads.qc)
 
-        for i in range(self.beads.natoms):
-            # selects only the atoms we care about
-            if atom != "" and iatom != i and latom != self.beads.names[i]:
-                continue
-
+        # selects only the atoms we care about
+        atoms = [
+            i
+            for i in range(self.beads.natoms)
+            if atom == "" or iatom == i or latom == self.beads.names[i]
+        ]
+
+        def displaced():
+            # arranges coordinate-scaled beads for each atom
+            for i in atoms:
+                dq = q.copy()
+                dq[:, 3 * i : 3 * (i + 1)] = qc[3 * i : 3 * (i + 1)] + np.sqrt(
+                    1.0 / alpha
+                ) * (q[:, 3 * i : 3 * (i + 1)] - qc[3 * i : 3 * (i + 1)])
+                yield dq
+
+        for i, (dbeads, dforces) in zip(atoms, self.displaced_forces(displaced())):
             ni += 1
 
-            # arranges coordinate-scaled beads in a auxiliary beads object
-            self.dbeads.q[:] = q[:]
-            for b in range(self.beads.nbeads):
-                self.dbeads.q[b, 3 * i : 3 * (i + 1)] = qc[
-                    3 * i : 3 * (i + 1)
-                ] + np.sqrt(1.0 / alpha) * (
-                    q[b, 3 * i : 3 * (i + 1)] - qc[3 * i : 3 * (i + 1)]
-                )
-
             tcv = 0.0
             for b in range(self.beads.nbeads):
                 tcv += np.dot(
-                    (
-                        self.dbeads.q[b, 3 * i : 3 * (i + 1)]
-                        - self.dbeads.qc[3 * i : 3 * (i + 1)]
-                    ),
-                    self.dforces.f[b, 3 * i : 3 * (i + 1)],
+                    (dbeads.q[b, 3 * i : 3 * (i + 1)] - dbeads.qc[3 * i : 3 * (i + 1)]),
+                    dforces.f[b, 3 * i : 3 * (i + 1)],
                 )
             tcv *= -0.5 / self.beads.nbeads
             tcv += 1.5 * Constants.kb * self.ensemble.temp
 
-            logr = (self.dforces.pot - self.forces.pot) / (
+            logr = (dforces.pot - self.forces.pot) / (
                 Constants.kb * self.ensemble.temp * self.beads.nbeads
             )
 
@@ -2538,22 +2584,27 @@ class Properties:
         qc = dstrip(self.beads.qc)
         q = dstrip(self.beads.q)
         v0 = self.forces.pot
-        self.dbeads.q = q
 
-        for i in range(self.beads.natoms):
-            # selects only the atoms we care about
-            if atom != "" and iatom != i and latom != self.beads.names[i]:
-                continue
+        # selects only the atoms we care about
+        atoms = [
+            i
+            for i in range(self.beads.natoms)
+            if atom == "" or iatom == i or latom == self.beads.names[i]
+        ]
+
+        def displaced():
+            for i in atoms:
+                dq = q.copy()
+                dq[:, 3 * i : 3 * (i + 1)] = (
+                    qc[3 * i : 3 * (i + 1)] * (1.0 - scalefactor)
+                    + scalefactor * q[:, 3 * i : 3 * (i + 1)]
+                )
+                yield dq
 
+        for dbeads, dforces in self.displaced_forces(displaced()):
             ni += 1
 
-            for b in range(self.beads.nbeads):
-                for j in range(3 * i, 3 * (i + 1)):
-                    self.dbeads.q[b, j] = (
-                        qc[j] * (1.0 - scalefactor) + scalefactor * q[b, j]
-                    )
-
-            sc = self.dforces.pot - v0
+            sc = dforces.pot - v0
             sc2 = sc * sc
             scexp = np.exp(-betaP * sc)
 
@@ -2561,8 +2612,6 @@ class Properties:
             sc2sum += sc2
             scexpsum += scexp
 
-            self.dbeads.q = q
-
         if ni == 0:
             raise IndexError(
                 "Couldn't find an atom which matched the argument of isotope_zetasc"
@@ -2739,29 +2788,34 @@ class Properties:
         v0 = self.forces.pot
         pots = self.forces.pots
 
-        for i in range(self.beads.natoms):
-            # selects only the atoms we care about
-            if atom != "" and iatom != i and latom != self.beads.names[i]:
-                continue
-
-            ni += 1
+        # selects only the atoms we care about
+        atoms = [
+            i
+            for i in range(self.beads.natoms)
+            if atom == "" or iatom == i or latom == self.beads.names[i]
+        ]
 
-            self.dbeads.q[:] = q
+        def displaced():
             # shifts beads positions
-            for b in range(self.beads.nbeads):
-                for j in range(3 * i, 3 * (i + 1)):
-                    self.dbeads.q[b, j] = (
-                        qc[j] * (1.0 - scalefactor) + scalefactor * q[b, j]
-                    )
+            for i in atoms:
+                dq = q.copy()
+                dq[:, 3 * i : 3 * (i + 1)] = (
+                    qc[3 * i : 3 * (i + 1)] * (1.0 - scalefactor)
+                    + scalefactor * q[:, 3 * i : 3 * (i + 1)]
+                )
+                yield dq
+
+        for i, (dbeads, dforces) in zip(atoms, self.displaced_forces(displaced())):
+            ni += 1
 
             # computes the potential term in the scaled coordinates estimator
-            sc = self.dforces.pot - v0
+            sc = dforces.pot - v0
 
             # this is the extra correction from Suzuki-Chin terms in the hamiltonian.
             # first, the part with |F(q)|^2. this is the scaled-coordinates F with mass m'
             # minus the original coordinates with mass m
-            df = dstrip(self.dforces.f)
-            dpots = self.dforces.pots
+            df = dstrip(dforces.f)
+            dpots = dforces.pots
 
             # Suzuki-Chin correction
             chin = 0.0
@@ -2793,7 +2847,6 @@ class Properties:
             chinexpsum += chinexp
             tiexpsum += tiexp
 
-        self.dbeads.q[:] = q[:]
         if ni == 0:
             raise IndexError(
                 "Couldn't find an atom which matched the argument of isotope_zetasc"
@@ -15,11 +15,12 @@ import os
 import time
 from copy import deepcopy
 
-from ipi.utils.depend import depend_value, dpipe, dproperties
+from ipi.utils.depend import depend_value, dpipe, dproperties, dfreeze
 from ipi.utils.io.inputs.io_xml import xml_parse_file, xml_parse_string, xml_write
 from ipi.utils.io.inputs.io_json import json_parse_file, json_parse_string
 from ipi.utils.messages import verbosity, info, warning, banner
 from ipi.utils.softexit import softexit
+from ipi.utils.tracing import request_tracer
 import ipi.engine.outputs as eoutputs
 import ipi.inputs.simulation as isimulation
 import threading
@@ -159,6 +160,7 @@ class Simulation:
         threads=False,
         safe_stride=1,
         sockets_prefix="ipi_",
+        freeze_graph=False,
     ):
         """Initialises Simulation class.
 
@@ -175,6 +177,8 @@ class Simulation:
                 to 1000.
             ttime: The simulation running time. Used on restart, to keep a
                 cumulative total.
+            freeze_graph: Whether taints should be propagated through flattened
+                lists of dependants once the simulation is bound.
         """
 
         info(" @simulation: Initializing simulation object ", verbosity.low)
@@ -182,6 +186,7 @@ class Simulation:
         self.mode = mode
         self.threading = threads
         self.safe_stride = safe_stride
+        self.freeze_graph = freeze_graph
         self.sockets_prefix = sockets_prefix
 
         self.syslist = syslist
@@ -215,6 +220,7 @@ class Simulation:
         self.smotion = smotion
 
         self.chk = None
+        self.outqueue = None
         self.rollback = True
 
     def bind(self, read_only=False):
@@ -259,6 +265,9 @@ class Simulation:
                 "Output filenames are not unique. Modify filename attributes."
             )
 
+        if self.outtemplate.queue > 0:
+            self.outqueue = eoutputs.OutputQueue(self.outtemplate.queue)
+
         self.outputs = []
         for o in self.outtemplate:
             dco = deepcopy(o)  # avoids overwriting the actual filename
@@ -279,6 +288,7 @@ class Simulation:
                     if s.prefix != "":
                         no.filename = s.prefix + "_" + no.filename
                     no.bind(s, mode)
+                    no.writer = self.outqueue
                     self.outputs.append(no)
                     if f_start:  # starting of simulation, print headers (if any)
                         no.print_header()
@@ -295,6 +305,10 @@ class Simulation:
         if self.smotion is not None:
             self.smotion.bind(self.syslist, self.prng, self.output_maker)
 
+        # the dependency graph is complete at this point
+        if self.freeze_graph:
+            dfreeze()
+
         # registers the softexit routine
         softexit.register_function(self.softexit)
         softexit.start(self.ttime)
@@ -319,6 +333,8 @@ class Simulation:
             self.chk.store()
 
         self.chk.write(store=False)
+        # waits for the checkpoint to be on disk, and reports any error
+        self.chk.flush()
 
     def run(self, write_outputs=True):
         """Runs the simulation.
@@ -362,6 +378,7 @@ class Simulation:
             steptime = -time.time()
             if softexit.triggered:
                 break
+            request_tracer.step = self.step
 
             # save a consistent state of the simulation that will be saved as a RESTART file in case of premature (soft) exit
             if self.step % self.safe_stride == 0:
@@ -425,6 +442,9 @@ class Simulation:
                 )
                 break
 
+        if self.outqueue is not None:
+            self.outqueue.flush()
+
         self.rollback = False
 
     def run_step(self, step):
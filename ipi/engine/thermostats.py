@@ -34,6 +34,31 @@ __all__ = [
 ]
 
 
+# number of elements processed at once by the fused thermostat steps, so
+# that the buffers stay in cache
+_FUSED_TILE = 32768
+
+
+def _tiles(nrows, ncols, size=_FUSED_TILE):
+    """Splits a nrows x ncols array into blocks of about size elements.
+
+    Blocks are made of whole rows if the rows are short, and of pieces of a
+    single row otherwise.
+
+    Returns:
+       A list of (rows, columns) tuples of slices.
+    """
+
+    if ncols >= size:
+        return [
+            (slice(r, r + 1), slice(c, min(c + size, ncols)))
+            for r in range(nrows)
+            for c in range(0, ncols, size)
+        ]
+    k = size // ncols
+    return [(slice(r, min(r + k, nrows)), slice(0, ncols)) for r in range(0, nrows, k)]
+
+
 class Thermostat:
     """Base thermostat class.
 
@@ -44,6 +69,10 @@ class Thermostat:
        prng: A pseudo random number generator object.
        ndof: The number of degrees of freedom that the thermostat will be
           attached to.
+       fused: Whether the step should update all the degrees of freedom in a
+          single pass, using preallocated buffers. Only used by the
+          thermostats that act on many independent sets of momenta (PILE and
+          GLE), and otherwise ignored.
 
     Depend objects:
        dt: The time step used in the algorithms. Depends on the simulation dt.
@@ -70,6 +99,7 @@ class Thermostat:
         self._temp = depend_value(name="temp", value=temp)
         self._dt = depend_value(name="dt", value=dt)
         self._ethermo = depend_value(name="ethermo", value=ethermo)
+        self.fused = False
 
     def bind(
         self,
@@ -350,6 +380,7 @@ class ThermoPILE_L(Thermostat):
             self.prng = prng
 
         prev_ethermo = self.ethermo
+        self._fp = None  # fused_step buffers, created on first use
 
         # creates a set of thermostats to be applied to individual normal modes
         self._thermos = [ThermoLangevin(temp=1, dt=1, tau=1) for b in range(nm.nbeads)]
@@ -449,12 +480,100 @@ class ThermoPILE_L(Thermostat):
     def step(self):
         """Updates the bound momentum vector with a PILE thermostat."""
 
+        if self.fused:
+            self.fused_step()
+            return
+
         # super-cool! just loop over the thermostats! it's as easy as that!
         for t in self._thermos:
             t.step()
 
+    def bind_fused(self):
+        """Creates the buffers and the stacked coefficients used by
+        fused_step. The normal modes that are not attached to a Langevin
+        thermostat (i.e. the centroid in PILE_G) are left to their own
+        thermostat."""
 
-dproperties(ThermoPILE_L, ["tau", "pilescale", "pilect", "npilect", "tauk"])
+        self._flangevin = [type(t) is ThermoLangevin for t in self._thermos]
+        rows = [b for b, fl in enumerate(self._flangevin) if fl]
+        if len(rows) > 0:
+            self._frows = slice(rows[0], rows[-1] + 1)
+        else:
+            self._frows = slice(0, 0)
+        lthermos = self._thermos[self._frows]
+
+        self._fT = depend_array(
+            name="fT",
+            value=np.zeros((len(lthermos), 1)),
+            func=lambda: np.array([t.T for t in lthermos])[:, np.newaxis],
+            dependencies=[t._T for t in lthermos],
+        )
+        self._fS = depend_array(
+            name="fS",
+            value=np.zeros((len(lthermos), 1)),
+            func=lambda: np.array([t.S for t in lthermos])[:, np.newaxis],
+            dependencies=[t._S for t in lthermos],
+        )
+        self._fsm = depend_array(
+            name="fsm",
+            value=np.zeros((len(lthermos), 3 * self.nm.natoms)),
+            func=lambda: np.sqrt(dstrip(self.nm.dynm3)[self._frows]),
+            dependencies=[self.nm._dynm3],
+        )
+        self._ftiles = _tiles(len(lthermos), 3 * self.nm.natoms)
+        self._fp = np.zeros(_FUSED_TILE)
+        self._fnoise = np.zeros((len(lthermos), 3 * self.nm.natoms))
+
+    def fused_step(self):
+        """Applies the Langevin thermostats to all the normal modes at once.
+
+        Equivalent to calling step for each of the thermostats in turn, and
+        draws the same random numbers when the generator is not threaded,
+        but draws them with a single call, and then goes through the
+        momenta in blocks that fit in cache, without creating temporary
+        arrays. The heat exchanged with the bath is accumulated on the
+        first Langevin thermostat.
+        """
+
+        if self._fp is None:
+            self.bind_fused()
+
+        # other thermostats (the PILE_G centroid) come first, as in step
+        for t, fl in zip(self._thermos, self._flangevin):
+            if not fl:
+                t.step()
+
+        pnm = dstrip(self.nm.pnm)[self._frows]
+        sm = dstrip(self.fsm)
+        T = dstrip(self.fT)
+        S = dstrip(self.fS)
+        noise = self._fnoise
+        self.prng.gfill(noise)
+
+        # damps the mass-scaled momenta and adds the noise, keeping track
+        # of the change in kinetic energy
+        deltah = 0.0
+        for rows, cols in self._ftiles:
+            smb = sm[rows, cols]
+            p = self._fp[: smb.size].reshape(smb.shape)
+            np.divide(pnm[rows, cols], smb, out=p)
+            deltah += np.vdot(p, p)
+            p *= T[rows]
+            nb = noise[rows, cols]
+            nb *= S[rows]
+            p += nb
+            deltah -= np.vdot(p, p)
+            np.multiply(p, smb, out=pnm[rows, cols])
+
+        # pnm has been changed in place, so must be marked as modified
+        self.nm._pnm.update_man()
+        self.nm._pnm.taint(taintme=False)
+        self._thermos[self._frows.start].ethermo += deltah * 0.5
+
+
+dproperties(
+    ThermoPILE_L, ["tau", "pilescale", "pilect", "npilect", "tauk", "fT", "fS", "fsm"]
+)
 
 
 class ThermoSVR(Thermostat):
@@ -761,6 +880,8 @@ class ThermoGLE(Thermostat):
         super(ThermoGLE, self).bind(
             beads=beads, atoms=atoms, pm=pm, prng=prng, fixdof=fixdof
         )
+        self._fs = None  # fused_step buffers, created on first use
+        self._fnoise = np.zeros(0)
 
         # allocates, initializes or restarts an array of s's
         if self.s.shape != (self.ns + 1, len(self._m)):
@@ -784,6 +905,10 @@ class ThermoGLE(Thermostat):
     def step(self):
         """Updates the bound momentum vector with a GLE thermostat"""
 
+        if self.fused:
+            self.fused_step()
+            return
+
         self.s[0, :] = self.p / self.sm
 
         self.ethermo += np.dot(self.s[0], self.s[0]) * 0.5
@@ -794,6 +919,45 @@ class ThermoGLE(Thermostat):
 
         self.p = self.s[0] * self.sm
 
+    def fused_step(self):
+        """Updates the bound momentum vector with a GLE thermostat, working
+        in place on s, in blocks that fit in cache."""
+
+        if self._fs is None or self._fnoise.shape != self.s.shape:
+            size = max(_FUSED_TILE // (self.ns + 1), 1)
+            self._ftiles = [c for _, c in _tiles(1, self.s.shape[1], size)]
+            self._fs = np.zeros(size * (self.ns + 1))
+            self._fx = np.zeros(size)
+            self._fnoise = np.zeros_like(self.s)
+
+        p = dstrip(self.p)
+        sm = dstrip(self.sm)
+        T = self.T
+        S = self.S
+        noise = self._fnoise
+        self.prng.gfill(noise)
+
+        deltah = 0.0
+        for cols in self._ftiles:
+            sb = self.s[:, cols]
+            smb = sm[cols]
+            x = self._fx[: smb.size]
+            fs = self._fs[: sb.size].reshape(sb.shape)
+            np.divide(p[cols], smb, out=x)
+            deltah += np.vdot(x, x)
+            sb[0] = x
+            np.matmul(T, sb, out=fs)
+            np.matmul(S, noise[:, cols], out=sb)
+            sb += fs
+            x[:] = sb[0]
+            deltah -= np.vdot(x, x)
+            np.multiply(x, smb, out=p[cols])
+
+        # p has been changed in place, so must be marked as modified
+        self._p.update_man()
+        self._p.taint(taintme=False)
+        self.ethermo += deltah * 0.5
+
 
 dproperties(ThermoGLE, ["A", "C", "T", "S"])
 
@@ -933,6 +1097,8 @@ class ThermoNMGLE(Thermostat):
             info("GLE additional DOFs initialised from input.", verbosity.medium)
 
         prev_ethermo = self.ethermo
+        self.nm = nm
+        self._fs = None  # fused_step buffers, created on first use
 
         # creates a set of thermostats to be applied to individual normal modes
         self._thermos = [
@@ -979,9 +1145,88 @@ class ThermoNMGLE(Thermostat):
         individual DOFs.
         """
 
+        if self.fused:
+            self.fused_step()
+            return
+
         for t in self._thermos:
             t.step()
 
+    def bind_fused(self):
+        """Creates the buffers and the stacked drift and noise matrices used
+        by fused_step."""
+
+        gthermos = self._thermos[: self.nb]
+        self._fT = depend_array(
+            name="fT",
+            value=np.zeros((self.nb, self.ns + 1, self.ns + 1)),
+            func=lambda: np.array([t.T for t in gthermos]),
+            dependencies=[t._T for t in gthermos],
+        )
+        self._fS = depend_array(
+            name="fS",
+            value=np.zeros((self.nb, self.ns + 1, self.ns + 1)),
+            func=lambda: np.array([t.S for t in gthermos]),
+            dependencies=[t._S for t in gthermos],
+        )
+        self._fsm = depend_array(
+            name="fsm",
+            value=np.zeros((self.nb, 3 * self.nm.natoms)),
+            func=lambda: np.sqrt(dstrip(self.nm.dynm3)),
+            dependencies=[self.nm._dynm3],
+        )
+        size = max(_FUSED_TILE // (self.ns + 1), 1)
+        self._ftiles = _tiles(self.nb, 3 * self.nm.natoms, size)
+        self._fs = np.zeros(size * (self.ns + 1))
+        self._fx = np.zeros(size)
+        self._fnoise = np.zeros_like(self.s)
+
+    def fused_step(self):
+        """Applies the GLE thermostats to all the normal modes at once.
+
+        Equivalent to calling step for each of the thermostats in turn, and
+        draws the same random numbers when the generator is not threaded,
+        but draws them with a single call, and then propagates the modes in
+        blocks that fit in cache, without creating temporary arrays. The
+        heat exchanged with the bath is accumulated on the first GLE
+        thermostat.
+        """
+
+        if self._fs is None:
+            self.bind_fused()
+
+        pnm = dstrip(self.nm.pnm)
+        sm = dstrip(self.fsm)
+        T = dstrip(self.fT)
+        S = dstrip(self.fS)
+        noise = self._fnoise
+        self.prng.gfill(noise)
+
+        deltah = 0.0
+        for rows, cols in self._ftiles:
+            sb = self.s[rows, :, cols]
+            smb = sm[rows, cols]
+            x = self._fx[: smb.size].reshape(smb.shape)
+            fs = self._fs[: sb.size].reshape(sb.shape)
+            np.divide(pnm[rows, cols], smb, out=x)
+            deltah += np.vdot(x, x)
+            sb[:, 0] = x
+            np.matmul(T[rows], sb, out=fs)
+            np.matmul(S[rows], noise[rows, :, cols], out=sb)
+            sb += fs
+            x[:] = sb[:, 0]
+            deltah -= np.vdot(x, x)
+            np.multiply(x, smb, out=pnm[rows, cols])
+
+        # pnm has been changed in place, so must be marked as modified
+        self.nm._pnm.update_man()
+        self.nm._pnm.taint(taintme=False)
+        self._thermos[0].ethermo += deltah * 0.5
+
+        # any other thermostat (the centroid SVR in NMGLEG) comes last
+        for t in self._thermos[self.nb :]:
+            t.step()
+
     def get_ethermo(self):
         """Computes the total energy transferred to the heat bath for all the nm
         thermostats.
@@ -993,7 +1238,7 @@ class ThermoNMGLE(Thermostat):
         return et
 
 
-dproperties(ThermoNMGLE, ["A", "C", "T", "S"])
+dproperties(ThermoNMGLE, ["A", "C", "T", "S", "fT", "fS", "fsm"])
 
 
 class ThermoNMGLEG(ThermoNMGLE):
@@ -22,6 +22,7 @@ from ipi.engine.forcefields import (
     FFCavPhSocket,
     FFRotations,
 )
+from ipi.engine.forcecache import ForceCache
 from ipi.interfaces.sockets import InterfaceSocket
 from ipi.pes import __drivers__
 import ipi.engine.initializer
@@ -63,6 +64,9 @@ class InputForceField(Input):
        latency: The number of seconds to sleep between looping over the requests.
        parameters: A dictionary containing the forcefield parameters.
        activelist: A list of indexes (starting at 0) of the atoms that will be active in this force field.
+       cache_size: The number of results kept in a memory cache.
+       cache_tolerance: The tolerance used to match cached configurations.
+       cache_file: A file in which results are stored persistently.
     """
 
     attribs = {
@@ -121,6 +125,31 @@ class InputForceField(Input):
                 "help": "List with indexes of the atoms that this socket is taking care of.    Default: [-1] (corresponding to all)",
             },
         ),
+        "cache_size": (
+            InputValue,
+            {
+                "dtype": int,
+                "default": 0,
+                "help": "The number of results kept in memory, so that configurations that have already been evaluated (e.g. after a rejected step of an optimizer) are not computed again. 0 disables the in-memory cache.",
+            },
+        ),
+        "cache_tolerance": (
+            InputValue,
+            {
+                "dtype": float,
+                "default": 0.0,
+                "dimension": "length",
+                "help": "Positions and cell are rounded on a grid with this spacing before looking them up in the cache. If 0, only identical configurations are matched.",
+            },
+        ),
+        "cache_file": (
+            InputValue,
+            {
+                "dtype": str,
+                "default": "",
+                "help": "A file in which all the computed results are stored, and that is read back when i-PI starts, so that results can be reused across runs. Results are tagged with the name of the forcefield, so a file can be shared by different forcefields. Can be used with or without an in-memory cache.",
+            },
+        ),
     }
 
     default_help = "Base forcefield class that deals with the assigning of force calculation jobs and collecting the data."
@@ -141,6 +170,28 @@ class InputForceField(Input):
         self.pbc.store(ff.dopbc)
         self.activelist.store(ff.active)
         self.threaded.store(ff.threaded)
+        if ff.cache is not None:
+            self.cache_size.store(ff.cache.size)
+            self.cache_tolerance.store(ff.cache.tolerance)
+            self.cache_file.store(ff.cache.filename)
+
+    def fetch_cache(self, ff):
+        """Attaches to ff a cache of its results, if one has been requested,
+        and returns it.
+
+        Args:
+           ff: A ForceField object created by the fetch method.
+        """
+
+        if self.cache_size.fetch() > 0 or self.cache_file.fetch() != "":
+            ff.set_cache(
+                ForceCache(
+                    size=self.cache_size.fetch(),
+                    tolerance=self.cache_tolerance.fetch(),
+                    filename=self.cache_file.fetch(),
+                )
+            )
+        return ff
 
     _FFCLASS = ForceField
 
@@ -240,6 +291,27 @@ class InputFFSocket(InputForceField):
                 strictly follow the base protocol.""",
             },
         ),
+        "event_driven": (
+            InputValue,
+            {
+                "dtype": bool,
+                "default": False,
+                "help": """If True, the polling thread waits on socket readiness events (new clients, results,
+                newly queued requests) instead of sleeping `latency` seconds between polls. Dispatches requests
+                as soon as a client becomes free, and always uses consolidated messages.""",
+            },
+        ),
+        "speculative": (
+            InputValue,
+            {
+                "dtype": bool,
+                "default": False,
+                "help": """If True, clients that would otherwise sit idle until the end of a step are sent a copy of
+                the running requests they are expected to complete sooner than the client they were assigned to,
+                based on the timings of previous steps. The first result that arrives is used. Useful when the clients
+                run on hardware of different speed. Requires consolidated messages.""",
+            },
+        ),
     }
     attribs = {
         "mode": (
@@ -255,9 +327,9 @@ class InputFFSocket(InputForceField):
             InputAttribute,
             {
                 "dtype": str,
-                "options": ["auto", "any", "lock"],
+                "options": ["auto", "any", "lock", "cost"],
                 "default": "auto",
-                "help": "Specifies whether requests should be dispatched to any client, automatically matched to the same client when possible [auto] or strictly forced to match with the same client [lock].",
+                "help": "Specifies whether requests should be dispatched to any client, automatically matched to the same client when possible [auto], strictly forced to match with the same client [lock], or assigned based on the time they took to evaluate in previous steps, sending the most expensive requests to the fastest clients [cost].",
             },
         ),
     }
@@ -301,6 +373,8 @@ class InputFFSocket(InputForceField):
         self.exit_on_disconnect.store(ff.socket.exit_on_disconnect)
         self.max_workers.store(ff.socket.max_workers)
         self.consolidate_messages.store(ff.socket.consolidate_messages)
+        self.event_driven.store(ff.socket.event_driven)
+        self.speculative.store(ff.socket.speculative)
         self.threaded.store(True)  # hard-coded
 
     def fetch(self):
@@ -340,6 +414,8 @@ class InputFFSocket(InputForceField):
                 max_workers=self.max_workers.fetch(),
                 exit_on_disconnect=self.exit_on_disconnect.fetch(),
                 consolidate_messages=self.consolidate_messages.fetch(),
+                event_driven=self.event_driven.fetch(),
+                speculative=self.speculative.fetch(),
             ),
         )
 
@@ -967,7 +1043,7 @@ class InputFFCommittee(InputForceField):
 
         fflist = []
         for k, v in self.extra:
-            fflist.append(v.fetch())
+            fflist.append(v.fetch_cache(v.fetch()))
 
         # TODO: will actually need to create a FF object here!
         return FFCommittee(
@@ -1099,8 +1175,8 @@ input file.
             active=self.activelist.fetch(),
             threaded=self.threaded.fetch(),
             prng=self.prng.fetch(),
-            ffsocket=self.ffsocket.fetch(),
-            ffdirect=self.ffdirect.fetch(),
+            ffsocket=self.ffsocket.fetch_cache(self.ffsocket.fetch()),
+            ffdirect=self.ffdirect.fetch_cache(self.ffdirect.fetch()),
             grid_order=self.grid_order.fetch(),
             grid_mode=self.grid_mode.fetch(),
             random=self.random.fetch(),
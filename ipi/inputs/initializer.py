@@ -159,11 +159,12 @@ class InputInitFile(InputInitBase):
 
     attribs = deepcopy(InputInitBase.attribs)
     attribs["mode"][1]["default"] = "chk"
-    attribs["mode"][1]["options"] = ["xyz", "pdb", "chk", "ase"]
+    attribs["mode"][1]["options"] = ["xyz", "pdb", "chk", "ase", "ipb"]
     attribs["mode"][1][
         "help"
     ] = """The input data format. 'xyz' and 'pdb' stand for xyz and pdb input files respectively. 
-        'chk' stands for initialization from a checkpoint file. 'ase' is to read a file with the Atomic Simulation Environment"""
+        'chk' stands for initialization from a checkpoint file. 'ase' is to read a file with the Atomic Simulation Environment.
+        'ipb' reads a binary trajectory written with format 'ipb' or 'ipb32'"""
 
     attribs["bead"] = (
         InputAttribute,
@@ -501,9 +502,10 @@ class InputInitializer(Input):
                     or mode == "pdb"
                     or mode == "chk"
                     or mode == "ase"
+                    or mode == "ipb"
                 ):
                     initlist.append(("positions", v.fetch(initclass=ei.InitIndexed)))
-                if mode == "xyz" or mode == "pdb" or mode == "chk" or mode == "ase":
+                if mode in ["xyz", "pdb", "chk", "ase", "ipb"]:
                     rm = v.fetch(initclass=ei.InitIndexed)
                     rm.units = ""
                     initlist.append(("masses", rm))
@@ -186,7 +186,9 @@ class InputMotionBase(Input):
                 "the provided pattern. Bead indices will be read from the files, "
                 "and the files will be ordered ascendingly by their bead indices. "
                 "Wildcarded files are expected to be in the folder "
-                "where the simulation runs.",
+                "where the simulation runs. For XYZ, PDB and ipb files, the position "
+                "of the frames is saved in 'filename'.idx.npz, so that "
+                "restarted runs can jump directly to the right frame.",
             },
         ),
         "vibrations": (
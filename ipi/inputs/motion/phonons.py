@@ -88,6 +88,14 @@ class InputDynMatrix(InputDictionary):
                 "help": "Removes the zero frequency vibrational modes depending on the symmerty of the system.",
             },
         ),
+        "batch": (
+            InputValue,
+            {
+                "dtype": int,
+                "default": 1,
+                "help": "Number of degrees of freedom that are displaced at the same time (fd mode only). The 2*batch displaced structures are evaluated in parallel, which is useful when several clients are connected.",
+            },
+        ),
         "dynmat": (
             InputArray,
             {
@@ -104,6 +112,14 @@ class InputDynMatrix(InputDictionary):
                 "help": "Portion of the refined dynamical matrix known up to now.",
             },
         ),
+        "done": (
+            InputArray,
+            {
+                "dtype": bool,
+                "default": np.zeros(0, bool),
+                "help": "Which rows of the dynamical matrix have been computed up to now.",
+            },
+        ),
     }
 
     dynamic = {}
@@ -120,8 +136,10 @@ class InputDynMatrix(InputDictionary):
         self.output_shift.store(phonons.deltaw)
         self.prefix.store(phonons.prefix)
         self.asr.store(phonons.asr)
+        self.batch.store(phonons.batch)
         self.dynmat.store(phonons.dynmatrix)
         self.refdynmat.store(phonons.refdynmatrix)
+        self.done.store(phonons.done)
 
     def fetch(self):
         rv = super(InputDynMatrix, self).fetch()
@@ -149,7 +149,7 @@ class InputSCPhonons(InputDictionary):
             {
                 "dtype": int,
                 "default": 1,
-                "help": "The number of Monte Carlo forces to be evaluated (in parallel) per i-PI step.",
+                "help": "The number of Monte Carlo forces to be evaluated (in parallel) per i-PI step. If zero, all the samples of a SCP iteration are evaluated together.",
             },
         ),
         "batch_weight_exponent": (
@@ -150,8 +150,8 @@ class InputTrajectory(InputValue):
         {
             "dtype": str,
             "default": "xyz",
-            "help": "The output file format.",
-            "options": ["xyz", "pdb", "ase", "bin"],
+            "help": "The output file format. 'ipb' and 'ipb32' are self-describing binary formats with fixed-size frames, in double and single precision, that can be read with numpy.memmap.",
+            "options": ["xyz", "pdb", "ase", "bin", "ipb", "ipb32"],
         },
     )
     attribs["cell_units"] = (
@@ -274,6 +274,15 @@ class InputCheckpoint(InputValue):
             "help": "This specifies whether or not each consecutive checkpoint file will overwrite the old one.",
         },
     )
+    attribs["format"] = (
+        InputAttribute,
+        {
+            "dtype": str,
+            "default": "xml",
+            "options": ["xml", "npy"],
+            "help": "The format of the checkpoint. 'xml' writes all the data in the XML file. 'npy' writes the larger arrays as binary numpy files in the directory 'filename'_data, which are only rewritten when they have changed, and writes the checkpoint in the background. Both can be used to restart the simulation.",
+        },
+    )
 
     def __init__(self, help=None, default=None, dtype=None, dimension=None):
         """Initializes InputCheckpoint.
@@ -294,6 +303,7 @@ class InputCheckpoint(InputValue):
             self.stride.fetch(),
             self.overwrite.fetch(),
             step=step,
+            format=self.format.fetch(),
         )
 
     def parse(self, xml=None, text=""):
@@ -322,6 +332,7 @@ class InputCheckpoint(InputValue):
         self.stride.store(chk.stride)
         self.filename.store(chk.filename)
         self.overwrite.store(chk.overwrite)
+        self.format.store(chk.format)
 
     def check(self):
         """Checks for optional parameters."""
@@ -359,7 +370,15 @@ class InputOutputs(Input):
                 "default": "i-pi",
                 "help": "A string that will be prepended to each output file name. The file name is given by 'prefix'.'filename' + format_specifier. The format specifier may also include a number if multiple similar files are output.",
             },
-        )
+        ),
+        "queue": (
+            InputAttribute,
+            {
+                "dtype": int,
+                "default": 0,
+                "help": "If positive, properties and trajectories are written by a separate thread, so that slow file systems do not hold up the simulation. This gives the maximum number of outputs that can be waiting to be written before the simulation has to wait. Pending outputs are always written before checkpoints and on exit.",
+            },
+        ),
     }
 
     dynamic = {
@@ -432,7 +451,9 @@ class InputOutputs(Input):
 
         super(InputOutputs, self).fetch()
         outlist = eoutputs.OutputList(
-            self.prefix.fetch(), [p.fetch() for (n, p) in self.extra]
+            self.prefix.fetch(),
+            [p.fetch() for (n, p) in self.extra],
+            queue=self.queue.fetch(),
         )
 
         return outlist
@@ -450,6 +471,7 @@ class InputOutputs(Input):
         super(InputOutputs, self).store()
 
         self.prefix.store(plist.prefix)
+        self.queue.store(plist.queue)
 
         if len(self.extra) != len(plist):
             self.extra = [0] * len(plist)
@@ -130,6 +130,18 @@ class InputSimulation(Input):
                 "help": """Consistent simulation states will be saved every this number of steps. 
 Saving state entails a small overhead, so you may want to set this to the smallest output
 frequency in your simulation to make i-PI faster. Use at your own risk!
+""",
+            },
+        ),
+        "freeze_graph": (
+            InputAttribute,
+            {
+                "dtype": bool,
+                "default": False,
+                "help": """Once the simulation has been set up, propagate the changes of the
+physical quantities through precomputed, flat lists of the quantities that depend on them,
+rather than by walking the dependency graph. This reduces the overhead of each step for
+small and medium-sized systems.
 """,
             },
         ),
@@ -239,6 +251,7 @@ frequency in your simulation to make i-PI faster. Use at your own risk!
 
         self.mode.store(simul.mode)
         self.safe_stride.store(simul.safe_stride)
+        self.freeze_graph.store(simul.freeze_graph)
 
         _fflist = [v for k, v in sorted(simul.fflist.items())]
         if len(self.extra) != len(_fflist) + len(simul.syslist):
@@ -350,7 +363,7 @@ frequency in your simulation to make i-PI faster. Use at your own risk!
                 "ffrotations",
                 "ffcavphsocket",
             ]:
-                new_ff = v.fetch()
+                new_ff = v.fetch_cache(v.fetch())
                 if k in ["ffsocket", "ffcavphsocket"]:
                     # overrides ffsocket and ffcavsocket prefix - important if no access to /tmp in machines
                     new_ff.socket.sockets_prefix = self.sockets_prefix.fetch()
@@ -371,6 +384,7 @@ frequency in your simulation to make i-PI faster. Use at your own risk!
             ttime=self.total_time.fetch(),
             threads=self.threading.fetch(),
             safe_stride=self.safe_stride.fetch(),
+            freeze_graph=self.freeze_graph.fetch(),
             sockets_prefix=self.sockets_prefix.fetch(),
         )
 
@@ -30,6 +30,8 @@ class InputThermoBase(Input):
     Attributes:
        mode: An optional string giving the type of the thermostat used. Defaults
           to 'langevin'.
+       fused: An optional boolean giving whether the thermostat should update
+          all the momenta in a single pass. Defaults to False.
 
     Fields:
        ethermo: An optional float giving the amount of heat energy transferred
@@ -68,7 +70,15 @@ class InputThermoBase(Input):
                 ],
                 "help": "The style of thermostatting. 'langevin' specifies a white noise langevin equation to be attached to the cartesian representation of the momenta. 'svr' attaches a velocity rescaling thermostat to the cartesian representation of the momenta. Both 'pile_l' and 'pile_g' attaches a white noise langevin thermostat to the normal mode representation, with 'pile_l' attaching a local langevin thermostat to the centroid mode and 'pile_g' instead attaching a global velocity rescaling thermostat. 'gle' attaches a coloured noise langevin thermostat to the cartesian representation of the momenta, 'nm_gle' attaches a coloured noise langevin thermostat to the normal mode representation of the momenta and a langevin thermostat to the centroid and 'nm_gle_g' attaches a gle thermostat to the normal modes and a svr thermostat to the centroid. 'cl' represents a modified langevin thermostat which compensates for additional white noise from noisy forces or for dissipative effects. 'ffl' is the fast-forward langevin thermostat, in which momenta are flipped back whenever the action of the thermostat changes its direction. 'multiple' is a special thermostat mode, in which one can define multiple thermostats _inside_ the thermostat tag.",
             },
-        )
+        ),
+        "fused": (
+            InputAttribute,
+            {
+                "dtype": bool,
+                "default": False,
+                "help": "Applies the 'pile_l', 'pile_g', 'gle', 'nm_gle' and 'nm_gle_g' thermostats to all the degrees of freedom in a single pass, with preallocated buffers and a single call to the random number generator. The random numbers are the same, so the trajectory only differs by rounding errors, but large systems are faster. Ignored by the other thermostats.",
+            },
+        ),
     }
     fields = {
         "ethermo": (
@@ -236,6 +246,7 @@ class InputThermoBase(Input):
         else:
             raise TypeError("Unknown thermostat mode " + type(thermo).__name__)
         self.ethermo.store(thermo.ethermo)
+        self.fused.store(thermo.fused)
 
     def fetch(self):
         """Creates a thermostat object.
@@ -302,6 +313,7 @@ class InputThermoBase(Input):
             raise TypeError("Invalid thermostat mode " + self.mode.fetch())
 
         thermo.ethermo = self.ethermo.fetch()
+        thermo.fused = self.fused.fetch()
 
         return thermo
 
@@ -11,8 +11,12 @@ calculation.
 
 
 import os
+import itertools
+import mmap
 import socket
 import select
+import selectors
+import tempfile
 import time
 import threading
 
@@ -33,6 +37,8 @@ TIMEOUT = 0.1
 SERVERTIMEOUT = 5.0 * TIMEOUT
 NTIMEOUT = 20
 SELECTTIMEOUT = 60
+# weight of the last measurement in the running averages of the request costs
+COSTDECAY = 0.3
 
 
 def Message(mystr):
@@ -54,6 +60,13 @@ MESSAGE = {
         "posdata",
         "getforce",
         "forceready",
+        # protocol extensions, only used with clients that advertise them
+        "caps",
+        "shminit",
+        "posdatashm",
+        "forceshm",
+        "posdatabatch",
+        "forcebatch",
     ]
 }
 
@@ -66,14 +79,22 @@ class Disconnected(Exception):
 
 def _parse_extra(mxtra):
     """Decodes the optional 'extra' JSON string returned by a force
-    calculation, returning a dict (empty if the payload is empty/whitespace
-    or fails to parse). The raw string is stashed under "raw"."""
+    calculation, returning a dict (empty if the payload is empty/whitespace).
+    The raw string is stashed under "raw", and is the only entry if the
+    string cannot be parsed as a JSON dictionary."""
     if not mxtra or mxtra.isspace():
         return {}
     try:
         mxtradict = json.loads(mxtra)
     except Exception:
-        return {}
+        info(
+            "@driver.getforce: Extra string could not be loaded as a dictionary. Extra="
+            + mxtra,
+            verbosity.debug,
+        )
+        mxtradict = {}
+    if not isinstance(mxtradict, dict):
+        mxtradict = {}
     if "raw" in mxtradict:
         raise ValueError(
             "'raw' cannot be used as a field in a JSON-formatted extra string"
@@ -97,6 +118,65 @@ class InvalidStatus(Exception):
     pass
 
 
+class LatencyHistogram(object):
+    """Accumulates a log-binned histogram of time intervals.
+
+    Used by the socket interface to keep track of how long requests spend
+    waiting in the queue, being evaluated by a driver, and overall. Values
+    outside [tmin, tmax] are collected in an underflow and an overflow bin.
+
+    Attributes:
+       edges: The bin edges, in seconds.
+       counts: The number of entries in each bin, including the underflow
+          (first) and overflow (last) bins.
+       n: The total number of entries.
+       total: The sum of all the entries.
+       max: The largest entry.
+    """
+
+    def __init__(self, tmin=1e-6, tmax=1e3, nbins=45):
+        self.edges = np.logspace(np.log10(tmin), np.log10(tmax), nbins + 1)
+        self.counts = np.zeros(nbins + 2, int)
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, dt):
+        """Adds an interval dt (in seconds) to the histogram."""
+
+        self.counts[np.searchsorted(self.edges, dt, side="right")] += 1
+        self.n += 1
+        self.total += dt
+        self.max = max(self.max, dt)
+
+    def mean(self):
+        return self.total / self.n if self.n > 0 else 0.0
+
+    def percentile(self, q):
+        """Returns an upper bound for the q-th percentile (0 <= q <= 100),
+        given by the upper edge of the bin that contains it."""
+
+        if self.n == 0:
+            return 0.0
+        ibin = np.searchsorted(np.cumsum(self.counts), q / 100.0 * self.n)
+        return min(self.edges[min(ibin, len(self.edges) - 1)], self.max)
+
+    def summary(self):
+        """Returns a one-line summary of the distribution."""
+
+        return (
+            "n=%8d  mean=%10.3e  p50<=%10.3e  p90<=%10.3e  p99<=%10.3e  max=%10.3e"
+            % (
+                self.n,
+                self.mean(),
+                self.percentile(50),
+                self.percentile(90),
+                self.percentile(99),
+                self.max,
+            )
+        )
+
+
 class Status(object):
     """Simple class used to keep track of the status of the client.
 
@@ -150,6 +230,8 @@ class DriverSocket(socket.socket):
         self.settimeout(sock.gettimeout())
 
         self._buf = np.zeros(0, np.byte)
+        # small preallocated buffers for the scalars sent along positions
+        self._natbuf = np.zeros(1, np.int32)
         if socket:
             self.peername = self.getpeername()
         else:
@@ -163,6 +245,58 @@ class DriverSocket(socket.socket):
         """
         return self.sendall(MESSAGE[msg])
 
+    def sendall_buffers(self, buffers):
+        """Sends a list of buffers (bytes or contiguous arrays) with
+        scatter-gather sendmsg calls, avoiding concatenating them into a
+        temporary bytestring. Takes care of partial sends.
+
+        Args:
+           buffers: A list of objects supporting the buffer protocol.
+        """
+
+        views = [memoryview(b).cast("B") for b in buffers]
+        while views:
+            sent = self.sendmsg(views)
+            while views and sent >= len(views[0]):
+                sent -= len(views[0])
+                views.pop(0)
+            if views and sent > 0:
+                views[0] = views[0][sent:]
+
+    def _recv_into_buf(self, blen, offset=0):
+        """Fills the scratch buffer with blen bytes read from the socket,
+        starting at offset. The buffer is grown (and kept) if needed.
+
+        Raises:
+           Disconnected: Raised if client is disconnected.
+        """
+
+        if offset + blen > len(self._buf):
+            buf = np.zeros(offset + blen, np.byte)
+            buf[:offset] = self._buf[:offset]
+            self._buf = buf
+
+        view = memoryview(self._buf)
+        bpos = offset
+        bend = offset + blen
+        ntimeout = 0
+        while bpos < bend:
+            try:
+                bpart = self.recv_into(view[bpos:bend], bend - bpos)
+            except socket.timeout:
+                ntimeout += 1
+                if ntimeout > NTIMEOUT:
+                    warning(
+                        " @SOCKET:  Couldn't receive within %5d attempts. Time to give up!"
+                        % (NTIMEOUT),
+                        verbosity.low,
+                    )
+                    raise Disconnected()
+                continue
+            if bpart == 0:
+                raise Disconnected()
+            bpos += bpart
+
     def recv_msg(self, length=HDRLEN):
         """Get the next message send through the socket.
 
@@ -232,8 +366,14 @@ class Driver(DriverSocket):
        status: Keeps track of the status of the driver.
        lastreq: The ID of the last request processed by the client.
        locked: Flag to mark if the client has been working consistently on one image.
+       cid: A number identifying the client, unique within the i-PI run.
+       slowness: Running average of the ratio between the time the client
+          takes to evaluate a request and the typical cost of that request,
+          learned from the requests that other clients have also evaluated.
     """
 
+    _cids = itertools.count()
+
     def __init__(self, sock):
         """Initialises Driver.
 
@@ -247,6 +387,12 @@ class Driver(DriverSocket):
         self.lastreq = None
         self.locked = False
         self.exit_on_disconnect = False
+        self.caps = {}
+        self.batch = []
+        self._shm = None
+        self._shm_inflight = False
+        self.cid = next(Driver._cids)
+        self.slowness = 1.0
 
     def shutdown(self, how=socket.SHUT_RDWR):
         """Tries to send an exit message to clients to let them exit gracefully."""
@@ -263,6 +409,44 @@ class Driver(DriverSocket):
 
         super(DriverSocket, self).shutdown(how)
 
+    def close(self):
+        """Closes the socket, and releases the shared-memory segment (if any)."""
+
+        if self._shm is not None:
+            self._shm.release()
+            self._shm = None
+        super(Driver, self).close()
+
+    def _recv_caps(self):
+        """Reads the JSON dictionary of protocol extensions supported by the
+        client, that follows a CAPS header.
+
+        Clients that support extensions send CAPS on connection, so it is
+        received instead of the reply to the first STATUS message. Unknown
+        capabilities are ignored. Currently supported capabilities are
+        {"shmem": true}, i.e. the client can exchange positions and
+        forces through a shared-memory segment, and {"batch": n}, i.e. the
+        client can evaluate up to n structures sent in a single
+        POSDATABATCH message.
+        """
+
+        self._recv_into_buf(4)
+        clen = int(np.frombuffer(self._buf, dtype=np.int32, count=1)[0])
+        self._recv_into_buf(clen)
+        try:
+            self.caps = json.loads(bytes(self._buf[:clen]).decode("utf-8"))
+        except ValueError:
+            warning(
+                " @SOCKET:   Could not parse client capabilities: %s"
+                % bytes(self._buf[:clen]),
+                verbosity.low,
+            )
+            self.caps = {}
+        info(
+            " @SOCKET:   Client %s supports %s" % (str(self.peername), str(self.caps)),
+            verbosity.medium,
+        )
+
     def _getstatus_select(self):
         """Gets driver status. Uses socket.select to make sure one can read/write on the socket.
 
@@ -313,6 +497,14 @@ class Driver(DriverSocket):
             return Status.Up | Status.NeedsInit
         elif reply == MESSAGE["havedata"]:
             return Status.Up | Status.HasData
+        elif reply == MESSAGE["caps"]:
+            # the client announced its capabilities before answering
+            try:
+                self._recv_caps()
+            except Disconnected:
+                return Status.Disconnected
+            self.waitstatus = True
+            return self._getstatus()
         else:
             warning(" @SOCKET:    Unrecognized reply: " + str(reply), verbosity.low)
             return Status.Up
@@ -353,6 +545,14 @@ class Driver(DriverSocket):
             return Status.Up | Status.NeedsInit
         elif reply == MESSAGE["havedata"]:
             return Status.Up | Status.HasData
+        elif reply == MESSAGE["caps"]:
+            # the client announced its capabilities before answering
+            try:
+                self._recv_caps()
+            except Disconnected:
+                return Status.Disconnected
+            self.waitstatus = True
+            return self._getstatus()
         else:
             warning(" @SOCKET:    Unrecognized reply: " + str(reply), verbosity.low)
             return Status.Up
@@ -412,13 +612,7 @@ class Driver(DriverSocket):
         if self.status & Status.Ready:
             try:
                 # reduces latency by combining all messages in one
-                self.sendall(
-                    MESSAGE["posdata"]  # header
-                    + h_ih[0].tobytes()  # cell
-                    + h_ih[1].tobytes()  # inverse cell
-                    + np.int32(len(pos) // 3).tobytes()  # length of position array
-                    + pos.tobytes()  # positions
-                )
+                self.sendall_buffers(self._posdata_buffers(pos, h_ih))
                 self.status = Status.Up | Status.Busy
             except socket.timeout:
                 warning(
@@ -436,6 +630,20 @@ class Driver(DriverSocket):
         else:
             raise InvalidStatus("Status in sendpos was " + self.status)
 
+    def _posdata_buffers(self, pos, h_ih):
+        """Returns the list of buffers making up a POSDATA message, i.e.
+        header, cell, inverse cell, number of atoms and positions. The arrays
+        are sent as they are, without copies."""
+
+        self._natbuf[0] = len(pos) // 3
+        return [
+            MESSAGE["posdata"],
+            np.ascontiguousarray(h_ih[0], np.float64),
+            np.ascontiguousarray(h_ih[1], np.float64),
+            self._natbuf,
+            np.ascontiguousarray(pos, np.float64),
+        ]
+
     def _recv_forceready(self):
         """Receives the FORCEREADY header after GETFORCE has been sent.
 
@@ -469,53 +677,11 @@ class Driver(DriverSocket):
         """Receives the [potential, force, virial, extra] payload that follows
         the FORCEREADY header."""
 
-        mu = np.float64()
-        mu = self.recvall(mu)
-
-        mlen = np.int32()
-        mlen = self.recvall(mlen)
-
-        mf = np.zeros(3 * mlen, np.float64)
-        mf = self.recvall(mf)
-
-        mvir = np.zeros((3, 3), np.float64)
-        mvir = self.recvall(mvir)
-
-        # Machinery to return a string as an "extra" field.
-        # Comment if you are using a ancient patched driver that does not return anything!
-        # Actually, you should really update your driver, you're like a decade behind.
-        mlen = np.int32()
-        mlen = self.recvall(mlen)
-        if mlen > 0:
-            mxtra = np.zeros(mlen, np.dtype("S1"))
-            mxtra = self.recvall(mxtra)
-            mxtra = bytearray(mxtra).decode("utf-8")
-        else:
-            mxtra = ""
-        mxtradict = {}
-        if mxtra:
-            try:
-                mxtradict = json.loads(mxtra)
-                info(
-                    "@driver.getforce: Extra string JSON has been loaded.",
-                    verbosity.debug,
-                )
-            except:
-                # if we can't parse it as a dict, issue a warning and carry on
-                info(
-                    "@driver.getforce: Extra string could not be loaded as a dictionary. Extra="
-                    + mxtra,
-                    verbosity.debug,
-                )
-                mxtradict = {}
-                pass
-            if "raw" in mxtradict:
-                raise ValueError(
-                    "'raw' cannot be used as a field in a JSON-formatted extra string"
-                )
-
-            mxtradict["raw"] = mxtra
-        return [mu, mf, mvir, mxtradict]
+        # potential and number of atoms first, so we know how much to read
+        self._recv_into_buf(12)
+        natoms = int(np.frombuffer(self._buf, dtype=np.int32, count=1, offset=8)[0])
+        self._recv_into_buf(24 * natoms + 72 + 4, offset=12)
+        return self._parse_force_payload(natoms, 0)
 
     def getforce(self):
         """Gets the potential energy, force and virial from the driver.
@@ -551,6 +717,7 @@ class Driver(DriverSocket):
             return
 
         r["t_dispatched"] = time.time()
+        r["client"] = self.cid
         self.get_status()
         if self.status & Status.NeedsInit:
             self.initialize(r["id"], r["pars"])
@@ -564,7 +731,7 @@ class Driver(DriverSocket):
             return
 
         r["start"] = time.time()
-        self.sendpos(r["pos"][r["active"]], r["cell"])
+        self.sendpos(_active_pos(r), r["cell"])
 
         self.get_status()
         if not (self.status & Status.HasData):
@@ -600,26 +767,18 @@ class Driver(DriverSocket):
         r["status"] = "Done"
         r._event_done.set()
 
-    def dispatch_send(self, r):
-        """Sends POSDATA + cell + atoms + GETFORCE in a single sendall and
-        returns without waiting for the force payload, which is collected
-        later by `dispatch_recv` once the client socket becomes readable.
-
-        Returns True on success, False if the client is in an unexpected
-        state or the send failed; on failure the client is marked
-        Disconnected so the next pool_update can prune it.
-        """
-        global TIMEOUT
+    def _prepare_send(self, r, where):
+        """Makes sure the client is ready to receive positions, initializing
+        it with the parameters of request r if needed. Returns False if the
+        client is in an unexpected state."""
 
         if not (self.status & Status.Up):
             warning(
-                " @SOCKET:   Inconsistent client state in dispatch_send! (I)",
+                " @SOCKET:   Inconsistent client state in %s! (I)" % where,
                 verbosity.low,
             )
             return False
 
-        r["t_dispatched"] = time.time()
-
         if not (self.status & Status.Ready):
             self.get_status()
         if self.status & Status.NeedsInit:
@@ -628,23 +787,19 @@ class Driver(DriverSocket):
 
         if not (self.status & Status.Ready):
             warning(
-                " @SOCKET:   Inconsistent client state in dispatch_send! (II)",
+                " @SOCKET:   Inconsistent client state in %s! (II)" % where,
                 verbosity.low,
             )
             return False
+        return True
+
+    def _send_guarded(self, send, *args):
+        """Calls send(*args), converting socket errors into a Timeout or
+        Disconnected status. Returns True on success."""
+        global TIMEOUT
 
-        r["start"] = time.time()
-        pos = r["pos"][r["active"]]
-        h_ih = r["cell"]
         try:
-            self.sendall(
-                MESSAGE["posdata"]
-                + h_ih[0].tobytes()
-                + h_ih[1].tobytes()
-                + np.int32(len(pos) // 3).tobytes()
-                + pos.tobytes()
-                + MESSAGE["getforce"]
-            )
+            send(*args)
         except socket.timeout:
             warning(
                 f"Timeout in sendall after {TIMEOUT}s: resetting status and increasing timeout",
@@ -664,6 +819,86 @@ class Driver(DriverSocket):
         self.status = Status.Up | Status.HasData
         return True
 
+    def dispatch_send(self, r):
+        """Sends POSDATA + cell + atoms + GETFORCE in a single sendall and
+        returns without waiting for the force payload, which is collected
+        later by `dispatch_recv` once the client socket becomes readable.
+
+        Returns True on success, False if the client is in an unexpected
+        state or the send failed; on failure the client is marked
+        Disconnected so the next pool_update can prune it.
+        """
+
+        r["t_dispatched"] = time.time()
+        r["client"] = self.cid
+        if not self._prepare_send(r, "dispatch_send"):
+            return False
+
+        r["start"] = time.time()
+        if self.caps.get("shmem", False):
+            return self._send_guarded(self._send_posdata_shm, _active_pos(r), r["cell"])
+        else:
+            return self._send_guarded(
+                self.sendall_buffers,
+                self._posdata_buffers(_active_pos(r), r["cell"])
+                + [MESSAGE["getforce"]],
+            )
+
+    def dispatch_send_batch(self, rlist):
+        """Sends the structures of several requests in a single
+        POSDATABATCH message followed by GETFORCE, to a client that has
+        advertised the "batch" capability. The results are collected by
+        `dispatch_recv_batch`.
+
+        Wire layout:
+            POSDATABATCH header         HDRLEN B
+            number of structures        4 B
+            then, for each structure, the same payload as POSDATA
+            (cell, inverse cell, atom count, positions)
+            GETFORCE header             HDRLEN B
+
+        Returns True on success, False if the client is in an unexpected
+        state or the send failed.
+        """
+
+        tnow = time.time()
+        for r in rlist:
+            r["t_dispatched"] = tnow
+            r["client"] = self.cid
+        if not self._prepare_send(rlist[0], "dispatch_send_batch"):
+            return False
+
+        buffers = [MESSAGE["posdatabatch"], np.array([len(rlist)], np.int32)]
+        for r in rlist:
+            pos = _active_pos(r)
+            buffers += [
+                np.ascontiguousarray(r["cell"][0], np.float64),
+                np.ascontiguousarray(r["cell"][1], np.float64),
+                np.array([len(pos) // 3], np.int32),
+                np.ascontiguousarray(pos, np.float64),
+            ]
+        buffers.append(MESSAGE["getforce"])
+
+        tnow = time.time()
+        for r in rlist:
+            r["start"] = tnow
+        self.batch = rlist
+        return self._send_guarded(self.sendall_buffers, buffers)
+
+    def _finalize_result(self, r):
+        """Applies the energy offset and scatters the forces of the active
+        atoms of a request whose result has just been received."""
+
+        r["result"][0] -= r["offset"]
+
+        # If only a piece of the system is active, resize forces and reassign
+        if len(r["active"]) != len(r["pos"]):
+            rftemp = r["result"][1]
+            r["result"][1] = np.zeros(len(r["pos"]), dtype=np.float64)
+            r["result"][1][r["active"]] = rftemp
+        r["t_finished"] = time.time()
+        self.lastreq = r["id"]
+
     def dispatch_recv(self, r):
         """Reads FORCEREADY and the force payload for a request previously
         handed to `dispatch_send`. The caller must have determined that the
@@ -674,22 +909,17 @@ class Driver(DriverSocket):
         request is left untouched so the caller can re-queue it.
         """
 
-        natoms = len(r["pos"][r["active"]]) // 3
+        natoms = len(r["active"]) // 3
         try:
-            r["result"] = self._recv_forces_bulk(natoms)
+            if self._shm_inflight:
+                r["result"] = self._recv_forces_shm(natoms)
+            else:
+                r["result"] = self._recv_forces_bulk(natoms)
         except Disconnected:
             self.status = Status.Disconnected
             return False
 
-        r["result"][0] -= r["offset"]
-
-        # If only a piece of the system is active, resize forces and reassign
-        if len(r["active"]) != len(r["pos"]):
-            rftemp = r["result"][1]
-            r["result"][1] = np.zeros(len(r["pos"]), dtype=np.float64)
-            r["result"][1][r["active"]] = rftemp
-        r["t_finished"] = time.time()
-        self.lastreq = r["id"]
+        self._finalize_result(r)
 
         # Probe the real post-force status: most clients go back to Ready,
         # but some (e.g. ASE-backed) transition to NeedsInit each step.
@@ -699,6 +929,52 @@ class Driver(DriverSocket):
         r._event_done.set()
         return True
 
+    def dispatch_recv_batch(self):
+        """Reads the FORCEBATCH reply for the requests previously handed to
+        `dispatch_send_batch`, i.e. the header, the number of structures
+        and, for each of them, the same payload that follows FORCEREADY.
+
+        Returns True on success, False if the client disconnected
+        mid-transfer, in which case none of the requests is marked as done.
+        """
+
+        rlist = self.batch
+        try:
+            self._recv_into_buf(HDRLEN + 4)
+            if bytes(self._buf[:HDRLEN]) != MESSAGE["forcebatch"]:
+                warning(
+                    " @SOCKET:   Unexpected getforce reply: %s"
+                    % bytes(self._buf[:HDRLEN]),
+                    verbosity.low,
+                )
+                raise Disconnected()
+            nstruct = int(
+                np.frombuffer(self._buf, dtype=np.int32, count=1, offset=HDRLEN)[0]
+            )
+            if nstruct != len(rlist):
+                raise InvalidSize
+            results = []
+            for r in rlist:
+                natoms = len(r["active"]) // 3
+                self._recv_into_buf(8 + 4 + 24 * natoms + 72 + 4)
+                results.append(self._parse_force_payload(natoms, 0))
+        except Disconnected:
+            self.status = Status.Disconnected
+            return False
+        finally:
+            self.batch = []
+
+        for r, result in zip(rlist, results):
+            r["result"] = result
+            self._finalize_result(r)
+
+        self.get_status()
+
+        for r in rlist:
+            r["status"] = "Done"
+            r._event_done.set()
+        return True
+
     def _recv_forces_bulk(self, natoms):
         """Reads FORCEREADY and the full force payload for a known atom
         count, returning [mu, mf, mvir, mxtradict].
@@ -717,39 +993,79 @@ class Driver(DriverSocket):
         in a follow-up read.
         """
 
-        full_size = HDRLEN + 8 + 4 + 24 * natoms + 72 + 4
-        if full_size > len(self._buf):
-            self._buf = np.zeros(full_size, np.byte)
+        self._recv_into_buf(HDRLEN + 8 + 4 + 24 * natoms + 72 + 4)
 
-        view = memoryview(self._buf)
-        bpos = 0
-        ntimeout = 0
-        while bpos < full_size:
-            try:
-                bpart = self.recv_into(view[bpos:full_size], full_size - bpos)
-            except socket.timeout:
-                ntimeout += 1
-                if ntimeout > NTIMEOUT:
-                    warning(
-                        " @SOCKET:  Couldn't receive within %5d attempts. Time to give up!"
-                        % (NTIMEOUT),
-                        verbosity.low,
-                    )
-                    raise Disconnected()
-                continue
-            if bpart == 0:
-                raise Disconnected()
-            bpos += bpart
+        if bytes(self._buf[:HDRLEN]) != MESSAGE["forceready"]:
+            warning(
+                " @SOCKET:   Unexpected getforce reply: %s" % bytes(self._buf[:HDRLEN]),
+                verbosity.low,
+            )
+            raise Disconnected()
 
-        buf = self._buf
-        if bytes(buf[:HDRLEN]) != MESSAGE["forceready"]:
+        return self._parse_force_payload(natoms, HDRLEN)
+
+    def _send_posdata_shm(self, pos, h_ih):
+        """Writes cell and positions into the shared-memory segment, and
+        sends the POSDATASHM+GETFORCE doorbell. Creates the segment and
+        announces it to the client with SHMINIT on first use, or if the
+        number of atoms has changed."""
+
+        natoms = len(pos) // 3
+        if self._shm is None or self._shm.natoms != natoms:
+            if self._shm is not None:
+                self._shm.release()
+            self._shm = SharedMemoryBuffer(natoms)
+            path = self._shm.path.encode()
+            self.sendall_buffers(
+                [
+                    MESSAGE["shminit"],
+                    np.array([natoms, len(path)], np.int32),
+                    path,
+                ]
+            )
+        self._shm.cell[:] = h_ih[0]
+        self._shm.icell[:] = h_ih[1]
+        self._shm.pos[:] = pos
+        self._shm_inflight = True
+        self.sendall(MESSAGE["posdatashm"] + MESSAGE["getforce"])
+
+    def _recv_forces_shm(self, natoms):
+        """Reads the FORCESHM reply (header, extra-string length, extra
+        string), and collects [mu, mf, mvir, mxtradict] from the
+        shared-memory segment."""
+
+        self._recv_into_buf(HDRLEN + 4)
+        if bytes(self._buf[:HDRLEN]) != MESSAGE["forceshm"]:
             warning(
-                " @SOCKET:   Unexpected getforce reply: %s" % bytes(buf[:HDRLEN]),
+                " @SOCKET:   Unexpected getforce reply: %s" % bytes(self._buf[:HDRLEN]),
                 verbosity.low,
             )
             raise Disconnected()
+        self._shm_inflight = False
+
+        extra_len = int(
+            np.frombuffer(self._buf, dtype=np.int32, count=1, offset=HDRLEN)[0]
+        )
+        if extra_len > 0:
+            self._recv_into_buf(extra_len)
+            mxtra = bytes(self._buf[:extra_len]).decode("utf-8")
+        else:
+            mxtra = ""
 
-        off = HDRLEN
+        return [
+            float(self._shm.pot[0]),
+            self._shm.force.copy(),
+            self._shm.vir.copy(),
+            _parse_extra(mxtra),
+        ]
+
+    def _parse_force_payload(self, natoms, off):
+        """Decodes a [potential, natoms, forces, virial, extra length] block
+        that has been read into the scratch buffer starting at offset off,
+        then reads the extra string (if any) and returns
+        [mu, mf, mvir, mxtradict]."""
+
+        buf = self._buf
         mu = float(np.frombuffer(buf, dtype=np.float64, count=1, offset=off)[0])
         off += 8
         mlen = int(np.frombuffer(buf, dtype=np.int32, count=1, offset=off)[0])
@@ -768,22 +1084,7 @@ class Driver(DriverSocket):
         extra_len = int(np.frombuffer(buf, dtype=np.int32, count=1, offset=off)[0])
 
         if extra_len > 0:
-            if extra_len > len(self._buf):
-                self._buf = np.zeros(extra_len, np.byte)
-            view = memoryview(self._buf)
-            bpos = 0
-            ntimeout = 0
-            while bpos < extra_len:
-                try:
-                    bpart = self.recv_into(view[bpos:extra_len], extra_len - bpos)
-                except socket.timeout:
-                    ntimeout += 1
-                    if ntimeout > NTIMEOUT:
-                        raise Disconnected()
-                    continue
-                if bpart == 0:
-                    raise Disconnected()
-                bpos += bpart
+            self._recv_into_buf(extra_len)
             mxtra = bytes(self._buf[:extra_len]).decode("utf-8")
         else:
             mxtra = ""
@@ -791,6 +1092,63 @@ class Driver(DriverSocket):
         return [mu, mf, mvir, _parse_extra(mxtra)]
 
 
+class SharedMemoryBuffer(object):
+    """A memory-mapped file (in /dev/shm when available) used to exchange
+    positions and forces with a client running on the same node, so that
+    the socket only carries short doorbell messages.
+
+    The file holds a single float64 array with layout
+    [cell (9), inverse cell (9), positions (3N), potential (1),
+    forces (3N), virial (9)], that is exposed through the views below.
+
+    Attributes:
+       natoms: The number of atoms the buffer is sized for.
+       path: The path of the mapped file, that is sent to the client.
+       cell, icell, pos, pot, force, vir: Views into the mapped array.
+    """
+
+    def __init__(self, natoms):
+        self.natoms = natoms
+        shmdir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        fd, self.path = tempfile.mkstemp(prefix="ipi_shm_", dir=shmdir)
+        try:
+            size = 8 * (28 + 6 * natoms)
+            os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        data = np.frombuffer(self._mmap, np.float64)
+        n3 = 3 * natoms
+        self.cell = data[0:9].reshape((3, 3))
+        self.icell = data[9:18].reshape((3, 3))
+        self.pos = data[18 : 18 + n3]
+        self.pot = data[18 + n3 : 19 + n3]
+        self.force = data[19 + n3 : 19 + 2 * n3]
+        self.vir = data[19 + 2 * n3 :].reshape((3, 3))
+
+    def release(self):
+        """Unmaps and removes the file."""
+
+        # the views must be dropped before the map can be closed
+        self.cell = self.icell = self.pos = None
+        self.pot = self.force = self.vir = None
+        self._mmap.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def _active_pos(r):
+    """Returns the positions of the active atoms of request r. When all
+    atoms are active this is the position array itself, not a copy."""
+
+    if len(r["active"]) == len(r["pos"]):
+        return r["pos"]
+    return r["pos"][r["active"]]
+
+
 class InterfaceSocket(object):
     """Host server class.
 
@@ -812,6 +1170,11 @@ class InterfaceSocket(object):
        clients: A list of the driver clients connected to the server.
        requests: A list of all the jobs required in the current PIMD step.
        jobs: A list of all the jobs currently running.
+       costs: Running averages of the time needed to evaluate the requests
+          with each id, in units of the time taken by a client of unit
+          slowness. Used to schedule requests when match_mode is 'cost'.
+       _timings: For each request id, the running average of the time taken
+          by each client that has evaluated it, indexed by the client cid.
        _poll_thread: The thread the poll loop is running on.
        _prev_kill: Holds the signals to be sent to clean up the main thread
           when a kill signal is sent.
@@ -834,6 +1197,8 @@ class InterfaceSocket(object):
         max_workers=128,
         sockets_prefix="/tmp/ipi_",
         consolidate_messages=True,
+        event_driven=False,
+        speculative=False,
     ):
         """Initialises interface.
 
@@ -853,6 +1218,21 @@ class InterfaceSocket(object):
               responses on the poll thread via select(). Saves several
               round-trips per dispatch and removes worker-thread GIL
               contention, but assumes clients follow the protocol strictly.
+           event_driven: If True, the polling thread blocks on a selector
+              (epoll/kqueue where available) watching the server socket, all
+              the clients and a wake-up channel that is notified whenever a
+              new request is queued. Requests are dispatched and collected as
+              soon as the corresponding socket becomes ready, without any
+              sleep-based polling. Implies `consolidate_messages`.
+           match_mode: How requests are assigned to free clients. 'auto' tries
+              to send each replica to the client that computed it last, 'lock'
+              only allows that, 'any' sends requests in order, and 'cost'
+              sends the requests that took longest to the fastest clients.
+           speculative: If True, clients that are idle while no request is
+              queued are sent a copy of the running requests that they are
+              expected to complete before the client they were assigned to,
+              and the first result to arrive is used. Requires
+              `consolidate_messages`.
 
         Raises:
            NameError: Raised if mode is not 'unix' or 'inet'.
@@ -871,6 +1251,29 @@ class InterfaceSocket(object):
         self.exit_on_disconnect = exit_on_disconnect
         self.max_workers = max_workers
         self.consolidate_messages = consolidate_messages
+        self.event_driven = event_driven
+        if self.event_driven and not self.consolidate_messages:
+            warning(
+                " @SOCKET: event-driven mode always uses consolidated messages",
+                verbosity.low,
+            )
+            self.consolidate_messages = True
+        self.speculative = speculative
+        if self.speculative and not self.consolidate_messages:
+            warning(
+                " @SOCKET: speculative dispatch requires consolidated messages",
+                verbosity.low,
+            )
+            self.speculative = False
+        self.costs = {}
+        self._timings = {}
+        # per-request latencies: time spent waiting for a client, time spent
+        # in the hands of the driver, and total time from queueing to result
+        self.latency_stats = {
+            "queue": LatencyHistogram(),
+            "dispatch": LatencyHistogram(),
+            "finish": LatencyHistogram(),
+        }
         self.offset = 0.0  # a constant energy offset added to the results returned by the driver (hacky but simple)
 
     def open(self):
@@ -930,6 +1333,17 @@ class InterfaceSocket(object):
         self.jobs = []  # list of jobs
         self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
 
+        if self.event_driven:
+            # the selector watches the server (new clients), the clients
+            # (results or disconnections) and a socket pair that is used to
+            # wake up the polling thread when new requests are queued
+            self._selector = selectors.DefaultSelector()
+            self._wake_r, self._wake_w = socket.socketpair()
+            self._wake_r.setblocking(False)
+            self._wake_w.setblocking(False)
+            self._selector.register(self.server, selectors.EVENT_READ, "server")
+            self._selector.register(self._wake_r, selectors.EVENT_READ, "wakeup")
+
     def close(self):
         """Closes down the socket."""
 
@@ -949,6 +1363,18 @@ class InterfaceSocket(object):
         self.clients = []
         self.jobs = []
 
+        if self.event_driven:
+            self._selector.close()
+            self._wake_r.close()
+            self._wake_w.close()
+
+        if self.latency_stats["finish"].n > 0:
+            info(
+                " @interfacesocket.close: Request latencies (seconds)\n"
+                + self.latency_report(),
+                verbosity.medium,
+            )
+
         try:
             self.server.shutdown(socket.SHUT_RDWR)
             self.server.close()
@@ -1094,12 +1520,16 @@ class InterfaceSocket(object):
             match_seq = ["any"]
         elif self.match_mode == "lock":
             match_seq = ["match", "none"]
+        elif self.match_mode == "cost":
+            match_seq = ["any"]
 
         # first: dispatches jobs to free clients (if any!)
         # tries first to match previous replica<>driver association, then to get new clients, and only finally send the a new replica to old drivers
         ndispatch = 0
         tdispatch -= time.time()
         while len(freec) > 0 and len(self.prlist) > 0:
+            if self.match_mode == "cost":
+                self._sort_by_cost(freec)
             for match_ids in match_seq:
                 for fc in freec[:]:
                     if self.dispatch_free_client(fc, match_ids):
@@ -1136,6 +1566,8 @@ class InterfaceSocket(object):
             if chk == 1:
                 nfinished += 1
                 finished_ids.append(ijob)
+                self._record_cost(r, c)
+                self._record_latency(r)
             elif chk == 0:
                 self.poll_iter = UPDATEFREQ  # client disconnected. force a pool_update
                 finished_ids.append(ijob)
@@ -1165,7 +1597,42 @@ class InterfaceSocket(object):
         and the dead client is flagged so the next `pool_update` prunes it.
         """
 
-        # Dispatch phase: hand each free client a queued request
+        self._dispatch_free_clients()
+
+        # Flag any dead clients for pool_update.
+        if len(self.jobs) == 0:
+            for c in self.clients:
+                if c.status == Status.Disconnected:
+                    self.poll_iter = UPDATEFREQ
+                    return
+            return
+
+        # Collect phase: drain in-flight jobs as they become readable. Jobs
+        # whose result is no longer needed, because a speculative copy has
+        # already completed, are collected at the next poll
+        while any(r.get("primary", r)["status"] != "Done" for r, _, _ in self.jobs):
+            sockets = [c for _, c, _ in self.jobs]
+            try:
+                readable, _, _ = select.select(sockets, [], [], 0.01)
+            except (OSError, ValueError) as e:
+                warning(
+                    " @SOCKET: select error in _pool_distribute_select: %s" % str(e),
+                    verbosity.low,
+                )
+                break
+
+            if readable:
+                self._collect_readable(readable)
+            # free clients pick up the requests that are still queued, or
+            # that have been queued since, without waiting for the others
+            self._dispatch_free_clients()
+
+            self._drop_timed_out_jobs()
+
+    def _dispatch_free_clients(self):
+        """Hands each free client a queued request, following the matching
+        heuristics, using the consolidated `dispatch_send`."""
+
         busy = {id(c) for _, c, _ in self.jobs}
         freec = [c for c in self.clients if id(c) not in busy]
 
@@ -1178,9 +1645,13 @@ class InterfaceSocket(object):
             match_seq = ["any"]
         elif self.match_mode == "lock":
             match_seq = ["match", "none"]
+        elif self.match_mode == "cost":
+            match_seq = ["any"]
 
         while len(freec) > 0 and len(self.prlist) > 0:
             dispatched_this_round = False
+            if self.match_mode == "cost":
+                self._sort_by_cost(freec)
             for match_ids in match_seq:
                 for fc in freec[:]:
                     if self.dispatch_free_client(fc, match_ids):
@@ -1195,81 +1666,347 @@ class InterfaceSocket(object):
             if not dispatched_this_round:
                 break
 
-        # Flag any dead clients for pool_update.
-        if len(self.jobs) == 0:
-            for c in self.clients:
-                if c.status == Status.Disconnected:
-                    self.poll_iter = UPDATEFREQ
-                    return
+        if self.speculative and len(freec) > 0 and len(self.prlist) == 0:
+            self._speculate(freec)
+
+    def _sort_by_cost(self, freec):
+        """Sorts the free clients from the fastest to the slowest, and the
+        pending requests from the most to the least expensive, so that the
+        matching sends the longest calculations to the fastest clients.
+        Requests that have never been evaluated are assumed to have the
+        average cost."""
+
+        freec.sort(key=lambda c: c.slowness)
+        if self.costs:
+            mean = sum(self.costs.values()) / len(self.costs)
+            self.prlist.sort(key=lambda r: -self.costs.get(r["id"], mean))
+
+    def _speculate(self, freec):
+        """Sends copies of the running requests that are expected to finish
+        last to the idle clients in freec, when they are expected to return
+        a result before the client that is working on them. Whichever
+        result arrives first is used, and the other is discarded."""
+
+        now = time.time()
+        freec.sort(key=lambda c: c.slowness)
+        for fc in freec:
+            if not (fc.status & Status.Up) or fc.status & Status.HasData:
+                continue
+            straggler, eta = None, None
+            for r, c, _ in self.jobs:
+                if "primary" in r or "twin" in r or c.batch:
+                    continue
+                cost = self.costs.get(r["id"])
+                if cost is None:
+                    continue
+                # expected completion time on the current and on the idle client
+                rend = r["start"] + cost * c.slowness
+                if now + cost * fc.slowness < rend and (eta is None or rend > eta):
+                    straggler, eta = r, rend
+            if straggler is None:
+                break
+
+            twin = straggler.__class__(straggler)
+            twin["primary"] = straggler
+            if verbosity.high:
+                info(
+                    " @interfacesocket._speculate: sending a copy of request id %4s to client %d"
+                    % (str(straggler["id"]), fc.cid),
+                    verbosity.high,
+                )
+            if not fc.dispatch_send(twin):
+                self._requeue_disconnected(twin, fc)
+                continue
+            straggler["twin"] = twin
+            self.jobs.append([twin, fc, None])
+
+    def _complete(self, r, c, share=1.0):
+        """Book-keeping for a request whose result has been received from
+        client c. If r is a speculative copy, its result is handed to the
+        original request, unless that has already been completed.
+
+        Args:
+            r: The request.
+            c: The client that has evaluated it.
+            share: The fraction of the evaluation time of c that should be
+                attributed to r, e.g. when the request was part of a batch.
+        """
+
+        self._record_cost(r, c, share)
+        primary = r.get("primary")
+        if primary is None:
+            r.pop("twin", None)
+            self._record_latency(r)
+            return
+        if primary["status"] == "Done":
             return
 
-        # Collect phase: drain in-flight jobs as they become readable
-        while self.jobs:
-            sockets = [c for _, c, _ in self.jobs]
+        # the copy won: detaches the job of the original request, so that
+        # the result of the slower client is discarded when it arrives
+        for job in self.jobs:
+            if job[0] is primary:
+                job[0] = primary.__class__(primary)
+                job[0]["primary"] = primary
+        if primary in self.prlist:
+            self.prlist.remove(primary)
+        for k in ["result", "start", "t_dispatched", "t_finished", "client"]:
+            primary[k] = r[k]
+        primary.pop("twin", None)
+        self._record_latency(primary)
+        primary["status"] = "Done"
+        primary._event_done.set()
+
+    def _collect_readable(self, readable):
+        """Receives the results from the busy clients in `readable`, and
+        removes the corresponding jobs. Requests whose client died
+        mid-receive are put back on the queue."""
+
+        readable_ids = {id(c) for c in readable}
+        drop_ids = []
+        received = {}
+        share = {}
+        for ijob, [r, c, _] in enumerate(self.jobs):
+            if id(c) not in readable_ids:
+                continue
+            if id(c) not in received:
+                # clients working on a batch return all the results at once
+                if c.batch:
+                    share[id(c)] = 1.0 / len(c.batch)
+                    received[id(c)] = c.dispatch_recv_batch()
+                else:
+                    share[id(c)] = 1.0
+                    received[id(c)] = c.dispatch_recv(r)
+            if received[id(c)]:
+                self._complete(r, c, share[id(c)])
+            else:
+                # Client died mid-receive: re-queue the request and
+                # let pool_update remove the client.
+                self._requeue_disconnected(r, c)
+            drop_ids.append(ijob)
+        for ijob in reversed(drop_ids):
+            del self.jobs[ijob]
+
+    def _drop_timed_out_jobs(self):
+        """Drops jobs whose client has gone past the timeout. The request
+        is re-queued so it will be picked up by another client."""
+
+        if self.timeout > 0 and self.jobs:
+            now = time.time()
+            drop_ids = []
+            for ijob, [r, c, _] in enumerate(self.jobs):
+                if r["start"] > 0 and now - r["start"] > self.timeout:
+                    warning(
+                        " @SOCKET:  Timeout! request has been running for "
+                        + str(now - r["start"])
+                        + " sec.",
+                        verbosity.low,
+                    )
+                    warning(
+                        " @SOCKET:   Client "
+                        + str(c.peername)
+                        + " died or got unresponsive(A). Disconnecting.",
+                        verbosity.low,
+                    )
+                    try:
+                        c.shutdown(socket.SHUT_RDWR)
+                    except socket.error:
+                        pass
+                    if self.event_driven:
+                        self._unregister(c)
+                    c.close()
+                    c.status = Status.Disconnected
+                    self._requeue_disconnected(r, c)
+                    drop_ids.append(ijob)
+            for ijob in reversed(drop_ids):
+                del self.jobs[ijob]
+
+    def _record_latency(self, r):
+        """Accumulates the timings of a completed request."""
+
+        self.latency_stats["queue"].add(r["t_dispatched"] - r["t_queued"])
+        self.latency_stats["dispatch"].add(r["t_finished"] - r["t_dispatched"])
+        self.latency_stats["finish"].add(r["t_finished"] - r["t_queued"])
+
+    def _record_cost(self, r, c, share=1.0):
+        """Updates the running average of the time client c takes to evaluate
+        the requests with the id of r, and from it the slowness of c and the
+        cost of the requests.
+
+        The slowness of c is only learned from requests that other clients
+        have also evaluated, comparing its time with theirs, as otherwise it
+        could not be told apart from the cost of the request."""
+
+        dt = (r["t_finished"] - r["t_dispatched"]) * share
+        times = self._timings.setdefault(r["id"], {})
+        if c.cid in times:
+            last = times[c.cid][0]
+            dt = last + COSTDECAY * (dt - last)
+        times[c.cid] = (dt, c)
+
+        # time taken by the other clients, in units of unit slowness
+        ref = [t / oc.slowness for cid, (t, oc) in times.items() if cid != c.cid]
+        if dt > 0 and len(ref) > 0 and sum(ref) > 0:
+            c.slowness += COSTDECAY * (dt * len(ref) / sum(ref) - c.slowness)
+        costs = [t / oc.slowness for t, oc in times.values()]
+        self.costs[r["id"]] = sum(costs) / len(costs)
+
+    def latency_report(self):
+        """Returns a summary of the request latencies collected so far."""
+
+        return "\n".join(
+            "   %-9s %s" % (k, h.summary()) for k, h in self.latency_stats.items()
+        )
+
+    def notify(self):
+        """Wakes up the event-driven polling thread, e.g. because a new
+        request has been queued. Does nothing in polling mode."""
+
+        if self.event_driven:
             try:
-                readable, _, _ = select.select(sockets, [], [], 0.01)
-            except (OSError, ValueError) as e:
-                warning(
-                    " @SOCKET: select error in _pool_distribute_select: %s" % str(e),
-                    verbosity.low,
-                )
-                break
+                self._wake_w.send(b"\0")
+            except (BlockingIOError, OSError):
+                # the channel is full (so a wake-up is already pending) or closed
+                pass
 
-            if readable:
-                readable_ids = {id(c) for c in readable}
-                drop_ids = []
-                for ijob, [r, c, _] in enumerate(self.jobs):
-                    if id(c) not in readable_ids:
-                        continue
-                    if c.dispatch_recv(r):
-                        drop_ids.append(ijob)
+    def _unregister(self, c):
+        """Removes a client from the event selector, if it is registered."""
+
+        try:
+            self._selector.unregister(c)
+        except (KeyError, ValueError):
+            pass
+
+    def poll_events(self, timeout=SERVERTIMEOUT):
+        """Called in the main thread loop when the interface is event-driven.
+
+        Blocks until the server socket, one of the clients or the wake-up
+        channel become readable, and reacts to the events: accepts new
+        clients, collects results, prunes disconnected clients, and
+        dispatches queued requests to free clients. `timeout` only bounds
+        the wait so that the loop can check whether it should terminate,
+        and is shortened to honor the per-request timeout.
+        """
+
+        if self.timeout > 0 and self.jobs:
+            now = time.time()
+            deadline = min(
+                r["start"] + self.timeout for r, _, _ in self.jobs if r["start"] > 0
+            )
+            timeout = max(0.0, min(timeout, deadline - now))
+
+        busy = {id(c): ijob for ijob, [_, c, _] in enumerate(self.jobs)}
+        readable = []
+        for key, mask in self._selector.select(timeout):
+            if key.data == "server":
+                self._accept_client()
+            elif key.data == "wakeup":
+                try:
+                    while self._wake_r.recv(4096):
+                        pass
+                except (BlockingIOError, OSError):
+                    pass
+            elif id(key.fileobj) in busy:
+                readable.append(key.fileobj)
+            else:
+                # an idle client should never have anything to say:
+                # this is (most likely) a disconnection
+                c = key.fileobj
+                try:
+                    if len(c.recv(HDRLEN, socket.MSG_PEEK)) == 0:
+                        c.status = Status.Disconnected
                     else:
-                        # Client died mid-receive: re-queue the request and
-                        # let pool_update remove the client.
-                        self._requeue_disconnected(r, c)
-                        drop_ids.append(ijob)
-                for ijob in reversed(drop_ids):
-                    del self.jobs[ijob]
-
-            # Drop jobs whose client has gone past the timeout. The request
-            # is re-queued so it will be picked up by another client.
-            if self.timeout > 0 and self.jobs:
-                now = time.time()
-                drop_ids = []
-                for ijob, [r, c, _] in enumerate(self.jobs):
-                    if r["start"] > 0 and now - r["start"] > self.timeout:
                         warning(
-                            " @SOCKET:  Timeout! request has been running for "
-                            + str(now - r["start"])
-                            + " sec.",
+                            " @SOCKET:   Unexpected message from idle client "
+                            + str(c.peername),
                             verbosity.low,
                         )
-                        warning(
-                            " @SOCKET:   Client "
-                            + str(c.peername)
-                            + " died or got unresponsive(A). Disconnecting.",
-                            verbosity.low,
-                        )
-                        try:
-                            c.shutdown(socket.SHUT_RDWR)
-                        except socket.error:
-                            pass
-                        c.close()
-                        c.status = Status.Disconnected
-                        self._requeue_disconnected(r, c)
-                        drop_ids.append(ijob)
-                for ijob in reversed(drop_ids):
-                    del self.jobs[ijob]
+                        c.get_status()
+                except (socket.timeout, BlockingIOError):
+                    pass
+                except socket.error:
+                    c.status = Status.Disconnected
+
+        if readable:
+            self._collect_readable(readable)
+        self._drop_timed_out_jobs()
+        self._prune_clients()
+
+        if len(self.requests) > 0:
+            self._dispatch_free_clients()
+
+    def _accept_client(self):
+        """Accepts a new client and adds it to the event selector (event-driven
+        counterpart of the search loop in `pool_update`)."""
+
+        try:
+            client, address = self.server.accept()
+        except socket.error:
+            return
+        client.settimeout(TIMEOUT)
+        driver = Driver(client)
+        info(
+            " @interfacesocket.poll_events:   Client asked for connection from "
+            + str(address)
+            + ". Now hand-shaking.",
+            verbosity.low,
+        )
+        driver.get_status()
+        if driver.status & Status.Up:
+            driver.exit_on_disconnect = self.exit_on_disconnect
+            self.clients.append(driver)
+            self._selector.register(driver, selectors.EVENT_READ, "client")
+            info(
+                " @interfacesocket.poll_events:   Handshaking was successful. Added to the client list.",
+                verbosity.low,
+            )
+        else:
+            warning(
+                " @SOCKET:   Handshaking failed. Dropping connection.",
+                verbosity.low,
+            )
+            client.shutdown(socket.SHUT_RDWR)
+            client.close()
+
+    def _prune_clients(self):
+        """Removes disconnected clients from the client list and the event
+        selector, re-queueing the requests they were working on."""
+
+        for c in self.clients[:]:
+            if c.status & Status.Up:
+                continue
+            warning(
+                " @SOCKET:   Client "
+                + str(c.peername)
+                + " died or got unresponsive(C). Removing from the list.",
+                verbosity.low,
+            )
+            self._unregister(c)
+            try:
+                c.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            c.close()
+            c.status = Status.Disconnected
+            self.clients.remove(c)
+            for r, j, _ in self.jobs:
+                if j is c:
+                    self._requeue_disconnected(r, c)
+            self.jobs = [w for w in self.jobs if w[1] is not c]
 
     def _requeue_disconnected(self, r, c):
         """Puts a request back on the queue after its assigned client died.
 
         Resets the request bookkeeping so the next dispatch pass treats it
         as fresh, and forces an early pool_update so the dead client is
-        pruned from the client list promptly.
+        pruned from the client list promptly. Speculative copies are just
+        dropped, as the original request is still running.
         """
-        r["status"] = "Queued"
-        r["start"] = -1
+        if "primary" in r:
+            if r["primary"].get("twin") is r:
+                del r["primary"]["twin"]
+        else:
+            r["status"] = "Queued"
+            r["start"] = -1
         c.status = Status.Disconnected
         self.poll_iter = UPDATEFREQ
 
@@ -1334,7 +2071,18 @@ class InterfaceSocket(object):
                     ),
                     verbosity.high,
                 )
-            if self.consolidate_messages:
+            if self.consolidate_messages and fc.caps.get("batch", 1) > 1:
+                batch = [r] + self._pop_batch(fc.caps["batch"] - 1, len(r["active"]))
+            else:
+                batch = [r]
+            if len(batch) > 1:
+                if not fc.dispatch_send_batch(batch):
+                    for rb in batch:
+                        self._requeue_disconnected(rb, fc)
+                    return False
+                for rb in batch:
+                    self.jobs.append([rb, fc, None])
+            elif self.consolidate_messages:
                 if not fc.dispatch_send(r):
                     self._requeue_disconnected(r, fc)
                     return False
@@ -1346,6 +2094,29 @@ class InterfaceSocket(object):
 
         return False
 
+    def _pop_batch(self, nmax, nactive):
+        """Takes up to nmax further pending requests with nactive active
+        coordinates, to be sent to a client together with the one that
+        has just been matched. The queue is shared fairly between the
+        clients that are currently free, so that batching does not leave
+        other clients idle."""
+
+        busy = {id(c) for _, c, _ in self.jobs}
+        nfree = max(1, sum(1 for c in self.clients if id(c) not in busy))
+        nmax = min(nmax, -(-len(self.prlist) // nfree))
+
+        batch = []
+        for r in self.prlist[:]:
+            if len(batch) >= nmax:
+                break
+            if r["status"] != "Queued" or len(r["active"]) != nactive:
+                continue
+            r["offset"] = self.offset
+            r["status"] = "Running"
+            self.prlist.remove(r)
+            batch.append(r)
+        return batch
+
     def check_job_finished(self, r, c, ct):
         """
         Checks if a job has been completed, and retrieves the results
@@ -3,6 +3,7 @@ __DRIVER_NAME__ = "dummy"
 __DRIVER_CLASS__ = "Dummy_driver"
 
 import json
+import numpy as np
 from ipi.utils.messages import warning, verbosity
 
 
@@ -38,6 +39,31 @@ class Dummy_driver(object):
         )  # have json formatting to potentially work with some test examples. meaningless value
         return pot, force, vir, extras
 
+    def compute_batch(self, cell, pos):
+        """Evaluate several structures with the same number of atoms.
+
+        Drivers that can evaluate many structures at once should override this;
+        by default the structures are evaluated one at a time.
+
+        Args:
+            cell: array of shape (nstruct, 3, 3) with the cells
+            pos: array of shape (nstruct, natoms, 3) with the positions
+
+        Returns:
+            arrays with the potentials (nstruct,), the forces (nstruct, natoms, 3)
+            and the virials (nstruct, 3, 3), and a list with the extras
+        """
+
+        warning("Batched execution will execute in serial.", verbosity.high)
+        results = [self.compute_structure(c, p) for c, p in zip(cell, pos)]
+        pot, force, vir, extras = zip(*results)
+        return (
+            np.asarray(pot, float),
+            np.asarray(force, float).reshape(pos.shape),
+            np.asarray(vir, float).reshape(cell.shape),
+            list(extras),
+        )
+
     def compute(self, cell, pos):
         """Does nothing, but returns properties that can be used by the driver loop."""
 
@@ -46,8 +72,10 @@ class Dummy_driver(object):
                 raise ValueError(
                     "Both position and cell should be given as lists to run in batched mode"
                 )
-            warning("Batched execution will execute in serial.", verbosity.high)
-            return [self.compute_structure(cell, pos) for cell, pos in zip(cell, pos)]
+            if len(set(np.shape(p) for p in pos)) > 1:
+                warning("Batched execution will execute in serial.", verbosity.high)
+                return [self.compute_structure(c, p) for c, p in zip(cell, pos)]
+            return list(zip(*self.compute_batch(np.asarray(cell), np.asarray(pos))))
         else:
             return self.compute_structure(cell, pos)
 
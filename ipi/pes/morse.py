@@ -108,3 +108,8 @@ class MorseHarmonic_driver(Dummy_driver):
         extras = "empty"
         # Reshape forces back to original shape
         return np.sum(pot), force, vir, extras
+
+    def compute_batch(self, cell, pos):
+        """Compute potentials and forces for a batch of structures"""
+        pot, force = self.both(pos)
+        return pot.sum(axis=1), force, cell * 0.0, ["empty"] * len(pos)
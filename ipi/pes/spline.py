@@ -133,3 +133,24 @@ class Spline_driver(Dummy_driver):
             extras = ""
 
         return pot, force, vir, extras
+
+    def compute_batch(self, cell, pos):
+        """Evaluate energy, forces and friction for a batch of structures"""
+        assert pos.shape[1:] == (1, 3)
+        x = factor_coord * pos[:, 0, 0]
+        d = 0.001
+
+        pot = self.spline_e(x)
+        pot += 0.5 * self.k * (pos[:, 0, 1] ** 2 + pos[:, 0, 2] ** 2)
+        force = np.zeros(pos.shape)
+        force[:, 0, 0] = -(self.spline_e(x + d) - self.spline_e(x - d)) / (2 * d)
+        force[:, 0, 1:] = -self.k * pos[:, 0, 1:]
+
+        if friction:
+            extras = [
+                json.dumps({"friction": self.get_friction(p).tolist()}) for p in pos
+            ]
+        else:
+            extras = [""] * len(pos)
+
+        return pot, force, cell * 0.0, extras
@@ -6,7 +6,9 @@ Angstrom and eV), and output files are read in a dictionary of
 numpy arrays.
 """
 
+import os
 import re
+import itertools
 import numpy as np
 from ipi.utils.units import unit_to_user
 from ipi.utils.messages import warning, verbosity
@@ -20,36 +22,31 @@ except ImportError:
 __all__ = ["read_output", "read_trajectory"]
 
 
-def read_output(filename):
-    """Reads an i-PI output file and returns a dictionary with the properties in a tidy order,
-    and information on units and descriptions of the content.
+# Regex pattern to match header lines and capture relevant parts
+_header_pattern = re.compile(
+    r"#\s*(column|cols\.)\s+(\d+)(?:-(\d+))?\s*-->\s*([^\s\{\(]+)(?:\{([^\}]+)\})?(?:\(([^\)]+)\))?(?:\{([^\}]+)\})?\s*:\s*(.*)"
+)
 
-    Usage:
-        read_output("filename")
+# number of data lines that are parsed at once
+_CHUNK = 16384
 
-    Returns:
-        values, info
 
-        values: a dictionary with the property names as keys, and the values as numpy arrays
-        info: a dictionary with the property names as keys and as values tuples of (units, description)
-    """
+def _read_header(filedesc):
+    """Reads the comment lines at the top of an output file.
 
-    # Regex pattern to match header lines and capture relevant parts
-    header_pattern = re.compile(
-        r"#\s*(column|cols\.)\s+(\d+)(?:-(\d+))?\s*-->\s*([^\s\{\(]+)(?:\{([^\}]+)\})?(?:\(([^\)]+)\))?(?:\{([^\}]+)\})?\s*:\s*(.*)"
-    )
-
-    # Reading the file
-    with open(filename, "r") as file:
-        lines = file.readlines()
-
-    header_lines = [line for line in lines if line.startswith("#")]
-    data_lines = [line for line in lines if not line.startswith("#") and line.strip()]
+    Returns:
+        A list of (name, first column, last column + 1, units, description)
+        tuples, with 0-based column indices, and the first data line (None
+        if the file contains no data).
+    """
 
-    # Interprets properties
-    properties = {}
-    for line in header_lines:
-        match = header_pattern.match(line)
+    properties = []
+    for line in filedesc:
+        if not line.startswith("#"):
+            if line.strip():
+                return properties, line
+            continue
+        match = _header_pattern.match(line)
         if match:
             # Extracting matched groups
             (
@@ -62,48 +59,145 @@ def read_output(filename):
                 units_after,
                 description,
             ) = match.groups()
-            col_info = f"{start_col}-{end_col}" if end_col else start_col
             units = units_before
             if units_after is not None:
                 units = units_after
             if args is not None:
                 property_name += f"({args})"
+            end_col = end_col if end_col else start_col
+            properties.append(
+                (property_name, int(start_col) - 1, int(end_col), units, description)
+            )
+    return properties, None
+
+
+def _load_table(lines, usecols=None, start=0, stop=None, stride=1):
+    """Parses the numeric data in a sequence of lines, a chunk at a time.
+
+    Args:
+        lines: An iterable over the lines of the file. Comments and blank
+            lines are skipped.
+        usecols: The (0-based) indices of the columns to read, or None to
+            read all of them.
+        start, stop, stride: Select the rows that are read, as in a slice.
+
+    Returns:
+        A 2D array with one row per selected line.
+    """
+
+    if start != 0 or stop is not None or stride != 1:
+        # rows are counted only among the data lines
+        lines = (line for line in lines if line.strip() and not line.startswith("#"))
+        lines = itertools.islice(lines, start, stop, stride)
+    else:
+        # loadtxt skips comments and blank lines by itself
+        lines = iter(lines)
+
+    blocks = []
+    while True:
+        chunk = list(itertools.islice(lines, _CHUNK))
+        if len(chunk) == 0:
+            break
+        block = np.loadtxt(chunk, usecols=usecols, ndmin=2)
+        if len(block) > 0:
+            blocks.append(block)
+
+    if len(blocks) == 0:
+        return np.zeros((0, 0 if usecols is None else len(usecols)))
+    return np.concatenate(blocks)
+
+
+def _load_cached_table(filename, lines):
+    """Returns the whole numeric table of an output file, reading it from a
+    binary copy stored next to it if that is up to date, and creating the
+    binary copy otherwise."""
+
+    stat = os.stat(filename)
+    stamp = np.array([stat.st_size, stat.st_mtime_ns])
+    sidecar = filename + ".cache.npz"
+    try:
+        with np.load(sidecar) as cached:
+            if np.array_equal(cached["stamp"], stamp):
+                return cached["table"]
+    except (OSError, KeyError, ValueError):
+        pass
+
+    table = _load_table(lines)
+    try:
+        with open(sidecar, "wb") as cached:
+            np.savez(cached, table=table, stamp=stamp)
+    except OSError:
+        warning("Could not write the cache file " + sidecar, verbosity.low)
+    return table
+
+
+def read_output(
+    filename, properties=None, start=0, stop=None, stride=1, cache=False, squeeze=True
+):
+    """Reads an i-PI output file and returns a dictionary with the properties in a tidy order,
+    and information on units and descriptions of the content.
+
+    The header is parsed once, and then only the columns of the requested
+    properties are converted, in chunks of lines, so that long files can be
+    read quickly and without holding all their text in memory.
+
+    Usage:
+        read_output("filename")
+        read_output("filename", properties=["time", "potential"], start=1000, stride=10)
+
+    Args:
+        filename: The name of the output file.
+        properties: A list with the names of the properties to read
+            (as they appear in the keys of the returned dictionaries). Reads
+            all of them if None.
+        start, stop, stride: Only read the frames (data lines) selected by
+            this slice.
+        cache: If True, a binary copy of the data is stored in
+            `filename.cache.npz`, and used in subsequent calls as long as
+            the output file has not changed.
+        squeeze: If False, the values of each property are returned as a
+            (nframes, ncolumns) array, even if it has a single column or
+            a single frame.
+
+    Returns:
+        values, info
+
+        values: a dictionary with the property names as keys, and the values as numpy arrays
+        info: a dictionary with the property names as keys and as values tuples of (units, description)
+    """
+
+    with open(filename, "r") as file:
+        header, first = _read_header(file)
+
+        if properties is not None:
+            available = {prop[0]: prop for prop in header}
+            missing = [name for name in properties if name not in available]
+            if len(missing) > 0:
+                raise ValueError(
+                    "Properties %s not found in %s" % (", ".join(missing), filename)
+                )
+            header = [available[name] for name in properties]
 
-            properties[col_info] = {
-                "name": property_name,
-                "units": units,
-                "description": description,
-            }
+        usecols = [col for prop in header for col in range(prop[1], prop[2])]
+        lines = itertools.chain([] if first is None else [first], file)
+        if len(usecols) == 0:
+            table = np.zeros((0, 0))
+        elif cache:
+            table = _load_cached_table(filename, lines)[start:stop:stride, usecols]
+        else:
+            table = _load_table(lines, usecols, start, stop, stride)
 
-    # Parse data
     values_dict = {}
     info_dict = {}
-    for col_info, prop_info in properties.items():
-        # Initialize list to hold values for each property
-        values_dict[prop_info["name"]] = []
-        # Save units and description
-        info_dict[prop_info["name"]] = (prop_info["units"], prop_info["description"])
-
-    for line in data_lines:
-        values = line.split()
-        for column_info, prop_info in properties.items():
-            if "-" in column_info:  # Multi-column property
-                start_col, end_col = map(
-                    int, column_info.split("-")
-                )  # 1-based indexing
-                prop_values = values[
-                    start_col - 1 : end_col
-                ]  # Adjust to 0-based indexing
-            else:  # Single column property
-                col_index = int(column_info) - 1  # Adjust to 0-based indexing
-                prop_values = [values[col_index]]
-
-            values_dict[prop_info["name"]].append([float(val) for val in prop_values])
-
-    for prop_name, prop_values in values_dict.items():
-        values_dict[prop_name] = np.array(
-            prop_values
-        ).squeeze()  # make 1-col into a flat array
+    icol = 0
+    for name, start_col, end_col, units, description in header:
+        ncol = end_col - start_col
+        values_dict[name] = np.ascontiguousarray(table[:, icol : icol + ncol])
+        if squeeze:
+            # make 1-col into a flat array
+            values_dict[name] = values_dict[name].squeeze()
+        info_dict[name] = (units, description)
+        icol += ncol
 
     return values_dict, info_dict
 
@@ -24,6 +24,7 @@ taint all downstream dependants eagerly.
 import weakref
 import threading
 
+from contextlib import contextmanager
 from copy import deepcopy
 
 import operator as _op
@@ -47,9 +48,43 @@ __all__ = [
     "dproperties",
     "ddot",
     "noddot",
+    "dbatch",
+    "dfreeze",
 ]
 
 
+class _DependGraph(object):
+    """Global state of the dependency graph.
+
+    Attributes:
+        version: Counter incremented whenever a dependency is added, used to
+            invalidate the flattened lists of dependants.
+        frozen: True if taints are propagated through the flattened lists of
+            dependants rather than by walking the graph (see `dfreeze`).
+        nbatches: Number of open taint batches, in any thread (see `dbatch`).
+        special: True if the graph is frozen or a batch is open, i.e. if
+            taints cannot take the plain recursive path.
+        lock: Protects nbatches.
+        local: Thread-local storage holding the queue of the taint batch
+            open in the current thread, if any.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.frozen = False
+        self.nbatches = 0
+        self.special = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def update(self):
+        # single flag checked on the taint fast path
+        self.special = self.frozen or self.nbatches > 0
+
+
+_graph = _DependGraph()
+
+
 class synchronizer(object):
     """Registry of synchronized peer depend objects.
 
@@ -76,8 +111,14 @@ class depend_base(object):
         _synchro: Optional `synchronizer` linking peer quantities.
         _dependants: Weak references to objects that must be tainted when
             this one changes.
+        _flat: Cached (graph version, direct dependants' flags, all
+            downstream flags), used when the graph is frozen (see `_flatten`).
     """
 
+    # class-level defaults, so that the taint fast path needs no getattr
+    _parent = None
+    _flat = None
+
     def __init__(
         self,
         name,
@@ -111,6 +152,7 @@ class depend_base(object):
             if not isinstance(item, weakref.ref):
                 dependants.remove(item)
                 dependants.append(weakref.ref(item))
+                _graph.version += 1
         self._dependants = dependants
 
         # Primitive objects start untainted; computed objects inherit the
@@ -129,6 +171,8 @@ class depend_base(object):
         for member, value in self.__dict__.items():
             if member == "_threadlock":
                 newone._threadlock = threading.RLock()
+            elif member == "_flat":
+                continue
             elif member == "_func":
                 newone._func = value
             else:
@@ -149,11 +193,20 @@ class depend_base(object):
 
     def add_dependency(self, newdep, tainted=True):
         newdep._dependants.append(weakref.ref(self))
+        _graph.version += 1
         if tainted:
             self.taint(taintme=True)
 
     def taint(self, taintme=True):
         """Plain directed acyclic graph walk: taint dependants, optionally self."""
+        if _graph.special:
+            if _graph.nbatches > 0 and self._queue_taint(taintme):
+                return
+            if _graph.frozen:
+                if self._dependants:
+                    self._taint_flat()
+                self._tainted[0] = taintme
+                return
         for item in self._dependants:
             item = item()
             if item is None:
@@ -162,6 +215,72 @@ class depend_base(object):
                 item.taint()
         self._tainted[0] = taintme
 
+    def _queue_taint(self, taintme):
+        """Queues the propagation of a taint if a batch is open in the current
+        thread (see `dbatch`). Returns False otherwise."""
+        queue = getattr(_graph.local, "queue", None)
+        if queue is None:
+            return False
+        # a later write to the same object supersedes the earlier ones
+        key = id(self)
+        queue.pop(key, None)
+        queue[key] = (self, taintme)
+        self._tainted[0] = taintme
+        return True
+
+    def _taint_flat(self):
+        """Taints everything downstream of this object through the flattened
+        list of dependants, if any of the direct dependants is not tainted."""
+        owner = self
+        while owner._parent is not None:
+            owner = owner._parent  # slices share the dependants of the parent
+        flat = owner._flat
+        if flat is None or flat[0] != _graph.version:
+            flat = owner._flatten()
+        for t in flat[1]:
+            if not t[0]:
+                for t in flat[2]:
+                    t[0] = True
+                return
+
+    def _taint_dependants(self):
+        """Taints everything downstream of this object, leaving it untouched."""
+        if _graph.frozen:
+            self._taint_flat()
+            return
+        for item in self._dependants:
+            item = item()
+            if item is None:
+                continue
+            if not item._tainted[0]:
+                item.taint()
+
+    def _flatten(self):
+        """Caches and returns the tainted flags of the direct dependants, and
+        of all the objects downstream of this one."""
+
+        direct = []
+        for item in self._dependants:
+            item = item()
+            if item is not None:
+                direct.append(item._tainted)
+        downstream = []
+        seen = {id(self)}
+        seenflags = {id(self._tainted)}
+        stack = [self]
+        while stack:
+            for item in stack.pop()._dependants:
+                item = item()
+                if item is None or id(item) in seen:
+                    continue
+                seen.add(id(item))
+                stack.append(item)
+                if id(item._tainted) not in seenflags:
+                    seenflags.add(id(item._tainted))
+                    downstream.append(item._tainted)
+        self._flat = (_graph.version, direct, downstream)
+        return self._flat
+
     def _taint_synchro(self):
         """Mark peer synchronized quantities as stale.
 
@@ -232,7 +351,10 @@ class depend_base(object):
         with self._threadlock:
             if self._tainted[0]:
                 self.update_auto()
-                self.taint(taintme=False)
+                # set() has already cleared the flag, unless there was
+                # nothing to recompute
+                if self._tainted[0]:
+                    self.taint(taintme=False)
 
 
 class depend_value(depend_base):
@@ -500,9 +622,11 @@ class depend_array(depend_base):
         (which hold references to the same underlying buffer) stay valid.
         Do NOT replace `self._value` with a new ndarray — that would
         silently desync any existing slice's `_value` from the parent's.
+        A `_func` that fills `_value` in place can return it to skip the copy.
         """
         with self._threadlock:
-            self._value[...] = value
+            if value is not self._value:
+                self._value[...] = value
             if manual and (self._synchro is not None or self._func is not None):
                 self.update_man()
             self.taint(taintme=False)
@@ -551,7 +675,9 @@ class depend_array(depend_base):
     # ------------------------------------------------------------------
 
     def __getstate__(self):
-        state = {k: v for k, v in self.__dict__.items() if k != "_threadlock"}
+        state = {
+            k: v for k, v in self.__dict__.items() if k not in ("_threadlock", "_flat")
+        }
         return state
 
     def __setstate__(self, state):
@@ -702,6 +828,64 @@ def dcopy(dfrom, dto):
     dto.add_synchro(dfrom._synchro)
     dto._tainted = dfrom._tainted
     dto._func = dfrom._func
+    _graph.version += 1
+
+
+@contextmanager
+def dbatch():
+    """Context manager that batches the taints issued in the current thread.
+
+    Writes inside the block update the values and the tainted flags of the
+    objects that are written to, but the propagation to their dependants is
+    queued, and done once for each object when the outermost block exits.
+    Dependants of the objects written inside the block are therefore NOT
+    tainted until it exits, and must not be read within it.
+
+    Example:
+        with dbatch():
+            beads.p += dp
+            beads.q += dq
+    """
+
+    local = _graph.local
+    if getattr(local, "queue", None) is not None:
+        yield  # nested block, flushed by the outermost one
+        return
+
+    local.queue = {}
+    with _graph.lock:
+        _graph.nbatches += 1
+        _graph.update()
+    try:
+        yield
+    finally:
+        queue = local.queue
+        local.queue = None
+        with _graph.lock:
+            _graph.nbatches -= 1
+            _graph.update()
+        for item, taintme in queue.values():
+            item._taint_dependants()
+            item._tainted[0] = taintme
+
+
+def dfreeze(frozen=True):
+    """Switches taint propagation to flattened lists of dependants.
+
+    When the graph is frozen, each object caches the tainted flags of all the
+    objects downstream of it, and a taint sets them in a flat loop rather
+    than recursing through the weak references of the graph. The cache is
+    rebuilt lazily whenever a dependency is added, so the graph can still be
+    modified, but that is only efficient once it has been fully built, e.g.
+    after the simulation has been bound.
+
+    Args:
+        frozen: Whether the graph should be frozen or walked recursively.
+    """
+
+    with _graph.lock:
+        _graph.frozen = bool(frozen)
+        _graph.update()
 
 
 def depraise(exception):
@@ -0,0 +1,414 @@
+"""Opt-in instrumentation of the depend machinery.
+
+When enabled, the profiler replaces `depend_base.taint`,
+`depend_base._taint_dependants` and `depend_base._refresh` with instrumented
+versions that record, for each depend object, how many times it is tainted
+and recomputed, how long its `_func` takes, and how many downstream objects
+each taint cascade reaches.
+The original methods are restored when the profiler is disabled, so that
+the depend hot path carries no overhead in normal runs.
+
+Depend objects are identified by their name and, for computed quantities,
+by the qualified name of the function that computes them, so that the many
+per-bead copies of the same quantity are aggregated into a single entry.
+
+The statistics can be written as a sorted text report and as a graph in the
+DOT format, either at the end of a run or when the process receives a signal
+(see `DependProfiler.install`).
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import signal
+import threading
+import time
+
+from ipi.utils.depend import depend_base, _graph
+from ipi.utils.messages import verbosity, info
+
+__all__ = ["DependProfiler", "depend_profiler"]
+
+
+class _NodeStats(object):
+    """Counters accumulated for one (aggregated) depend node."""
+
+    __slots__ = [
+        "refreshes",
+        "time",
+        "selftime",
+        "taints",
+        "cascades",
+        "fanout",
+        "maxfanout",
+    ]
+
+    def __init__(self):
+        self.refreshes = 0
+        self.time = 0.0
+        self.selftime = 0.0
+        self.taints = 0
+        self.cascades = 0
+        self.fanout = 0
+        self.maxfanout = 0
+
+
+def _label(dep):
+    """Returns the name under which the statistics of a depend object are
+    aggregated."""
+
+    func = dep._func
+    if isinstance(func, dict):
+        synchro = dep._synchro
+        func = func.get(synchro.manual) if synchro is not None else None
+    qualname = getattr(func, "__qualname__", None)
+    if qualname is None:
+        return dep._name
+    return "%s [%s]" % (dep._name, qualname)
+
+
+def _frozen_fanout(dep):
+    """Returns the number of nodes that a taint of dep through the frozen
+    graph is about to taint, without tainting them."""
+
+    owner = dep
+    while owner._parent is not None:
+        owner = owner._parent
+    flat = owner._flat
+    if flat is None or flat[0] != _graph.version:
+        flat = owner._flatten()
+    if all(t[0] for t in flat[1]):
+        return 0  # the direct dependants are tainted, so nothing is done
+    return sum(1 for t in flat[2] if not t[0])
+
+
+class DependProfiler(object):
+    """Collects statistics on the taint cascades and the recomputations of
+    depend objects.
+
+    Attributes:
+        stats: A dictionary of _NodeStats, keyed by the label of the node.
+        edges: A dictionary counting how many times a node has tainted
+            another, keyed by the pair of labels.
+        ncascades: The total number of taint cascades.
+        enabled: True if the depend methods are currently instrumented.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        # reentrant, as the report can be written by a signal handler
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._orig = None
+        self._start = 0.0
+        self._elapsed = 0.0
+        self.reset()
+
+    def reset(self):
+        """Clears all the collected statistics."""
+
+        with self._lock:
+            self.stats = {}
+            self.edges = {}
+            self.ncascades = 0
+            self._elapsed = 0.0
+            self._start = time.perf_counter()
+
+    def _node(self, label):
+        node = self.stats.get(label)
+        if node is None:
+            node = self.stats[label] = _NodeStats()
+        return node
+
+    def _thread_state(self):
+        local = self._local
+        if not hasattr(local, "tainting"):
+            # stack of the nodes being tainted, and of the recomputations in
+            # progress (label, time spent in nested recomputations)
+            local.tainting = []
+            local.count = 0
+            local.refreshing = []
+        return local
+
+    def _record_cascade(self, label, taintme, count):
+        """Records a taint cascade starting from label and reaching count
+        other nodes."""
+
+        with self._lock:
+            node = self._node(label)
+            if taintme:
+                node.taints += 1
+            node.cascades += 1
+            node.fanout += count
+            node.maxfanout = max(node.maxfanout, count)
+            self.ncascades += 1
+
+    def enable(self):
+        """Instruments the depend machinery.
+
+        Taints follow the same branches as in `depend_base.taint`. Taints
+        issued inside a `dbatch` block are counted when they are queued, and
+        the cascade when the batch is flushed. Cascades through a frozen
+        graph (see `dfreeze`) reach the flattened dependants directly, so
+        they are counted without recording the edges they traverse.
+        """
+
+        if self.enabled:
+            return
+        self._orig = (
+            depend_base.taint,
+            depend_base._refresh,
+            depend_base._taint_dependants,
+        )
+        profiler = self
+        untaint, _, taint_dependants = self._orig
+
+        def taint(self, taintme=True):
+            local = profiler._thread_state()
+            label = _label(self)
+            stack = local.tainting
+            if _graph.special:
+                if getattr(_graph.local, "queue", None) is not None:
+                    untaint(self, taintme)
+                    if taintme:
+                        with profiler._lock:
+                            profiler._node(label).taints += 1
+                    return
+                if _graph.frozen:
+                    count = _frozen_fanout(self) if self._dependants else 0
+                    untaint(self, taintme)
+                    if taintme or count > 0:
+                        profiler._record_cascade(label, taintme, count)
+                    return
+            if stack:
+                local.count += 1
+                edge = (stack[-1], label)
+                with profiler._lock:
+                    profiler._node(label).taints += 1
+                    profiler.edges[edge] = profiler.edges.get(edge, 0) + 1
+            else:
+                local.count = 0
+            stack.append(label)
+            try:
+                for item in self._dependants:
+                    item = item()
+                    if item is None:
+                        continue
+                    if not item._tainted[0]:
+                        item.taint()
+                self._tainted[0] = taintme
+            finally:
+                stack.pop()
+            # setting a value also clears its tainted flag through taint():
+            # this only counts as a cascade if it reaches some dependant
+            if not stack and (taintme or local.count > 0):
+                profiler._record_cascade(label, taintme, local.count)
+
+        def _taint_dependants(self):
+            # called when a batch is flushed, with no cascade in progress
+            local = profiler._thread_state()
+            label = _label(self)
+            if _graph.frozen:
+                count = _frozen_fanout(self)
+                taint_dependants(self)
+            else:
+                local.count = 0
+                local.tainting.append(label)
+                try:
+                    taint_dependants(self)
+                finally:
+                    local.tainting.pop()
+                count = local.count
+            if count > 0:
+                profiler._record_cascade(label, False, count)
+
+        def _refresh(self):
+            with self._threadlock:
+                if not self._tainted[0]:
+                    return
+                local = profiler._thread_state()
+                label = _label(self)
+                frame = [label, 0.0]
+                local.refreshing.append(frame)
+                start = time.perf_counter()
+                try:
+                    self.update_auto()
+                    # the dependants are normally tainted already, so this
+                    # is not counted as a cascade
+                    if self._tainted[0]:
+                        untaint(self, taintme=False)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    local.refreshing.pop()
+                    if local.refreshing:
+                        local.refreshing[-1][1] += elapsed
+                    with profiler._lock:
+                        node = profiler._node(label)
+                        node.refreshes += 1
+                        node.time += elapsed
+                        node.selftime += elapsed - frame[1]
+
+        depend_base.taint = taint
+        depend_base._refresh = _refresh
+        depend_base._taint_dependants = _taint_dependants
+        self._start = time.perf_counter()
+        self.enabled = True
+
+    def disable(self):
+        """Restores the original, uninstrumented depend methods."""
+
+        if not self.enabled:
+            return
+        (
+            depend_base.taint,
+            depend_base._refresh,
+            depend_base._taint_dependants,
+        ) = self._orig
+        self._orig = None
+        self._elapsed += time.perf_counter() - self._start
+        self.enabled = False
+
+    def elapsed(self):
+        """Returns the wall-clock time spent with the profiler enabled."""
+
+        if self.enabled:
+            return self._elapsed + time.perf_counter() - self._start
+        return self._elapsed
+
+    def report(self, sort="selftime", limit=None):
+        """Returns a text report of the collected statistics.
+
+        Args:
+            sort: The column used to sort the nodes, in decreasing order. One
+                of 'selftime', 'time', 'refreshes', 'taints', 'cascades' and
+                'fanout'.
+            limit: If given, only the first `limit` nodes are reported.
+        """
+
+        if sort not in _NodeStats.__slots__:
+            raise ValueError("Cannot sort the depend report by '%s'" % sort)
+        with self._lock:
+            rows = sorted(
+                self.stats.items(), key=lambda x: getattr(x[1], sort), reverse=True
+            )
+            ncascades = self.ncascades
+            nrefresh = sum(s.refreshes for s in self.stats.values())
+        lines = [
+            "# Depend profile: %d nodes, %d taint cascades, %d recomputations "
+            "in %.3f s of profiled wall time"
+            % (
+                len(rows),
+                ncascades,
+                nrefresh,
+                self.elapsed(),
+            ),
+            "# Times in seconds. Self time excludes the recomputation of the "
+            "dependencies; fan-out is the number of nodes tainted by the "
+            "cascades starting from a node.",
+            "# %10s %12s %12s %12s %10s %10s %10s %8s  %s"
+            % (
+                "refreshes",
+                "time",
+                "selftime",
+                "time/call",
+                "taints",
+                "cascades",
+                "<fanout>",
+                "fanout",
+                "node",
+            ),
+        ]
+        for label, s in rows[:limit]:
+            lines.append(
+                "  %10d %12.5e %12.5e %12.5e %10d %10d %10.1f %8d  %s"
+                % (
+                    s.refreshes,
+                    s.time,
+                    s.selftime,
+                    s.time / s.refreshes if s.refreshes else 0.0,
+                    s.taints,
+                    s.cascades,
+                    s.fanout / s.cascades if s.cascades else 0.0,
+                    s.maxfanout,
+                    label,
+                )
+            )
+        return "\n".join(lines) + "\n"
+
+    def dot(self, min_count=1):
+        """Returns the observed taint graph in the DOT format.
+
+        Nodes are labelled with their number of recomputations and self time,
+        and shaded by the fraction of the total self time; edges are labelled
+        with the number of times they have been traversed.
+
+        Args:
+            min_count: Edges traversed less than `min_count` times are left
+                out, together with the nodes that are only connected by them.
+        """
+
+        with self._lock:
+            edges = {e: n for e, n in self.edges.items() if n >= min_count}
+            stats = dict(self.stats)
+        names = set()
+        for a, b in edges:
+            names.update((a, b))
+        names.update(k for k, s in stats.items() if s.refreshes > 0)
+        ids = {name: "n%d" % i for i, name in enumerate(sorted(names))}
+        tmax = max([s.selftime for s in stats.values()] + [1e-300])
+
+        lines = ["digraph depend {", "  node [shape=box, style=filled];"]
+        for name in sorted(names):
+            s = stats.get(name, _NodeStats())
+            lines.append(
+                '  %s [label="%s\\n%d calls, %.3e s", fillcolor="1.0 %.3f 1.0"];'
+                % (
+                    ids[name],
+                    name.replace('"', '\\"'),
+                    s.refreshes,
+                    s.selftime,
+                    0.6 * s.selftime / tmax,
+                )
+            )
+        for (a, b), n in sorted(edges.items()):
+            lines.append('  %s -> %s [label="%d"];' % (ids[a], ids[b], n))
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, prefix="depend", sort="selftime", dot=False):
+        """Writes the report to prefix + '.txt', and optionally the graph to
+        prefix + '.dot'."""
+
+        with open(prefix + ".txt", "w") as f:
+            f.write(self.report(sort=sort))
+        if dot:
+            with open(prefix + ".dot", "w") as f:
+                f.write(self.dot())
+        info(" @DependProfiler: Wrote depend profile to " + prefix, verbosity.low)
+
+    def install(self, prefix="depend", sort="selftime", dot=False, signum=None):
+        """Enables the profiler, and writes the report when the simulation
+        exits.
+
+        Args:
+            prefix: The prefix of the output files.
+            sort: The column used to sort the report.
+            dot: Whether to also write the taint graph.
+            signum: If given, the report is also written whenever the process
+                receives this signal (e.g. signal.SIGUSR1), without stopping
+                the simulation.
+        """
+
+        from ipi.utils.softexit import softexit
+
+        self.enable()
+        softexit.register_function(self.dump, prefix=prefix, sort=sort, dot=dot)
+        if signum is not None:
+            signal.signal(
+                signum, lambda sig, frame: self.dump(prefix=prefix, sort=sort, dot=dot)
+            )
+
+
+depend_profiler = DependProfiler()
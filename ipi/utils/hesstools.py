@@ -6,6 +6,7 @@
 
 import numpy as np
 from ipi.utils.messages import verbosity, info
+from ipi.utils.phonontools import external_modes, project_modes
 import os
 
 
@@ -49,75 +50,22 @@ def clean_hessian(h, q, natoms, nbeads, m, m3, asr, mofi=False):
     info(" @clean_hessian: asr = %s " % asr, verbosity.medium)
     # Set some useful things
     ii = natoms * nbeads
-    mm = np.zeros((nbeads, natoms))
-    for i in range(nbeads):
-        mm[i] = m
-    mm = mm.reshape(ii)
+    mm = np.tile(m, nbeads)
     ism = m3.reshape((ii * 3, 1)) ** (-0.5)
-    dynmat = np.multiply(ism.T, np.multiply(h, ism))
-    # ismm = np.outer(ism, ism)
-    # dynmat = np.multiply(h, ismm)
+    dynmat = h * ism
+    dynmat *= ism.T
 
     if asr == "none" or asr is None:
         hm = dynmat
     else:
-        # Computes the centre of mass.
-        com = np.dot(np.transpose(q.reshape((ii, 3))), mm) / mm.sum()
-        qminuscom = q.reshape((ii, 3)) - com
-        ism = ism.flatten()
-
-        if asr == "poly":
-            # Computes the moment of inertia tensor.
-            moi = np.zeros((3, 3), float)
-            for k in range(ii):
-                moi -= (
-                    np.dot(
-                        np.cross(qminuscom[k], np.identity(3)),
-                        np.cross(qminuscom[k], np.identity(3)),
-                    )
-                    * mm[k]
-                )
-
-            I, U = np.linalg.eig(moi)
-            R = np.dot(qminuscom, U)
-            D = np.zeros((6, 3 * ii), float)
-
-            # Computes the vectors along translations and rotations.
-            # Translations
-            D[0] = np.tile([1, 0, 0], ii) / ism
-            D[1] = np.tile([0, 1, 0], ii) / ism
-            D[2] = np.tile([0, 0, 1], ii) / ism
-            # Rotations
-            for i in range(3 * ii):
-                iatom = i // 3
-                idof = np.mod(i, 3)
-                D[3, i] = (R[iatom, 1] * U[idof, 2] - R[iatom, 2] * U[idof, 1]) / ism[i]
-                D[4, i] = (R[iatom, 2] * U[idof, 0] - R[iatom, 0] * U[idof, 2]) / ism[i]
-                D[5, i] = (R[iatom, 0] * U[idof, 1] - R[iatom, 1] * U[idof, 0]) / ism[i]
-
-            for k in range(6):
-                D[k] = D[k] / np.linalg.norm(D[k])
-            # Computes the transformation matrix.
-            transfmatrix = np.eye(3 * ii) - np.dot(D.T, D)
-            hm = np.dot(transfmatrix.T, np.dot(dynmat, transfmatrix))
-
-        elif asr == "crystal":
-            # Computes the vectors along translations.
-            # Translations
-            D = np.zeros((3, 3 * ii), float)
-            D[0] = np.tile([1, 0, 0], ii) / ism
-            D[1] = np.tile([0, 1, 0], ii) / ism
-            D[2] = np.tile([0, 0, 1], ii) / ism
-
-            for k in range(3):
-                D[k] = D[k] / np.linalg.norm(D[k])
-            # Computes the transformation matrix.
-            transfmatrix = np.eye(3 * ii) - np.dot(D.T, D)
-            hm = np.dot(transfmatrix.T, np.dot(dynmat, transfmatrix))
+        # Computes the vectors along translations (and rotations), and
+        # removes them with a low-rank update of the dynamical matrix.
+        D, I = external_modes(asr, q, mm, ism.flatten())
+        hm = project_modes(dynmat, D)
 
     # Symmetrize to use linalg.eigh
-    hmT = hm.T
-    hm = (hmT + hm) / 2.0
+    hm += hm.T
+    hm *= 0.5
 
     d, w = np.linalg.eigh(hm)
 
@@ -1204,8 +1204,8 @@ class InputArray(InputValue):
         {
             "dtype": str,
             "default": "manual",
-            "options": ["manual", "file"],
-            "help": "If 'mode' is 'manual', then the array is read in directly, then reshaped according to the 'shape' specified in a row-major manner. If 'mode' is 'file' then the array is read in from the file given.",
+            "options": ["manual", "file", "npy"],
+            "help": "If 'mode' is 'manual', then the array is read in directly, then reshaped according to the 'shape' specified in a row-major manner. If 'mode' is 'file' then the array is read in from the file given. If 'mode' is 'npy' then the array is read in from the binary numpy file given.",
         },
     )
 
@@ -1274,6 +1274,12 @@ class InputArray(InputValue):
            A string giving the stored value in the appropriate xml format.
         """
 
+        if self.mode.fetch() == "npy":
+            # the data is in a separate file, just write out its name
+            return Input.write(
+                self, name=name, indent=indent, text=" " + self._text.strip() + " "
+            )
+
         rstr = ""
         if len(self.value) > ELPERLINE:
             rstr += "\n" + indent + " [ "
@@ -1311,6 +1317,9 @@ class InputArray(InputValue):
             self.value = np.loadtxt(
                 self._text.strip(), comments="#", dtype=self.type
             ).flatten()
+        elif mode == "npy":
+            self.value = np.asarray(np.load(self._text.strip()), dtype=self.type)
+            self.value = self.value.flatten()
         else:
             raise ValueError("Unsupported array reading mode")
 
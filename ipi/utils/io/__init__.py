@@ -18,13 +18,14 @@ import json
 import numpy as np
 
 from ipi.utils.messages import info, verbosity
-from ipi.utils.units import unit_to_user
+from ipi.utils.units import unit_to_user, unit_to_internal
 from ipi.external import importlib
 from ipi.utils.decorators import cached
 
 __all__ = [
     "io_units",
     "iter_file",
+    "iter_file_batches",
     "print_file_path",
     "print_file",
     "read_file",
@@ -35,6 +36,7 @@ __all__ = [
 
 mode_map = {
     "bin": "binary",
+    "ipb32": "ipb",
 }
 
 
@@ -42,6 +44,7 @@ io_map = {
     "print_path": "print_%s_path",
     "print": "print_%s",
     "read": "read_%s",
+    "read_frames": "read_%s_frames",
     "iter": "iter_%s",
 }
 
@@ -68,19 +71,21 @@ def _get_io_function(mode, io):
 
     Args:
         mode: Which format has the file? e.g. "pdb", "xml", "bin", "extxyz", or "xyz"
-        io: One of "print_path", "print", "read" or "iter"
+        io: One of "print_path", "print", "read", "read_frames" or "iter"
     """
 
     try:
-        mode = mode[mode.find(".") + 1 :]
-        if mode in mode_map:
-            mode = mode_map[mode]
+        name = mode[mode.find(".") + 1 :]
+        mode = mode_map.get(name, name)
         module = importlib.import_module("ipi.utils.io.backends.io_%s" % mode)
     except ImportError:
         print("Error: mode %s is not supported." % mode)
         sys.exit()
 
     try:
+        # a backend can implement several formats, e.g. io_ipb for ipb32
+        if hasattr(module, io_map[io] % name):
+            mode = name
         func = getattr(module, io_map[io] % mode)
     except KeyError:
         print("Error: io %s is not supported with mode %s." % (io, mode))
@@ -402,6 +407,94 @@ def iter_file(
         )
 
 
+def iter_file_raw_batches(mode, filedesc, nframes):
+    """Takes an open `mode`-style file and yields blocks of up to `nframes`
+    consecutive frames in raw array format, without creating i-PI internal objects.
+
+    Uses the `read_<mode>_frames` function of the backend if there is one,
+    and otherwise stacks the frames returned by the reader. All the frames in
+    a block must contain the same atoms; the last block may be shorter.
+
+    Args:
+        filedesc: An open readable file object from a `mode` formatted file.
+        nframes: The number of frames in each block.
+
+    Returns:
+        Generator of dictionaries, with a list of "comments", a
+        (nframes, 3 * natoms) array of "data" and a (nframes, 3, 3) array of "cells".
+    """
+
+    try:
+        reader = _get_io_function(mode, "read_frames")
+    except AttributeError:
+        reader = None
+
+    if reader is None:
+        single = _get_io_function(mode, "read")
+
+        def reader(filedesc, nframes):
+            frames = []
+            try:
+                for _ in range(nframes):
+                    frames.append(single(filedesc=filedesc))
+            except EOFError:
+                if len(frames) == 0:
+                    raise
+            comments, cells, data, names, masses = zip(*frames)
+            return list(comments), np.array(cells), np.array(data), names[0], masses[0]
+
+    try:
+        while True:
+            comments, cells, data, names, masses = reader(
+                filedesc=filedesc, nframes=nframes
+            )
+            yield {
+                "comments": comments,
+                "data": data,
+                "masses": masses,
+                "names": names,
+                "natoms": len(names),
+                "cells": cells,
+            }
+    except EOFError:
+        pass
+
+
+def iter_file_batches(
+    mode,
+    filedesc,
+    nframes,
+    dimension="automatic",
+    units="automatic",
+    cell_units="automatic",
+):
+    """Takes an open `mode`-style file and yields blocks of up to `nframes`
+    frames, converted to atomic units as requested, or as guessed from the
+    comment line of the first frame of each block.
+
+    Args:
+        filedesc: An open readable file object from a `mode` formatted file.
+        nframes: The number of frames in each block.
+        dimension: Dimensions of the property (e.g. "length")
+        units: Units for the input (e.g. "angstrom")
+        cell_units: Units for the cell (dimension length, e.g. "angstrom")
+
+    Returns:
+        Generator of dictionaries, as returned by `iter_file_raw_batches`.
+    """
+
+    # late import is needed to break an import cycle
+    from .io_units import auto_units
+
+    for raw_read in iter_file_raw_batches(mode, filedesc, nframes):
+        bdimension, bunits, bcell_units = auto_units(
+            raw_read["comments"][0], dimension, units, cell_units, mode
+        )
+        raw_read["cells"] *= unit_to_internal("length", bcell_units, 1)
+        raw_read["data"] *= unit_to_internal(bdimension, bunits, 1)
+        yield raw_read
+
+
 def iter_file_name(filename):
     """Open a trajectory file, guessing its format from the extension.
 
@@ -8,3 +8,36 @@ binary format, pdb and xyz.
 
 
 __all__ = ["io_pdb", "io_xyz", "io_binary", "io_ase"]
+
+
+import numpy as np
+
+
+def format_rows(fmt, *columns):
+    """Formats a table, one row per line, with a single string operation.
+
+    Much faster than formatting (and writing) each row separately, which
+    matters when printing configurations with many atoms.
+
+    Args:
+        fmt: The format string of a single row.
+        columns: The columns of the table, in the order they appear in fmt.
+            Each can be a 1D array with one value per row, a 2D array that
+            fills as many consecutive columns as it has, or a scalar that is
+            repeated in all rows.
+
+    Returns:
+        A string with the formatted rows.
+    """
+
+    nrows = max(len(c) for c in columns if np.ndim(c) > 0)
+    widths = [np.shape(c)[1] if np.ndim(c) == 2 else 1 for c in columns]
+    table = np.empty((nrows, sum(widths)), dtype=object)
+    i = 0
+    for c, w in zip(columns, widths):
+        if np.ndim(c) == 2:
+            table[:, i : i + w] = c
+        else:
+            table[:, i] = c
+        i += w
+    return (fmt * nrows) % tuple(table.ravel())
@@ -0,0 +1,234 @@
+"""Functions used to print and read trajectories in the i-PI binary format.
+
+An ipb file starts with a header made of the magic string MAGIC, the format
+version and the total size of the header (two little-endian uint32), and a
+JSON dictionary padded with spaces to a multiple of 8 bytes, which contains
+the number of atoms, the atom names, the floating point type and the comment
+line of the frames. The header is followed by one fixed-size record per
+frame, holding the step, the cell and the per-atom data, so that frame i
+starts at header_size + i * record_size and the whole trajectory can be
+mapped with np.memmap (see memmap_ipb).
+
+The 'ipb' format stores the data as 64-bit floats, and 'ipb32' as 32-bit
+floats.
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import io
+import json
+import re
+import sys
+import weakref
+
+import numpy as np
+
+from ipi.utils.units import Elements
+
+__all__ = [
+    "print_ipb",
+    "print_ipb32",
+    "read_ipb",
+    "read_ipb32",
+    "memmap_ipb",
+    "ipb_header_size",
+]
+
+MAGIC = b"IPIBTRAJ"
+VERSION = 1
+
+_step_re = re.compile(r"Step:(\s*\d+)")
+
+# headers of the streams that are being written or read
+_headers = weakref.WeakKeyDictionary()
+
+
+def _binary(filedesc):
+    """Returns the binary buffer underlying a text stream."""
+
+    if hasattr(filedesc, "buffer"):
+        filedesc.flush()
+        return filedesc.buffer
+    return filedesc
+
+
+def _record_dtype(header):
+    """Returns the numpy type of a frame record."""
+
+    fdt = np.dtype(header["dtype"])
+    return np.dtype(
+        [
+            ("step", "<i8"),
+            ("cell", fdt, (3, 3)),
+            ("data", fdt, (header["natoms"], 3)),
+        ]
+    )
+
+
+def _make_header(natoms, names, dtype, title):
+    """Returns the header of a new file as bytes."""
+
+    # the step number is stored in each record, and put back in the comment
+    # with the same width
+    match = _step_re.search(title)
+    if match is None:
+        comment = [title, "", 0]
+    else:
+        comment = [title[: match.start(1)], title[match.end(1) :], len(match[1])]
+
+    meta = json.dumps(
+        {
+            "natoms": int(natoms),
+            "names": [str(n) for n in names],
+            "dtype": np.dtype(dtype).str,
+            "comment": comment,
+        }
+    ).encode()
+    size = 16 + len(meta)
+    size += -size % 8
+    return (
+        MAGIC + np.array([VERSION, size], "<u4").tobytes() + meta.ljust(size - 16, b" ")
+    )
+
+
+def _parse_header(stream):
+    """Reads the header from a binary stream positioned at its beginning."""
+
+    start = stream.read(16)
+    if len(start) == 0:
+        raise EOFError
+    if len(start) < 16 or start[:8] != MAGIC:
+        raise ValueError("Not an i-PI binary trajectory file")
+    version, size = np.frombuffer(start[8:], "<u4")
+    if version > VERSION:
+        raise ValueError("Unsupported version %d of the ipb format" % version)
+    header = json.loads(stream.read(size - 16).decode())
+    header["size"] = int(size)
+    header["record"] = _record_dtype(header)
+    return header
+
+
+def ipb_header_size(filename):
+    """Returns the size in bytes of the header, and of each frame record, of
+    an ipb file."""
+
+    with open(filename, "rb") as f:
+        header = _parse_header(f)
+    return header["size"], header["record"].itemsize
+
+
+def memmap_ipb(filename, mode="r"):
+    """Maps an ipb file to memory.
+
+    Args:
+        filename: The name of the file.
+        mode: The access mode, passed to np.memmap.
+
+    Returns:
+        The header, as a dictionary, and a np.memmap structured array with
+        fields 'step', 'cell' and 'data', with one element per frame.
+    """
+
+    with open(filename, "rb") as f:
+        header = _parse_header(f)
+        f.seek(0, 2)
+        fsize = f.tell()
+    record = header["record"]
+    nframes = (fsize - header["size"]) // record.itemsize
+    frames = np.memmap(
+        filename, dtype=record, mode=mode, offset=header["size"], shape=(nframes,)
+    )
+    return header, frames
+
+
+def print_ipb(
+    atoms,
+    cell,
+    filedesc=sys.stdout,
+    title="",
+    cell_conv=1.0,
+    atoms_conv=1.0,
+    dtype=np.float64,
+):
+    """Appends an atomic configuration to an ipb file, writing the header
+    first if the file is empty.
+
+    Args:
+        atoms: An atoms object giving the centroid positions.
+        cell: A cell object giving the system box.
+        filedesc: An open writable file object. Defaults to standard output.
+        title: This gives a string to be appended to the comment line.
+        cell_conv: Conversion factor for the cell parameters.
+        atoms_conv: Conversion factor for the atomic properties.
+        dtype: The floating point type used to store the data.
+    """
+
+    stream = _binary(filedesc)
+    header = _headers.get(filedesc)
+    if header is None:
+        if stream.tell() == 0:
+            raw = _make_header(atoms.natoms, atoms.names, dtype, title)
+            stream.write(raw)
+            header = _parse_header(io.BytesIO(raw))
+        else:
+            # appending to an existing file, e.g. after a restart
+            with open(filedesc.name, "rb") as f:
+                header = _parse_header(f)
+        if header["natoms"] != atoms.natoms:
+            raise ValueError("Number of atoms does not match the ipb file")
+        _headers[filedesc] = header
+
+    match = _step_re.search(title)
+    frame = np.zeros(1, header["record"])
+    frame["step"] = int(match.group(1)) if match is not None else -1
+    frame["cell"] = cell.h * cell_conv
+    frame["data"] = (atoms.q * atoms_conv).reshape((-1, 3))
+    stream.write(frame.tobytes())
+
+
+def print_ipb32(
+    atoms, cell, filedesc=sys.stdout, title="", cell_conv=1.0, atoms_conv=1.0
+):
+    """Appends an atomic configuration to an ipb file in single precision."""
+
+    print_ipb(atoms, cell, filedesc, title, cell_conv, atoms_conv, dtype=np.float32)
+
+
+def read_ipb(filedesc):
+    """Reads the next frame of an ipb file and returns data in raw format
+    for further units transformation and other post processing.
+
+    Args:
+        filedesc: An open readable file object from an ipb file.
+
+    Returns:
+        i-PI comment line, cell array, data (positions, forces, etc.), atoms names and masses
+    """
+
+    stream = _binary(filedesc)
+    header = _headers.get(filedesc)
+    if header is None:
+        header = _parse_header(stream)
+        _headers[filedesc] = header
+
+    record = header["record"]
+    buf = stream.read(record.itemsize)
+    if len(buf) < record.itemsize:
+        raise EOFError
+    frame = np.frombuffer(buf, record)[0]
+
+    step = int(frame["step"])
+    head, tail, width = header["comment"]
+    comment = head + ("%*d" % (width, step) if step >= 0 else "") + tail
+    cell = np.array(frame["cell"], float)
+    qatoms = np.array(frame["data"], float).flatten()
+    names = np.array(header["names"], dtype="|U4")
+    masses = np.array([Elements.mass(n) for n in names])
+
+    return comment, cell, qatoms, names, masses
+
+
+read_ipb32 = read_ipb
@@ -15,6 +15,7 @@ import numpy as np
 import ipi.utils.mathtools as mt
 from ipi.utils.depend import dstrip
 from ipi.utils.units import Elements
+from ipi.utils.io.backends import format_rows
 
 __all__ = ["print_pdb_path", "print_pdb", "read_pdb"]
 
@@ -41,42 +42,40 @@ def print_pdb_path(beads, cell, filedesc=sys.stdout, cell_conv=1.0, atoms_conv=1
     a, b, c, alpha, beta, gamma = mt.h2abc_deg(cell.h * cell_conv)
 
     z = 1  # What even is this parameter?
-    filedesc.write(fmt_cryst % (a, b, c, alpha, beta, gamma, " P 1        ", z))
+    frame = [fmt_cryst % (a, b, c, alpha, beta, gamma, " P 1        ", z)]
 
     natoms = beads.natoms
     nbeads = beads.nbeads
-    for j in range(nbeads):
-        for i in range(natoms):
-            qs = dstrip(beads.q) * atoms_conv
-            lab = dstrip(beads.names)
-            data = (
-                j * natoms + i + 1,
-                lab[i],
-                " ",
-                "  1",
-                " ",
-                1,
-                " ",
-                qs[j][3 * i],
-                qs[j][3 * i + 1],
-                qs[j][3 * i + 2],
-                0.0,
-                0.0,
-                "  ",
-                0,
-            )
-            filedesc.write(fmt_atom % data)
+    # direct access to avoid unnecessary slow-down
+    qs = dstrip(beads.q) * atoms_conv
+    lab = dstrip(beads.names)
+    frame.append(
+        format_rows(
+            fmt_atom,
+            np.arange(1, nbeads * natoms + 1),
+            np.tile(lab, nbeads),
+            " ",
+            "  1",
+            " ",
+            1,
+            " ",
+            qs.reshape((nbeads * natoms, 3)),
+            0.0,
+            0.0,
+            "  ",
+            0,
+        )
+    )
 
     if nbeads > 1:
-        for i in range(natoms):
-            filedesc.write(fmt_conect % (i + 1, (nbeads - 1) * natoms + i + 1))
-        for j in range(nbeads - 1):
-            for i in range(natoms):
-                filedesc.write(
-                    fmt_conect % (j * natoms + i + 1, (j + 1) * natoms + i + 1)
-                )
+        # links the first and last bead, and then each bead to the next
+        first = np.arange(1, natoms + 1)
+        frame.append(format_rows(fmt_conect, first, first + (nbeads - 1) * natoms))
+        first = np.arange(1, (nbeads - 1) * natoms + 1)
+        frame.append(format_rows(fmt_conect, first, first + natoms))
 
-    filedesc.write("END\n")
+    frame.append("END\n")
+    filedesc.write("".join(frame))
 
 
 def print_pdb(
@@ -99,37 +98,38 @@ def print_pdb(
         "ATOM  %5i %4s%1s%3s %1s%4i%1s   %8.3f%8.3f%8.3f%6.2f%6.2f          %2s%2i\n"
     )
 
+    frame = []
     if title != "":
-        filedesc.write("TITLE   %70s\n" % (title))
+        frame.append("TITLE   %70s\n" % (title))
 
     a, b, c, alpha, beta, gamma = mt.h2abc_deg(cell.h * cell_conv)
 
     z = 1
-    filedesc.write(fmt_cryst % (a, b, c, alpha, beta, gamma, " P 1        ", z))
+    frame.append(fmt_cryst % (a, b, c, alpha, beta, gamma, " P 1        ", z))
 
     natoms = atoms.natoms
     qs = dstrip(atoms.q) * atoms_conv
     lab = dstrip(atoms.names)
-    for i in range(natoms):
-        data = (
-            i + 1,
-            lab[i],
+    frame.append(
+        format_rows(
+            fmt_atom,
+            np.arange(1, natoms + 1),
+            lab,
             " ",
             "  1",
             " ",
             1,
             " ",
-            qs[3 * i],
-            qs[3 * i + 1],
-            qs[3 * i + 2],
+            qs.reshape((natoms, 3)),
             0.0,
             0.0,
             "  ",
             0,
         )
-        filedesc.write(fmt_atom % data)
+    )
 
-    filedesc.write("END\n")
+    frame.append("END\n")
+    filedesc.write("".join(frame))
 
 
 def read_pdb(filedesc):
@@ -9,17 +9,21 @@ in the XYZ format.
 
 import sys
 import re
+import itertools
 
 import numpy as np
 
 import ipi.utils.mathtools as mt
 from ipi.utils.depend import dstrip
 from ipi.utils.units import Elements
+from ipi.utils.io.backends import format_rows
 
-__all__ = ["print_xyz_path", "print_xyz", "read_xyz"]
+__all__ = ["print_xyz_path", "print_xyz", "read_xyz", "read_xyz_frames"]
 
 deg2rad = np.pi / 180.0
 
+fmt_atom = "%8s %12.5e %12.5e %12.5e\n"
+
 
 def print_xyz_path(beads, cell, filedesc=sys.stdout, cell_conv=1.0, atoms_conv=1.0):
     """Prints all the bead configurations into a XYZ formatted file.
@@ -40,15 +44,14 @@ def print_xyz_path(beads, cell, filedesc=sys.stdout, cell_conv=1.0, atoms_conv=1
     )
     natoms = beads.natoms
     nbeads = beads.nbeads
+    # direct access to avoid unnecessary slow-down
+    qs = dstrip(beads.q) * atoms_conv
+    lab = dstrip(beads.names)
+    frame = []
     for j in range(nbeads):
-        filedesc.write(fmt_header % (natoms, j, a, b, c, alpha, beta, gamma))
-        for i in range(natoms):
-            qs = dstrip(beads.q) * atoms_conv
-            lab = dstrip(beads.names)
-            filedesc.write(
-                "%8s %12.5e %12.5e %12.5e\n"
-                % (lab[i], qs[j][3 * i], qs[j][3 * i + 1], qs[j][3 * i + 2])
-            )
+        frame.append(fmt_header % (natoms, j, a, b, c, alpha, beta, gamma))
+        frame.append(format_rows(fmt_atom, lab, qs[j].reshape((natoms, 3))))
+    filedesc.write("".join(frame))
 
 
 def print_xyz(
@@ -69,15 +72,13 @@ def print_xyz(
     fmt_header = (
         "%d\n# CELL(abcABC): %10.5f  %10.5f  %10.5f  %10.5f  %10.5f  %10.5f  %s\n"
     )
-    filedesc.write(fmt_header % (natoms, a, b, c, alpha, beta, gamma, title))
     # direct access to avoid unnecessary slow-down
     qs = dstrip(atoms.q) * atoms_conv
     lab = dstrip(atoms.names)
-    for i in range(natoms):
-        filedesc.write(
-            "%8s %12.5e %12.5e %12.5e\n"
-            % (lab[i], qs[3 * i], qs[3 * i + 1], qs[3 * i + 2])
-        )
+    filedesc.write(
+        fmt_header % (natoms, a, b, c, alpha, beta, gamma, title)
+        + format_rows(fmt_atom, lab, qs.reshape((natoms, 3)))
+    )
 
 
 # Cell type patterns
@@ -88,27 +89,21 @@ cell_re = [
 ]
 
 
-def read_xyz(filedesc):
-    """Reads an XYZ-style file with i-PI style comments and returns data in raw format for further units transformation
-    and other post processing.
+def _read_cell(comment):
+    """Extracts the cell from the comment line of a frame.
 
     Args:
-        filedesc: An open readable file object from a xyz formatted file with i-PI header comments.
+        comment: The comment line, possibly containing the cell in one of the
+            i-PI formats.
 
     Returns:
-        i-Pi comment line, cell array, data (positions, forces, etc.), atoms names and masses
+        The cell matrix, and the inverse of the general cell matrix the
+        positions must be converted from (or None if they are already
+        consistent with the cell matrix).
     """
 
-    try:
-        natoms = int(next(filedesc))
-    except (StopIteration, ValueError):
-        raise EOFError
-
-    comment = next(filedesc)
-
-    # Extracting cell
     cell = [key.search(comment) for key in cell_re]
-    usegenh = False
+    invgenh = None
     if cell[0] is not None:  # abcABC
         a, b, c = [float(x) for x in cell[0].group(1).split()[:3]]
         alpha, beta, gamma = [float(x) * deg2rad for x in cell[0].group(1).split()[3:6]]
@@ -122,36 +117,126 @@ def read_xyz(filedesc):
         invgenh = np.linalg.inv(genh)
         # convert back & forth from abcABC representation to get an upper triangular h
         h = mt.abc2h(*mt.genh2abc(genh))
-        usegenh = True
     else:  # defaults to unit box
         h = np.array([[-1.0, 0.0, 0.0], [0.0, -1.0, 0.0], [0.0, 0.0, -1.0]])
-    cell = h
-
-    qatoms = np.zeros(3 * natoms)
-    names = np.zeros(natoms, dtype="|U4")
-    masses = np.zeros(natoms)
-
-    # Extracting a time-frame information
-    atom_counter = 0
-    for iat, line in enumerate(filedesc):
-        body = line.split()
-        names[iat], masses[iat] = body[0], Elements.mass(body[0])
-        x, y, z = float(body[1]), float(body[2]), float(body[3])
-
-        if usegenh:
-            # must convert from the input cell parameters to the internal convention
-            u = np.array([x, y, z])
-            us = np.dot(u, invgenh)
-            u = np.dot(h, us)
-            x, y, z = u
-
-        qatoms[3 * iat], qatoms[3 * iat + 1], qatoms[3 * iat + 2] = x, y, z
-        atom_counter += 1
-        if atom_counter == natoms:
-            break
+    return h, invgenh
+
+
+def _read_atoms(lines):
+    """Parses a block of atom records in one go.
+
+    Args:
+        lines: A list of lines, each starting with an atom label followed by
+            three coordinates.
+
+    Returns:
+        An array with the labels, and a (len(lines), 3) array of coordinates.
+    """
+
+    if len(lines) == 0:
+        return np.zeros(0, dtype="|U4"), np.zeros((0, 3))
+    names = np.array([line.split(None, 1)[0] for line in lines], dtype="|U4")
+    qatoms = np.loadtxt(lines, usecols=(1, 2, 3), ndmin=2)
+    return names, qatoms
+
+
+def _masses(names):
+    """Returns the masses of the atoms with the given labels, looking up
+    each element only once."""
 
-    if natoms != len(names):
+    mass = {l: Elements.mass(l) for l in set(names.tolist())}
+    return np.array([mass[l] for l in names.tolist()], float)
+
+
+def read_xyz(filedesc):
+    """Reads an XYZ-style file with i-PI style comments and returns data in raw format for further units transformation
+    and other post processing.
+
+    Args:
+        filedesc: An open readable file object from a xyz formatted file with i-PI header comments.
+
+    Returns:
+        i-Pi comment line, cell array, data (positions, forces, etc.), atoms names and masses
+    """
+
+    try:
+        natoms = int(next(filedesc))
+    except (StopIteration, ValueError):
+        raise EOFError
+
+    comment = next(filedesc)
+    cell, invgenh = _read_cell(comment)
+
+    lines = list(itertools.islice(filedesc, natoms))
+    if len(lines) != natoms:
         raise ValueError(
             "The number of atom records does not match the header of the xyz file."
         )
-    return comment, cell, qatoms, names, masses
+    names, qatoms = _read_atoms(lines)
+    if invgenh is not None:
+        # must convert from the input cell parameters to the internal convention
+        qatoms = np.dot(np.dot(qatoms, invgenh), cell.T)
+
+    return comment, cell, qatoms.flatten(), names, _masses(names)
+
+
+def read_xyz_frames(filedesc, nframes):
+    """Reads several consecutive frames of an XYZ-style file at once.
+
+    Much faster than calling read_xyz for each frame when the frames are
+    small, as all the atom records are parsed together. All the frames must
+    contain the same atoms, in the same order.
+
+    Args:
+        filedesc: An open readable file object from a xyz formatted file with i-PI header comments.
+        nframes: The maximum number of frames to read. Fewer frames are
+            returned if the end of the file is reached.
+
+    Returns:
+        A list of comment lines, a (nframes, 3, 3) array of cells, a
+        (nframes, 3 * natoms) array of data, the atom names and masses.
+
+    Raises:
+        EOFError: If there are no frames left in the file.
+        ValueError: If the frames do not all have the same atoms.
+    """
+
+    comments = []
+    lines = []
+    natoms = None
+    for k in range(nframes):
+        try:
+            nk = int(next(filedesc))
+        except (StopIteration, ValueError):
+            if k == 0:
+                raise EOFError
+            break
+        if natoms is None:
+            natoms = nk
+        elif nk != natoms:
+            raise ValueError(
+                "All the frames read together must have the same number of atoms."
+            )
+        comments.append(next(filedesc))
+        frame = list(itertools.islice(filedesc, natoms))
+        if len(frame) != natoms:
+            raise ValueError(
+                "The number of atom records does not match the header of the xyz file."
+            )
+        lines += frame
+
+    nread = len(comments)
+    names, qatoms = _read_atoms(lines)
+    names = names.reshape((nread, natoms))
+    if np.any(names != names[0]):
+        raise ValueError("All the frames read together must contain the same atoms.")
+    names = names[0]
+    qatoms = qatoms.reshape((nread, natoms, 3))
+
+    cells = np.zeros((nread, 3, 3))
+    for k, comment in enumerate(comments):
+        cells[k], invgenh = _read_cell(comment)
+        if invgenh is not None:
+            qatoms[k] = np.dot(np.dot(qatoms[k], invgenh), cells[k].T)
+
+    return comments, cells, qatoms.reshape((nread, 3 * natoms)), names, _masses(names)
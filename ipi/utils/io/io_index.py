@@ -0,0 +1,181 @@
+"""Random access to the frames of trajectory files.
+
+The byte offsets of the frames are computed once, by scanning a memory-mapped
+copy of the file, and are cached next to the trajectory so that later runs
+(e.g. restarts of a replay) can jump directly to any frame. Binary ipb files
+have fixed-size frames, so their offsets follow directly from the header.
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import io
+import mmap
+import os
+
+import numpy as np
+
+from ipi.utils.io import read_file
+from ipi.utils.io.backends.io_ipb import ipb_header_size
+from ipi.utils.messages import verbosity, info
+
+__all__ = ["FrameIndex", "INDEX_MODES"]
+
+# file formats for which frames can be located without parsing them
+INDEX_MODES = ["xyz", "pdb", "ipb"]
+
+
+class FrameIndex:
+    """Index of the frames contained in a trajectory file.
+
+    The file is memory-mapped, and the positions of the frames are saved in
+    filename + '.idx.npz', together with the size and modification time of
+    the trajectory, so that the index is only rebuilt if the file changes.
+
+    Attributes:
+        filename: The name of the trajectory file.
+        mode: The format of the trajectory file.
+        bounds: A (nframes, 2) array with the byte offsets of the beginning and
+            of the end of each frame.
+    """
+
+    def __init__(self, filename, mode="xyz"):
+        """Opens the trajectory and loads or builds its index.
+
+        Args:
+            filename: The name of the trajectory file.
+            mode: The format of the trajectory file, one of INDEX_MODES.
+        """
+
+        if mode not in INDEX_MODES:
+            raise ValueError("Cannot index trajectory files in '%s' format" % mode)
+
+        self.filename = filename
+        self.mode = mode
+        self._file = open(filename, "rb")
+        stat = os.fstat(self._file.fileno())
+        self._stamp = np.array([stat.st_size, stat.st_mtime_ns], np.int64)
+        if stat.st_size > 0:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._mm = b""
+
+        self.bounds = self._load_index()
+        if self.bounds is None:
+            info(" @FrameIndex: Indexing frames of " + filename, verbosity.medium)
+            self.bounds = self._build_index()
+            self._save_index()
+
+    def __len__(self):
+        return len(self.bounds)
+
+    @property
+    def index_filename(self):
+        return self.filename + ".idx.npz"
+
+    def _load_index(self):
+        """Returns the cached index, or None if it is missing or outdated."""
+
+        try:
+            with np.load(self.index_filename) as cached:
+                if str(cached["mode"]) == self.mode and np.array_equal(
+                    cached["stamp"], self._stamp
+                ):
+                    return cached["bounds"]
+        except (OSError, KeyError, ValueError):
+            pass
+        return None
+
+    def _save_index(self):
+        """Caches the index next to the trajectory, if the folder is writable."""
+
+        try:
+            with open(self.index_filename, "wb") as fidx:
+                np.savez(fidx, mode=self.mode, stamp=self._stamp, bounds=self.bounds)
+        except OSError:
+            info(
+                " @FrameIndex: Could not save index file " + self.index_filename,
+                verbosity.low,
+            )
+
+    def _build_index(self):
+        """Scans the file and returns the boundaries of the frames."""
+
+        size = len(self._mm)
+        data = np.frombuffer(self._mm, np.uint8) if size > 0 else np.zeros(0, np.uint8)
+        # beginning and end of each line
+        starts = np.concatenate([[0], np.flatnonzero(data == ord("\n")) + 1])
+        if starts[-1] == size:
+            starts = starts[:-1]
+        ends = np.append(starts[1:], size)
+        nlines = len(starts)
+
+        def line(k):
+            return self._mm[starts[k] : ends[k]].strip()
+
+        bounds = []
+        if self.mode == "xyz":
+            # each frame is a header with the number of atoms, a comment line
+            # and one line per atom
+            k = 0
+            while k < nlines:
+                try:
+                    natoms = int(line(k))
+                except ValueError:
+                    break
+                last = k + natoms + 1
+                if last >= nlines:
+                    break  # truncated frame
+                bounds.append((starts[k], ends[last]))
+                k = last + 1
+        elif self.mode == "ipb" and size > 0:
+            hsize, recsize = ipb_header_size(self.filename)
+            starts = np.arange(hsize, size - recsize + 1, recsize, dtype=np.int64)
+            bounds = np.stack([starts, starts + recsize], axis=1)
+        elif self.mode == "pdb":
+            # each frame is terminated by an END or an empty line
+            first = 0
+            for k in range(nlines):
+                if line(k) in (b"END", b""):
+                    if k > first:
+                        bounds.append((starts[first], ends[k]))
+                    first = k + 1
+            if first < nlines:
+                bounds.append((starts[first], size))
+
+        return np.array(bounds, np.int64).reshape((-1, 2))
+
+    def frame_text(self, i):
+        """Returns the text of frame i."""
+
+        start, end = self.bounds[i]
+        return self._mm[start:end].decode()
+
+    def read(self, i, **kwargs):
+        """Reads frame i, returning the same dictionary as `read_file`.
+
+        Args:
+            i: The index of the frame.
+            kwargs: Passed on to `read_file`.
+
+        Raises:
+            EOFError: If there is no frame i in the file.
+        """
+
+        if i < 0 or i >= len(self.bounds):
+            raise EOFError
+        if self.mode == "ipb":
+            # the frame is read together with the header that describes it
+            start, end = self.bounds[i]
+            frame = io.BytesIO(self._mm[: self.bounds[0, 0]] + self._mm[start:end])
+            return read_file(self.mode, frame, **kwargs)
+        return read_file(self.mode, io.StringIO(self.frame_text(i)), **kwargs)
+
+    def close(self):
+        """Releases the memory map and the file."""
+
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
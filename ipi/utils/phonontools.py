@@ -1,69 +1,72 @@
 import numpy as np
 
 
-def apply_asr(asr, dm, beads, return_trans_matrix=False):
+def external_modes(asr, q, m, ism):
     """
-    Removes the translations and/or rotations depending on the asr mode.
+    Returns the normalised, mass-scaled vectors along the translations
+    (asr = "crystal") or along the translations and rotations (asr = "poly"),
+    as the rows of a (3, 3*natoms) or (6, 3*natoms) array, together with the
+    principal moments of inertia.
     """
 
-    if asr == "none":
-        return dm
-
-    ism = 1 / np.sqrt(beads.m3[-1])
-    m = beads.m
+    natoms = len(m)
 
     # Computes the centre of mass.
-    com = np.dot(np.transpose(beads.q.reshape((beads.natoms, 3))), m) / m.sum()
-    qminuscom = beads.q.reshape((beads.natoms, 3)) - com
+    qminuscom = q.reshape((natoms, 3))
+    com = np.dot(qminuscom.T, m) / m.sum()
+    qminuscom = qminuscom - com
     # Computes the moment of inertia tensor.
-    moi = np.zeros((3, 3), float)
-    for k in range(beads.natoms):
-        moi -= (
-            np.dot(
-                np.cross(qminuscom[k], np.identity(3)),
-                np.cross(qminuscom[k], np.identity(3)),
-            )
-            * m[k]
-        )
-
-    U = (np.linalg.eig(moi))[1]
-    R = np.dot(qminuscom, U)
+    moi = np.identity(3) * np.dot(m, (qminuscom**2).sum(axis=1))
+    moi -= np.dot(qminuscom.T * m, qminuscom)
 
-    if asr == "crystal":
-        D = np.zeros((3, 3 * beads.natoms), float)
+    I, U = np.linalg.eig(moi)
+    R = np.dot(qminuscom, U)
 
-        # Computes the vectors along rotations.
-        D[0] = np.tile([1, 0, 0], beads.natoms) / ism
-        D[1] = np.tile([0, 1, 0], beads.natoms) / ism
-        D[2] = np.tile([0, 0, 1], beads.natoms) / ism
+    D = np.zeros((3 if asr == "crystal" else 6, natoms, 3), float)
 
-        # Computes unit vecs.
+    # Computes the vectors along translations.
+    for k in range(3):
+        D[k, :, k] = 1.0
+    # Computes the vectors along rotations around the principal axes.
+    if asr == "poly":
         for k in range(3):
-            D[k] = D[k] / np.linalg.norm(D[k])
+            k1, k2 = (k + 1) % 3, (k + 2) % 3
+            D[3 + k] = np.outer(R[:, k1], U[:, k2]) - np.outer(R[:, k2], U[:, k1])
+
+    # Computes unit vecs.
+    D = D.reshape((len(D), 3 * natoms)) / ism
+    D /= np.linalg.norm(D, axis=1)[:, np.newaxis]
 
-    elif asr == "poly":
-        D = np.zeros((6, 3 * beads.natoms), float)
+    return D, I
 
-        # Computes the vectors along rotations.
-        D[0] = np.tile([1, 0, 0], beads.natoms) / ism
-        D[1] = np.tile([0, 1, 0], beads.natoms) / ism
-        D[2] = np.tile([0, 0, 1], beads.natoms) / ism
 
-        for i in range(3 * beads.natoms):
-            iatom = i // 3
-            idof = np.mod(i, 3)
-            D[3, i] = (R[iatom, 1] * U[idof, 2] - R[iatom, 2] * U[idof, 1]) / ism[i]
-            D[4, i] = (R[iatom, 2] * U[idof, 0] - R[iatom, 0] * U[idof, 2]) / ism[i]
-            D[5, i] = (R[iatom, 0] * U[idof, 1] - R[iatom, 1] * U[idof, 0]) / ism[i]
+def project_modes(dm, D):
+    """
+    Returns T^T dm T, with T = 1 - D^T D the matrix that removes the
+    components along the rows of D. Since D only has a few rows, this is
+    computed as a low-rank update of dm, without building T.
+    """
 
-        # Computes unit vecs.
-        for k in range(6):
-            D[k] = D[k] / np.linalg.norm(D[k])
+    E = np.dot(D, dm)
+    B = np.dot(dm, D.T)
+    # T^T dm T = dm - D^T (E - E D^T D) - B D
+    E -= np.dot(np.dot(E, D.T), D)
+    return dm - np.dot(np.hstack((D.T, B)), np.vstack((E, D)))
 
-    # Computes the transformation matrix.
-    transfmatrix = np.eye(3 * beads.natoms) - np.dot(D.T, D)
+
+def apply_asr(asr, dm, beads, return_trans_matrix=False):
+    """
+    Removes the translations and/or rotations depending on the asr mode.
+    """
+
+    if asr == "none":
+        return dm
+
+    ism = 1 / np.sqrt(beads.m3[-1])
+    D = external_modes(asr, beads.q, beads.m, ism)[0]
 
     if return_trans_matrix:
-        return transfmatrix
+        # Computes the transformation matrix.
+        return np.eye(3 * beads.natoms) - np.dot(D.T, D)
     else:
-        return np.dot(transfmatrix.T, np.dot(dm, transfmatrix))
+        return project_modes(dm, D)
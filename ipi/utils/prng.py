@@ -12,13 +12,65 @@ it had not been stopped.
 # See the "licenses" directory for full license information.
 
 
-import numpy as np
-import concurrent.futures
+import queue
+import threading
 import time
 
+import numpy as np
+
 __all__ = ["Random"]
 
 _MIN_STEP_THREADED = 100  # minimum stride to use multithreaded prng
+_START_LOCK = threading.Lock()  # makes sure a single pool is started
+
+
+class _GaussianWorkers:
+    """A pool of persistent threads, each of which owns a generator and fills
+    arrays with normal deviates when asked to. numpy releases the GIL while
+    filling an array, so the workers run concurrently. Fills requested
+    from different threads are done one after the other, as they share the
+    generators and the queue on which the workers report back."""
+
+    def __init__(self, rngs):
+        """Starts one daemon thread for each of the generators in rngs."""
+
+        self._jobs = [queue.SimpleQueue() for _ in rngs]
+        self._done = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        for rng, jobs in zip(rngs, self._jobs):
+            threading.Thread(target=self._loop, args=(rng, jobs), daemon=True).start()
+
+    def _loop(self, rng, jobs):
+        while True:
+            out = jobs.get()
+            if out is None:
+                return
+            try:
+                rng.standard_normal(out=out)
+            except Exception as e:
+                self._done.put(e)
+            else:
+                self._done.put(None)
+
+    def fill(self, rng, chunks):
+        """Fills chunks[0] using rng in the calling thread, and chunks[i + 1]
+        using the i-th worker, returning when all of them are filled and
+        re-raising any error."""
+
+        with self._lock:
+            for jobs, out in zip(self._jobs, chunks[1:]):
+                jobs.put(out)
+            try:
+                rng.standard_normal(out=chunks[0])
+            finally:
+                errors = [self._done.get() for _ in chunks[1:]]
+        for e in errors:
+            if e is not None:
+                raise e
+
+    def stop(self):
+        for jobs in self._jobs:
+            jobs.put(None)
 
 
 class Random(object):
@@ -28,16 +80,21 @@ class Random(object):
     at the beginning of the simulation, and keeps track of the state so that
     it can be output to the checkpoint files throughout the simulation.
 
+    When n_threads > 1, large arrays of Gaussian numbers are generated in
+    parallel: the array is split into n_threads contiguous chunks, and chunk
+    i is always filled using the i-th generator, so that the sequence only
+    depends on the seed (or state) and on the number of threads. The first
+    chunk is filled by the calling thread, and the others by persistent
+    worker threads.
+
     Attributes:
-        rng: The random number generator to be used.
+        rng: The list of random number generators, one per thread. Scalar
+            random numbers are always taken from the first one.
         seed: The seed number to start the generator.
-        state: A tuple of five objects giving the current state of the random
-            number generator. The first is the type of random number generator,
-            here 'MT19937', the second is an array of 624 integers, the third
-            is the current position in the array that is being read from, the
-            fourth gives whether it has a gaussian random number stored, and
-            the fifth is this stored Gaussian random number, or else the last
-            Gaussian random number returned.
+        n_threads: The number of generators used to fill large arrays.
+        state: A list with the state of each generator, i.e. the
+            bit_generator.state dictionary, that contains the type of the
+            generator, here 'MT19937', and its internal state.
     """
 
     def __init__(self, seed=-1, state=None, n_threads=1):
@@ -62,17 +119,27 @@ class Random(object):
         ]
 
         self.n_threads = n_threads
+        self._workers = None  # started on first use
         if self.n_threads == 1:
             self.gvec = self.gvec_serial
             self.gfill = self.gfill_serial
         else:
-            self.executor = concurrent.futures.ThreadPoolExecutor(n_threads)
             self.gvec = self.gvec_threaded
             self.gfill = self.gfill_threaded
 
         if state is not None:
             self.state = state
 
+    def __getstate__(self):
+        # the worker threads cannot be copied, and are restarted when needed
+        state = self.__dict__.copy()
+        state["_workers"] = None
+        return state
+
+    def __del__(self):
+        if getattr(self, "_workers", None) is not None:
+            self._workers.stop()
+
     def get_state(self):
         """Interface to the standard get_state() function."""
 
@@ -82,9 +149,23 @@ class Random(object):
         """Interface to the standard set_state() function.
 
         Should only be used with states generated from another similar random
-        number generator, such as one from a previous run.
+        number generator, such as one from a previous run, with the same
+        number of threads.
+
+        Raises:
+            ValueError: If the number of states does not match the number of
+                generators.
         """
 
+        if isinstance(value, dict):
+            # state of a single generator
+            value = [value]
+        if len(value) != len(self.rng):
+            raise ValueError(
+                "The PRNG state contains %d streams, but n_threads=%d. "
+                "Restart with the same number of threads, or from a seed."
+                % (len(value), len(self.rng))
+            )
         for r, s in zip(self.rng, value):
             r.bit_generator.state = s
 
@@ -188,22 +269,27 @@ class Random(object):
             out: The array to be filled.
         """
 
-        out_flat = out.flatten()
-        step_size = np.ceil(len(out_flat) / self.n_threads).astype(int)
+        step_size = -(-out.size // self.n_threads)
         if step_size < _MIN_STEP_THREADED:
             # falls back to serial if the vector is too small
             self.gfill_serial(out)
-        else:
-            # threaded execution
-            futures = {}
-            for i in range(self.n_threads):
-                futures[
-                    self.executor.submit(
-                        self.rng[i].standard_normal,
-                        out=out_flat[step_size * i : step_size * (i + 1)],
-                    )
-                ] = i
-            concurrent.futures.wait(futures)
+            return
+
+        if not (out.flags.c_contiguous and out.dtype == np.float64):
+            # the chunks must be contiguous views, so goes through a buffer
+            buffer = np.empty(out.shape)
+            self.gfill_threaded(buffer)
+            out[...] = buffer
+            return
+
+        out_flat = out.reshape(-1)  # a view, as out is contiguous
+        chunks = [
+            out_flat[step_size * i : step_size * (i + 1)] for i in range(self.n_threads)
+        ]
+        with _START_LOCK:
+            if self._workers is None:
+                self._workers = _GaussianWorkers(self.rng[1:])
+        self._workers.fill(self.rng[0], chunks)
 
     def gvec_serial(self, shape):
         """Interface to the standard_normal array function.
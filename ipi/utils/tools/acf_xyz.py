@@ -1,5 +1,5 @@
 import numpy as np
-from ipi.utils.io import read_file_raw
+from ipi.utils.io import read_file_raw, iter_file_raw_batches
 from ipi.utils.units import unit_to_internal
 
 
@@ -71,12 +71,10 @@ def compute_acf_xyz(
                 labelbool = np.logical_or(labelbool, rr["names"] == l)
     else:
         labelbool = atom_mask
-    nspecies = labelbool.sum()
 
     # initializes variables.
     nblocks = 0
     dt = unit_to_internal("time", time_units, timestep)
-    data = np.zeros((bsize, nspecies, 3), float)
     time = np.asarray(list(range(mlag + 1))) * dt
     omega = (
         np.asarray(list(range(2 * (mlag + npad))))
@@ -105,46 +103,43 @@ def compute_acf_xyz(
     for x in range(fskip):
         rr = read_file_raw("xyz", ff)
 
-    while True:
-        try:
-            # Reads the data in blocks.
-            for i in range(bsize):
-                rr = read_file_raw("xyz", ff)
-                data[i] = rr["data"].reshape((ndof // 3, 3))[labelbool]
+    # Reads the data in blocks, discarding the last one if it is incomplete.
+    for block in iter_file_raw_batches("xyz", ff, bsize):
+        if len(block["comments"]) < bsize:
+            break
+        data = block["data"].reshape((bsize, ndof // 3, 3))[:, labelbool]
 
-            if der is True:
-                data = np.gradient(data, axis=0) / dt
+        if der is True:
+            data = np.gradient(data, axis=0) / dt
 
-            # Computes the Fourier transform of the data.
-            fdata = np.fft.rfft(data, axis=0)
+        # Computes the Fourier transform of the data.
+        fdata = np.fft.rfft(data, axis=0)
 
-            # Computes the Fourier transform of the vvac applying the convolution theorem.
-            tfvvacf = fdata * np.conjugate(fdata)
+        # Computes the Fourier transform of the vvac applying the convolution theorem.
+        tfvvacf = fdata * np.conjugate(fdata)
 
-            # Averages over all species and sums over the x,y,z directions. Also multiplies with the time step and a prefactor of (2pi)^-1.
-            mfvvacf = (
-                3.0 * np.real(np.mean(tfvvacf, axis=(1, 2))) * dt / (2 * np.pi) / bsize
-            )
+        # Averages over all species and sums over the x,y,z directions. Also multiplies with the time step and a prefactor of (2pi)^-1.
+        mfvvacf = (
+            3.0 * np.real(np.mean(tfvvacf, axis=(1, 2))) * dt / (2 * np.pi) / bsize
+        )
 
-            # Computes the inverse Fourier transform to get the vvac.
-            mvvacf = np.fft.irfft(mfvvacf)[: mlag + 1]
+        # Computes the inverse Fourier transform to get the vvac.
+        mvvacf = np.fft.irfft(mfvvacf)[: mlag + 1]
 
-            # Applies window in one direction and pads the vvac with zeroes.
-            mpvvacf = np.append(mvvacf * win[mlag:], np.zeros(npad))
+        # Applies window in one direction and pads the vvac with zeroes.
+        mpvvacf = np.append(mvvacf * win[mlag:], np.zeros(npad))
 
-            # Recomputes the Fourier transform assuming the data is an even function of time.
-            mfpvvacf = np.fft.hfft(mpvvacf)
+        # Recomputes the Fourier transform assuming the data is an even function of time.
+        mfpvvacf = np.fft.hfft(mpvvacf)
 
-            # Accumulates the (f)acfs and their squares.
-            fvvacf += mfpvvacf
-            fvvacf2 += mfpvvacf**2
-            vvacf += mvvacf
-            vvacf2 += mvvacf**2
+        # Accumulates the (f)acfs and their squares.
+        fvvacf += mfpvvacf
+        fvvacf2 += mfpvvacf**2
+        vvacf += mvvacf
+        vvacf2 += mvvacf**2
 
-            nblocks += 1
+        nblocks += 1
 
-        except EOFError:
-            break
     ff.close()
 
     # Performs the block average of the Fourier transform.
@@ -0,0 +1,284 @@
+"""Tracing of the force requests sent to the forcefields.
+
+When enabled, the timings of each force request (when it was queued,
+dispatched to a driver, finished, and collected by the ForceBead that
+needs it) are stored in a ring buffer, together with the forcefield, the
+bead index, the MD step and the id of the socket client that evaluated it.
+
+The trace can be exported in the Chrome trace-event JSON format, which can
+be opened with Perfetto (https://ui.perfetto.dev) or chrome://tracing, and
+summarized as statistics of queue waits, driver times, gather delays and
+client idle times.
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import json
+import threading
+
+import numpy as np
+
+from ipi.utils.messages import verbosity, info
+
+__all__ = ["RequestTracer", "request_tracer"]
+
+
+_TRACE_DTYPE = np.dtype(
+    [
+        ("ff", np.int32),
+        ("bead", np.int32),
+        ("step", np.int64),
+        ("client", np.int32),
+        ("t_queued", np.float64),
+        ("t_dispatched", np.float64),
+        ("t_finished", np.float64),
+        ("t_collected", np.float64),
+    ]
+)
+
+
+class RequestTracer(object):
+    """Ring buffer of the timings of completed force requests.
+
+    Attributes:
+        enabled: Whether requests are being recorded.
+        step: The current simulation step, stored with each request.
+        capacity: The number of requests kept in the buffer. Older requests
+            are overwritten.
+        ffnames: The names of the forcefields, indexed by the 'ff' field of
+            the records.
+        nrecorded: The total number of requests recorded so far.
+    """
+
+    def __init__(self, capacity=100000):
+        self.enabled = False
+        self.step = -1
+        self._lock = threading.Lock()
+        self.resize(capacity)
+
+    def resize(self, capacity):
+        """Sets the size of the ring buffer, clearing the trace."""
+
+        with self._lock:
+            self.capacity = int(capacity)
+            self._buffer = np.zeros(self.capacity, _TRACE_DTYPE)
+            self.ffnames = []
+            self._ffids = {}
+            self.nrecorded = 0
+
+    def record(self, request, ffname, bead=-1, t_collected=0.0):
+        """Adds a completed request to the trace.
+
+        Args:
+            request: The ForceRequest, holding the timings of the request and
+                (for socket forcefields) the id of the client.
+            ffname: The name of the forcefield.
+            bead: The index of the bead the request refers to.
+            t_collected: The time at which the result has been collected.
+        """
+
+        with self._lock:
+            ffid = self._ffids.get(ffname)
+            if ffid is None:
+                ffid = self._ffids[ffname] = len(self.ffnames)
+                self.ffnames.append(ffname)
+            rec = self._buffer[self.nrecorded % self.capacity]
+            rec["ff"] = ffid
+            rec["bead"] = bead
+            rec["step"] = self.step
+            rec["client"] = request.get("client", -1)
+            # forcefields that do not track the dispatch or completion of
+            # their requests leave the corresponding times to zero
+            rec["t_queued"] = request["t_queued"]
+            rec["t_dispatched"] = request["t_dispatched"] or request["t_queued"]
+            rec["t_finished"] = request["t_finished"] or t_collected
+            rec["t_collected"] = t_collected
+            self.nrecorded += 1
+
+    def records(self):
+        """Returns the recorded requests, oldest first, as a structured array
+        with fields ff, bead, step, client, t_queued, t_dispatched,
+        t_finished and t_collected."""
+
+        with self._lock:
+            n = self.nrecorded
+            if n <= self.capacity:
+                return self._buffer[:n].copy()
+            i = n % self.capacity
+            return np.concatenate([self._buffer[i:], self._buffer[:i]])
+
+    def chrome_trace(self):
+        """Returns the trace as a dictionary in the Chrome trace-event format.
+
+        Each forcefield is shown as a process, with one track per socket
+        client (or a single 'direct' track for forcefields that are evaluated
+        within i-PI) holding the evaluation of each request, and the time
+        spent by the requests waiting for a client shown as asynchronous
+        'queue' events.
+        """
+
+        recs = self.records()
+        events = []
+        if len(recs) == 0:
+            return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+        t0 = recs["t_queued"].min()
+
+        def us(t):
+            return (t - t0) * 1e6
+
+        for ffid, name in enumerate(self.ffnames):
+            events.append(
+                {"name": "process_name", "ph": "M", "pid": ffid, "args": {"name": name}}
+            )
+        for ffid, client in set(zip(recs["ff"].tolist(), recs["client"].tolist())):
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": ffid,
+                    "tid": client + 1,
+                    "args": {"name": "client %d" % client if client >= 0 else "direct"},
+                }
+            )
+
+        for i, r in enumerate(recs):
+            pid = int(r["ff"])
+            args = {"step": int(r["step"]), "bead": int(r["bead"])}
+            label = "bead %d" % r["bead"]
+            events.append(
+                {
+                    "name": label,
+                    "cat": "queue",
+                    "ph": "b",
+                    "id": i,
+                    "pid": pid,
+                    "ts": us(r["t_queued"]),
+                    "args": args,
+                }
+            )
+            events.append(
+                {
+                    "name": label,
+                    "cat": "queue",
+                    "ph": "e",
+                    "id": i,
+                    "pid": pid,
+                    "ts": us(r["t_dispatched"]),
+                }
+            )
+            events.append(
+                {
+                    "name": label,
+                    "cat": "driver",
+                    "ph": "X",
+                    "pid": pid,
+                    "tid": int(r["client"]) + 1,
+                    "ts": us(r["t_dispatched"]),
+                    "dur": (r["t_finished"] - r["t_dispatched"]) * 1e6,
+                    "args": dict(
+                        args, gather=float(r["t_collected"] - r["t_finished"])
+                    ),
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def summary(self):
+        """Returns a text summary of the recorded requests: the distribution
+        of the time spent waiting in the queue, being evaluated, and waiting
+        to be collected for each forcefield, and the load of each client."""
+
+        recs = self.records()
+
+        def stats(x):
+            return "%10.3e %10.3e %10.3e %10.3e" % (
+                x.mean(),
+                np.percentile(x, 50),
+                np.percentile(x, 90),
+                x.max(),
+            )
+
+        lines = [
+            "# Force request trace: %d requests recorded, %d kept"
+            % (self.nrecorded, len(recs))
+        ]
+        if len(recs) == 0:
+            return lines[0] + "\n"
+
+        lines.append("# Times in seconds: mean, median, 90th percentile, maximum")
+        for ffid, name in enumerate(self.ffnames):
+            sel = recs[recs["ff"] == ffid]
+            if len(sel) == 0:
+                continue
+            lines.append("# Forcefield %s: %d requests" % (name, len(sel)))
+            lines.append(
+                "   queue wait  " + stats(sel["t_dispatched"] - sel["t_queued"])
+            )
+            lines.append(
+                "   driver time " + stats(sel["t_finished"] - sel["t_dispatched"])
+            )
+            lines.append(
+                "   gather time " + stats(sel["t_collected"] - sel["t_finished"])
+            )
+
+            # per-step spread of the completion times of the requests, that
+            # measures the imbalance between the beads
+            steps, inverse = np.unique(sel["step"], return_inverse=True)
+            tmin = np.full(len(steps), np.inf)
+            tmax = np.full(len(steps), -np.inf)
+            np.minimum.at(tmin, inverse, sel["t_finished"])
+            np.maximum.at(tmax, inverse, sel["t_finished"])
+            lines.append("   step spread " + stats(tmax - tmin))
+
+            lines.append(
+                "   %-8s %8s %12s %12s %10s"
+                % ("client", "requests", "busy", "idle", "load")
+            )
+            for client in np.unique(sel["client"]):
+                c = sel[sel["client"] == client]
+                busy = (c["t_finished"] - c["t_dispatched"]).sum()
+                # idle time between the first dispatch and the last result
+                span = c["t_finished"].max() - c["t_dispatched"].min()
+                idle = max(span - busy, 0.0)
+                lines.append(
+                    "   %-8s %8d %12.5e %12.5e %9.1f%%"
+                    % (
+                        "%d" % client if client >= 0 else "direct",
+                        len(c),
+                        busy,
+                        idle,
+                        100.0 * busy / span if span > 0 else 100.0,
+                    )
+                )
+        return "\n".join(lines) + "\n"
+
+    def dump(self, prefix="trace"):
+        """Writes the trace to prefix + '.json' and the summary to
+        prefix + '.txt'."""
+
+        with open(prefix + ".json", "w") as f:
+            json.dump(self.chrome_trace(), f)
+        with open(prefix + ".txt", "w") as f:
+            f.write(self.summary())
+        info(" @RequestTracer: Wrote request trace to " + prefix, verbosity.low)
+
+    def install(self, prefix="trace", capacity=None):
+        """Enables tracing, and writes the trace when the simulation exits.
+
+        Args:
+            prefix: The prefix of the output files.
+            capacity: If given, the size of the ring buffer.
+        """
+
+        from ipi.utils.softexit import softexit
+
+        if capacity is not None:
+            self.resize(capacity)
+        self.enabled = True
+        softexit.register_function(self.dump, prefix=prefix)
+
+
+request_tracer = RequestTracer()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Measures the time needed to write trajectory frames.
+
+Times print_file (one frame per bead, as used by the per-bead trajectory
+outputs) for the xyz, pdb and ase back-ends, and print_file_path (all the
+beads in a single frame) for the back-ends that implement it, writing to
+the null device so that the timings only include the formatting.
+
+usage: python io_benchmark.py [-n natoms,...] [-b nbeads] [-r repeats] [-m modes]
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import os
+import time
+import argparse
+
+import numpy as np
+
+from ipi.engine.beads import Beads
+from ipi.engine.cell import Cell
+from ipi.utils.io import print_file, print_file_path
+from ipi.utils.io.backends import io_ase
+
+
+def make_system(natoms, nbeads):
+    """Returns a random ring polymer and a cubic cell."""
+
+    beads = Beads(natoms, nbeads)
+    beads.q[:] = np.random.uniform(0, 20, size=(nbeads, 3 * natoms))
+    beads.names[:] = np.random.choice(["H", "C", "N", "O"], size=natoms)
+    return beads, Cell(np.eye(3) * 20)
+
+
+def benchmark(mode, natoms, nbeads, repeats, path):
+    """Returns the average time needed to write all the beads once."""
+
+    beads, cell = make_system(natoms, nbeads)
+    with open(os.devnull, "w") as out:
+        tstart = time.time()
+        for _ in range(repeats):
+            if path:
+                print_file_path(mode, beads, cell, filedesc=out, key="positions")
+            else:
+                for b in range(nbeads):
+                    print_file(mode, beads[b], cell, filedesc=out, key="positions")
+    return (time.time() - tstart) / repeats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--natoms", type=str, default="100,1000,10000")
+    parser.add_argument("-b", "--nbeads", type=int, default=8)
+    parser.add_argument("-r", "--repeats", type=int, default=5)
+    parser.add_argument("-m", "--modes", type=str, default="xyz,pdb,ase")
+    args = parser.parse_args()
+
+    modes = args.modes.split(",")
+    if io_ase.ase is None and "ase" in modes:
+        print("# ASE is not installed, skipping the ase back-end")
+        modes.remove("ase")
+
+    print("# nbeads=%d repeats=%d, time per step [s]" % (args.nbeads, args.repeats))
+    print("#   natoms" + "".join("  %12s" % m for m in modes) + "  %12s" % "xyz_path")
+    for natoms in [int(n) for n in args.natoms.split(",")]:
+        line = "%10d" % natoms
+        for mode in modes:
+            line += "  %12.4e" % benchmark(
+                mode, natoms, args.nbeads, args.repeats, False
+            )
+        line += "  %12.4e" % benchmark("xyz", natoms, args.nbeads, args.repeats, True)
+        print(line)
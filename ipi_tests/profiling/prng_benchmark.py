@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Compares serial and threaded generation of Gaussian random numbers.
+
+Times Random.gfill on arrays of nbeads x 3 natoms elements, i.e. the noise
+drawn at each step by a thermostat acting on a ring polymer, using one
+generator and n_threads generators in parallel.
+
+usage: python prng_benchmark.py [-n natoms,...] [-b nbeads] [-t nthreads,...] [-r repeats]
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import time
+import argparse
+
+import numpy as np
+
+from ipi.utils.prng import Random
+
+
+def benchmark(natoms, nbeads, n_threads, repeats):
+    """Returns the average time needed to fill the noise array."""
+
+    prng = Random(seed=12345, n_threads=n_threads)
+    out = np.empty((nbeads, 3 * natoms))
+    prng.gfill(out)  # starts the workers
+    tstart = time.time()
+    for _ in range(repeats):
+        prng.gfill(out)
+    return (time.time() - tstart) / repeats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--natoms", type=str, default="100,1000,10000,100000")
+    parser.add_argument("-b", "--nbeads", type=int, default=32)
+    parser.add_argument("-t", "--threads", type=str, default="2,4,8")
+    parser.add_argument("-r", "--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    threads = [int(t) for t in args.threads.split(",")]
+    print("# nbeads=%d repeats=%d" % (args.nbeads, args.repeats))
+    print(
+        "#   natoms   serial [s]"
+        + "".join("   %2d threads [s]  speedup" % t for t in threads)
+    )
+    for natoms in [int(n) for n in args.natoms.split(",")]:
+        serial = benchmark(natoms, args.nbeads, 1, args.repeats)
+        line = "%10d  %11.4e" % (natoms, serial)
+        for t in threads:
+            dt = benchmark(natoms, args.nbeads, t, args.repeats)
+            line += "  %15.4e  %7.2f" % (dt, serial / dt)
+        print(line)
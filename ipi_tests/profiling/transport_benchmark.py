@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Measures the throughput of the socket transports of i-PI.
+
+Runs a FFSocket server in-process and a number of python drivers (using the
+dummy PES, so the timing is dominated by communication) as separate
+processes, and times the evaluation of nbeads structures per step for the
+UNIX-domain, INET and shared-memory transports.
+
+usage: python transport_benchmark.py [-n natoms] [-b nbeads] [-s nsteps] [-c nclients]
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import os
+import sys
+import time
+import types
+import argparse
+import multiprocessing
+
+import numpy as np
+
+from ipi.engine.forcefields import FFSocket
+from ipi.interfaces.sockets import InterfaceSocket
+from ipi.pes.dummy import Dummy_driver
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../drivers/py"))
+from driver import run_driver
+
+TRANSPORTS = {
+    "unix": dict(mode="unix", shmem=False),
+    "inet": dict(mode="inet", shmem=False),
+    "shmem": dict(mode="unix", shmem=True),
+}
+
+
+def benchmark(transport, natoms, nbeads, nsteps, nclients, event_driven):
+    """Returns the average wall-clock time per step for the given transport."""
+
+    mode = TRANSPORTS[transport]["mode"]
+    address = "bench_%s_%d" % (transport, os.getpid())
+    port = 31000 + os.getpid() % 1000
+    iface = InterfaceSocket(
+        address=address if mode == "unix" else "localhost",
+        port=port,
+        mode=mode,
+        timeout=0,
+        event_driven=event_driven,
+    )
+    ff = FFSocket(name=transport, interface=iface, dopbc=False)
+    ff.start()
+
+    clients = [
+        multiprocessing.Process(
+            target=run_driver,
+            kwargs=dict(
+                unix=(mode == "unix"),
+                address=address if mode == "unix" else "localhost",
+                port=port,
+                driver=Dummy_driver(),
+                shmem=TRANSPORTS[transport]["shmem"],
+            ),
+            daemon=True,
+        )
+        for _ in range(nclients)
+    ]
+    for c in clients:
+        c.start()
+
+    cell = types.SimpleNamespace(h=np.eye(3) * 10, ih=np.eye(3) * 0.1)
+    beads = [
+        types.SimpleNamespace(q=np.random.uniform(size=3 * natoms))
+        for _ in range(nbeads)
+    ]
+
+    def step():
+        reqs = [ff.queue(b, cell, reqid=i) for i, b in enumerate(beads)]
+        for r in reqs:
+            r._event_done.wait()
+            ff.release(r)
+
+    step()  # waits for the clients to connect
+    tstart = time.time()
+    for _ in range(nsteps):
+        step()
+    telapsed = (time.time() - tstart) / nsteps
+
+    ff.stop()
+    for c in clients:
+        c.join()
+    return telapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--natoms", type=int, default=10000)
+    parser.add_argument("-b", "--nbeads", type=int, default=8)
+    parser.add_argument("-s", "--nsteps", type=int, default=100)
+    parser.add_argument("-c", "--nclients", type=int, default=2)
+    parser.add_argument(
+        "-t",
+        "--transports",
+        type=str,
+        default="unix,inet,shmem",
+        help="Comma-separated list of transports to test",
+    )
+    parser.add_argument(
+        "-e", "--event_driven", action="store_true", help="Use the event-driven loop"
+    )
+    args = parser.parse_args()
+
+    print(
+        "# natoms=%d nbeads=%d nsteps=%d nclients=%d"
+        % (args.natoms, args.nbeads, args.nsteps, args.nclients)
+    )
+    print("# transport     time/step [s]     structures/s")
+    for transport in args.transports.split(","):
+        dt = benchmark(
+            transport,
+            args.natoms,
+            args.nbeads,
+            args.nsteps,
+            args.nclients,
+            args.event_driven,
+        )
+        print("%-12s  %14.6e  %15.2f" % (transport, dt, args.nbeads / dt))
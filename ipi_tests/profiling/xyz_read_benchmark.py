@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Measures the time needed to read an xyz trajectory.
+
+Writes a trajectory with random positions to a temporary file, and times
+reading it back one frame at a time (iter_file_raw) and in blocks of
+frames (iter_file_raw_batches), as done by the post-processing tools.
+
+usage: python xyz_read_benchmark.py [-n natoms,...] [-f nframes] [-k blocks,...]
+"""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+from ipi.engine.atoms import Atoms
+from ipi.engine.cell import Cell
+from ipi.utils.io import print_file, iter_file_raw, iter_file_raw_batches
+
+
+def write_trajectory(filename, natoms, nframes):
+    """Writes a trajectory with random positions."""
+
+    atoms = Atoms(natoms)
+    atoms.names[:] = np.random.choice(["H", "C", "N", "O"], size=natoms)
+    cell = Cell(np.eye(3) * 20)
+    with open(filename, "w") as f:
+        for i in range(nframes):
+            atoms.q[:] = np.random.uniform(0, 20, size=3 * natoms)
+            print_file("xyz", atoms, cell, f, title="Step: %d" % i)
+
+
+def benchmark(filename, block):
+    """Returns the time needed to read the whole trajectory."""
+
+    tstart = time.time()
+    with open(filename) as f:
+        if block == 0:
+            for _ in iter_file_raw("xyz", f):
+                pass
+        else:
+            for _ in iter_file_raw_batches("xyz", f, block):
+                pass
+    return time.time() - tstart
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--natoms", type=str, default="10,100,10000")
+    parser.add_argument("-f", "--nframes", type=int, default=1000)
+    parser.add_argument("-k", "--blocks", type=str, default="10,100")
+    args = parser.parse_args()
+
+    blocks = [int(k) for k in args.blocks.split(",")]
+    print("# nframes=%d, time to read the trajectory [s]" % args.nframes)
+    print("#   natoms   one by one" + "".join("  blocks of %4d" % k for k in blocks))
+    for natoms in [int(n) for n in args.natoms.split(",")]:
+        fd, filename = tempfile.mkstemp(suffix=".xyz")
+        os.close(fd)
+        try:
+            write_trajectory(filename, natoms, args.nframes)
+            line = "%10d  %11.4e" % (natoms, benchmark(filename, 0))
+            for k in blocks:
+                line += "  %14.4e" % benchmark(filename, k)
+            print(line)
+        finally:
+            os.remove(filename)
@@ -0,0 +1,146 @@
+"""Tests checkpoints in which the large arrays are stored as .npy files."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import os
+
+import numpy as np
+import pytest
+
+ase = pytest.importorskip("ase")
+
+from ipi.engine.outputs import CheckpointOutput
+from ipi.engine.simulation import Simulation
+from ipi.scripting.templates import simulation_xml, forcefield_xml, motion_nvt_xml
+
+
+def two_systems():
+    """Builds a read-only simulation with two identical path integral systems
+    of 40 atoms, so that q and p are large enough to go in .npy files and the
+    repeated <system> tags need an index in the file names."""
+
+    rng = np.random.default_rng(12345)
+    atoms = ase.Atoms(
+        "H40", positions=rng.uniform(0, 10, (40, 3)), cell=[10, 10, 10], pbc=True
+    )
+    xml = simulation_xml(
+        [atoms, atoms],
+        forcefield_xml("harm", pes="harmonic", parameters={"k1": 1.0}),
+        motion_nvt_xml(timestep=1.0),
+        temperature=300,
+        output="<output/>",
+    )
+    system = xml[xml.index("<system") : xml.index("</system>") + len("</system>")]
+    xml = xml.replace(system, system + system)
+
+    return Simulation.load_from_xml(xml, read_only=True)
+
+
+@pytest.mark.parametrize("overwrite", [True, False])
+def test_npy_incremental(tmp_path, monkeypatch, overwrite):
+    """CheckpointOutput: only changed arrays are written again, and restarts"""
+
+    monkeypatch.chdir(tmp_path)
+    sim = two_systems()
+    assert len(sim.syslist) == 2
+
+    saved = []
+    np_save = np.save
+
+    def save(fname, value):
+        saved.append(os.path.basename(fname))
+        np_save(fname, value)
+
+    monkeypatch.setattr(np, "save", save)
+
+    chk = CheckpointOutput(filename="chk", stride=1, overwrite=overwrite, format="npy")
+    chk.bind(sim)
+    chk.write()
+    chk.flush()
+
+    first = sorted(os.listdir("chk_data"))
+    assert first == sorted(saved)
+    assert first == [
+        "system0.beads.p_1.npy",
+        "system0.beads.q_1.npy",
+        "system1.beads.p_1.npy",
+        "system1.beads.q_1.npy",
+    ]
+
+    # changes the positions of the second system only
+    sim.syslist[1].beads.q += 0.1
+    q0 = sim.syslist[0].beads.q.copy()
+    q1 = sim.syslist[1].beads.q.copy()
+    saved.clear()
+    chk.write()
+    chk.flush()
+
+    assert saved == ["system1.beads.q_2.npy"]
+    files = set(os.listdir("chk_data"))
+    assert "system1.beads.q_2.npy" in files
+    assert ("system1.beads.q_1.npy" in files) != overwrite
+    assert {
+        "system0.beads.p_1.npy",
+        "system0.beads.q_1.npy",
+        "system1.beads.p_1.npy",
+    } <= files
+
+    # without overwrite, each checkpoint goes to a new file
+    with open("chk" if overwrite else "chk_1") as f:
+        xml = f.read()
+    assert "system1.beads.q_1.npy" not in xml
+    assert xml.count("mode='npy'") == 4
+
+    # the checkpoint is read back with the new arrays
+    restart = Simulation.load_from_xml(xml, read_only=True)
+    assert len(restart.syslist) == 2
+    assert np.array_equal(restart.syslist[0].beads.q, q0)
+    assert np.array_equal(restart.syslist[1].beads.q, q1)
+    # the momenta are unchanged on disk, and go through the initialization
+    p1 = sim.syslist[1].beads.p
+    assert np.array_equal(np.load("chk_data/system1.beads.p_1.npy"), p1.flatten())
+    assert np.allclose(restart.syslist[1].beads.p, p1, rtol=0, atol=1e-12)
+
+
+def test_npy_error(tmp_path, monkeypatch):
+    """CheckpointOutput: errors in the writer thread are raised by flush"""
+
+    monkeypatch.chdir(tmp_path)
+    sim = two_systems()
+    chk = CheckpointOutput(filename="chk", stride=1, overwrite=True, format="npy")
+    chk.bind(sim)
+
+    def save(fname, value):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "save", save)
+    chk.write()
+    with pytest.raises(OSError, match="disk full"):
+        chk.flush()
+
+    # the error is only reported once
+    chk.flush()
+
+
+def test_npy_softexit(tmp_path, monkeypatch):
+    """CheckpointOutput: the final checkpoint is complete at soft exit"""
+
+    monkeypatch.chdir(tmp_path)
+    sim = two_systems()
+    sim.chk = CheckpointOutput(filename="chk", stride=1, overwrite=True, format="npy")
+    sim.chk.bind(sim)
+    sim.softexit()
+    assert sim.chk._writer is None
+    assert len(os.listdir("chk_data")) == 4
+
+    def save(fname, value):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "save", save)
+    sim.syslist[0].beads.q += 0.1
+    sim.chk.store()
+    with pytest.raises(OSError, match="disk full"):
+        sim.softexit()
@@ -0,0 +1,113 @@
+"""Tests the cache of force evaluations."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import types
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from ipi.engine.forcecache import ForceCache
+from ipi.engine.forcefields import ForceField
+from ipi.inputs.forcefields import InputFFCavPhSocket
+from ipi.utils.io.inputs.io_xml import xml_parse_string
+
+
+class FFCounting(ForceField):
+    """Returns f = -q, and counts the evaluations."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.nevals = 0
+
+    def poll(self):
+        with self._threadlock:
+            for r in self.requests:
+                if r["status"] == "Queued":
+                    self.nevals += 1
+                    r["result"] = [
+                        r["pos"].sum(),
+                        -r["pos"],
+                        np.eye(3),
+                        {"raw": ""},
+                    ]
+                    r["status"] = "Done"
+                    r._event_done.set()
+
+
+def evaluate(ff, q):
+    atoms = types.SimpleNamespace(q=q)
+    cell = types.SimpleNamespace(h=np.eye(3) * 10, ih=np.eye(3) * 0.1)
+    r = ff.queue(atoms, cell)
+    assert r["status"] == "Done"
+    result = r["result"]
+    ff.release(r)
+    return result
+
+
+def test_lru_and_tolerance():
+    """Force cache: LRU eviction and matching within a tolerance"""
+
+    cache = ForceCache(size=2, tolerance=1e-3)
+    res = [1.0, np.ones(3), np.eye(3), {"raw": ""}]
+    keys = [cache.key(np.full(3, x), np.eye(3), [0, 1, 2], "") for x in range(3)]
+    for k in keys:
+        cache.add(k, res)
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2])[0] == 1.0
+    # a copy is returned
+    cache.get(keys[2])[1][:] = 0
+    assert_allclose(cache.get(keys[2])[1], 1.0)
+
+    assert keys[2] == cache.key(np.full(3, 2.0001), np.eye(3), [0, 1, 2], "")
+    assert keys[2] != cache.key(np.full(3, 2.0001), np.eye(3), [0, 1, 2], "x")
+    assert keys[2] != cache.key(np.full(3, 2.0), np.eye(3), [0, 1, 2], "", ffield="x")
+    assert cache.hits == 3 and cache.misses == 1
+
+
+def test_forcefield_cache(tmp_path):
+    """Force cache: forcefields reuse previous results, also across runs"""
+
+    fn = str(tmp_path / "cache.pickle")
+    ff = FFCounting(name="count")
+    ff.set_cache(ForceCache(size=10, filename=fn))
+    q = np.random.uniform(size=6)
+    for _ in range(3):
+        pot, f, vir, extra = evaluate(ff, q)
+        assert_allclose(f, -q)
+    evaluate(ff, q + 0.1)
+    assert ff.nevals == 2
+    ff.stop()
+
+    # a new forcefield reads the results from disk
+    ff = FFCounting(name="count")
+    ff.set_cache(ForceCache(size=0, filename=fn))
+    assert_allclose(evaluate(ff, q + 0.1)[1], -(q + 0.1))
+    assert ff.nevals == 0
+    evaluate(ff, q + 0.2)
+    assert ff.nevals == 1
+    ff.stop()
+
+    # another forcefield does not use the results stored in the same file
+    ff = FFCounting(name="other")
+    ff.set_cache(ForceCache(size=0, filename=fn))
+    evaluate(ff, q + 0.1)
+    assert ff.nevals == 1
+    ff.stop()
+
+
+def test_uncacheable_forcefields():
+    """Force cache: forcefields that cannot use it reject the cache settings"""
+
+    xml = xml_parse_string(
+        "<ffcavphsocket name='cav'><address>test_cavph</address>"
+        "<cache_size>10</cache_size></ffcavphsocket>"
+    )
+    iff = InputFFCavPhSocket()
+    iff.parse(xml.fields[0][1])
+    with pytest.raises(ValueError):
+        iff.fetch_cache(iff.fetch())
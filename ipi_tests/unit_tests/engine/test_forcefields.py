@@ -0,0 +1,45 @@
+"""Tests the completion of force requests in threaded forcefields."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+
+from ipi.engine.atoms import Atoms
+from ipi.engine.cell import Cell
+from ipi.engine.forcefields import ForceField, ForceRequest
+
+
+def test_done_callback():
+    """ForceRequest: callbacks run when the request is done"""
+
+    calls = []
+    r = ForceRequest()
+    r.add_done_callback(lambda: calls.append(1))
+    assert calls == []
+    r._event_done.set()
+    assert calls == [1]
+    # added after completion, runs right away
+    r.add_done_callback(lambda: calls.append(2))
+    assert calls == [1, 2]
+
+
+def test_poll_loop_wakeup():
+    """ForceField: queued requests are answered without waiting for latency"""
+
+    ff = ForceField(latency=100.0, name="test", threaded=True)
+    ff.start()
+    try:
+        atoms = Atoms(2)
+        cell = Cell(np.eye(3) * 10.0)
+        for _ in range(3):
+            r = ff.queue(atoms, cell)
+            assert r._event_done.wait(timeout=5.0)
+            assert r["status"] == "Done"
+            ff.release(r)
+    finally:
+        ff.stop()
+        ff._thread.join(timeout=5.0)
+    assert not ff._thread.is_alive()
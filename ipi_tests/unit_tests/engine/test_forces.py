@@ -0,0 +1,57 @@
+"""Tests the collection of the forces of the replicas in ForceComponent."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from ipi.engine.beads import Beads
+from ipi.engine.cell import Cell
+from ipi.engine.forcefields import ForceField
+from ipi.engine.forces import ForceComponent
+from ipi.utils.depend import dstrip
+
+
+class FFLinear(ForceField):
+    """Returns f = -q, u = sum(q), and a full virial."""
+
+    def poll(self):
+        with self._threadlock:
+            for r in self.requests:
+                if r["status"] == "Queued":
+                    r["result"] = [
+                        r["pos"].sum(),
+                        -r["pos"],
+                        np.full((3, 3), r["pos"][0]),
+                        {"raw": ""},
+                    ]
+                    r["status"] = "Done"
+                    r._event_done.set()
+
+
+def test_stacked_results():
+    """ForceComponent: replica results share the component arrays"""
+
+    nbeads, natoms = 4, 3
+    beads = Beads(natoms, nbeads)
+    beads.q = np.random.uniform(-1, 1, size=(nbeads, 3 * natoms))
+    cell = Cell(np.eye(3) * 10.0)
+    fc = ForceComponent("lin", nbeads=nbeads)
+    fc.bind(beads, cell, {"lin": FFLinear(name="lin")}, None)
+
+    for step in range(2):
+        q = dstrip(beads.q).copy()
+        f = fc.f
+        assert_allclose(f, -q)
+        # the forces of each replica are views of the component array
+        assert np.shares_memory(dstrip(fc._forces[1].f), dstrip(fc.f))
+        assert_allclose(fc.pots, q.sum(axis=1))
+        assert_allclose(fc.virs[:, 0, 1], q[:, 0])
+        assert np.all(fc.virs[:, 1, 0] == 0) and np.all(fc.virs[:, 2, :2] == 0)
+        assert_allclose(fc._forces[2].vir, fc.virs[2])
+        assert fc._forces[3].pot == fc.pots[3]
+        beads.q += 0.1
+        assert fc._f.tainted() and fc._pots.tainted()
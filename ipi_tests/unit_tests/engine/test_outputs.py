@@ -0,0 +1,56 @@
+"""Tests the background writer used for properties and trajectories."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import threading
+
+import pytest
+
+from ipi.engine.outputs import OutputQueue
+
+
+def test_queue_order():
+    """OutputQueue: writes are executed in order and flushed"""
+
+    lines = []
+    q = OutputQueue(maxsize=2)
+    for i in range(50):
+        q.submit(lines.append, i)
+    q.flush()
+    assert lines == list(range(50))
+    q.stop()
+
+
+def test_queue_backpressure():
+    """OutputQueue: submitting blocks when the queue is full"""
+
+    gate = threading.Event()
+    q = OutputQueue(maxsize=1)
+    q.submit(gate.wait)  # taken by the writer, which then waits
+    q.submit(print)  # fills the queue
+
+    blocked = threading.Thread(target=q.submit, args=(print,))
+    blocked.start()
+    blocked.join(timeout=0.2)
+    assert blocked.is_alive()
+
+    gate.set()
+    blocked.join(timeout=5.0)
+    assert not blocked.is_alive()
+    q.stop()
+
+
+def test_queue_error():
+    """OutputQueue: errors in the writer are raised on flush"""
+
+    def fail():
+        raise IOError("disk full")
+
+    q = OutputQueue()
+    q.submit(fail)
+    with pytest.raises(IOError):
+        q.flush()
+    q.stop()
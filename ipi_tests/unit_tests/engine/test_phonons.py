@@ -0,0 +1,108 @@
+"""Tests the finite-difference evaluation of the dynamical matrix."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from ipi.engine.beads import Beads
+from ipi.engine.cell import Cell
+from ipi.engine.forcefields import ForceField
+from ipi.engine.forces import Forces, ForceComponent
+from ipi.engine.motion.phonons import DynMatrixMover
+
+
+class FFHarmonic(ForceField):
+    """Returns the forces of a harmonic potential with Hessian K, and counts
+    the evaluations."""
+
+    def __init__(self, K, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.K = K
+        self.nevals = 0
+
+    def poll(self):
+        with self._threadlock:
+            for r in self.requests:
+                if r["status"] == "Queued":
+                    self.nevals += 1
+                    f = -self.K @ r["pos"]
+                    r["result"] = [-0.5 * f @ r["pos"], f, np.eye(3), {"raw": ""}]
+                    r["status"] = "Done"
+                    r._event_done.set()
+
+
+def compute_dynmat(K, m, nbeads=0, **kwargs):
+    """Runs the finite-difference steps of a DynMatrixMover for a harmonic
+    system, and returns the mover and the number of force evaluations.
+    nbeads is the ring-polymer contraction of the force component."""
+
+    natoms = len(m)
+    beads = Beads(natoms, 1)
+    beads.m[:] = m
+    beads.q = np.random.uniform(-1, 1, size=(1, 3 * natoms))
+    cell = Cell(np.eye(3) * 10.0)
+    ff = FFHarmonic(K, name="harm")
+    forces = Forces()
+    forces.bind(
+        beads,
+        cell,
+        [ForceComponent("harm", nbeads=nbeads, mts_weights=[1.0])],
+        {"harm": ff},
+        [],
+        None,
+    )
+
+    mover = DynMatrixMover(**kwargs)
+    mover.bind(None, beads, None, cell, forces, None, None)
+    for step in range(3 * natoms):
+        mover.step(step)
+    return mover, ff.nevals
+
+
+def test_fd_batch():
+    """Phonons: batched finite differences match the serial evaluation"""
+
+    natoms = 4
+    A = np.random.uniform(-1, 1, size=(3 * natoms, 3 * natoms))
+    K = A @ A.T
+    # a decoupled degree of freedom, whose row is zero
+    K[2, :] = K[:, 2] = 0.0
+    m = np.random.uniform(1, 3, size=natoms)
+    ism = 1 / np.sqrt(np.repeat(m, 3))
+    fixed = np.array([1, 5, 6])
+    free = np.setdiff1d(np.arange(3 * natoms), fixed)
+
+    serial, nserial = compute_dynmat(K, m, fixatoms_dof=fixed)
+    reference = K * np.outer(ism, ism)
+    reference[fixed] = 0
+    assert_allclose(serial.dynmatrix, reference, atol=1e-8)
+    assert nserial == 2 * len(free)
+
+    for batch in [2, 4, 20]:
+        batched, nbatched = compute_dynmat(K, m, fixatoms_dof=fixed, batch=batch)
+        assert_allclose(batched.dynmatrix, serial.dynmatrix, atol=1e-8)
+        assert_allclose(batched.refdynmatrix, serial.refdynmatrix, atol=1e-8)
+        assert nbatched == nserial
+        assert np.all(batched.done[free]) and not np.any(batched.done[fixed])
+
+    # the displaced structures are independent, and are not contracted
+    contracted, _ = compute_dynmat(K, m, nbeads=1, fixatoms_dof=fixed, batch=4)
+    assert_allclose(contracted.dynmatrix, serial.dynmatrix, atol=1e-8)
+
+    # rows that are flagged as done in the checkpoint are not recomputed,
+    # including the zero row
+    known = free[:3]
+    assert 2 in known
+    dynmat = np.zeros((3 * natoms, 3 * natoms))
+    dynmat[known] = serial.dynmatrix[known]
+    done = np.zeros(3 * natoms, bool)
+    done[known] = True
+    restarted, nrestarted = compute_dynmat(
+        K, m, fixatoms_dof=fixed, batch=4, dynmat=dynmat, done=done
+    )
+    assert_allclose(restarted.dynmatrix, serial.dynmatrix, atol=1e-8)
+    assert nrestarted == 2 * (len(free) - 3)
@@ -1,6 +1,8 @@
 import mock
 import tempfile
 import re
+import threading
+import types
 
 import pytest
 
@@ -8,6 +10,12 @@ import numpy as np
 import numpy.testing as npt
 
 import ipi.engine.properties
+from ipi.engine.beads import Beads
+from ipi.engine.cell import Cell
+from ipi.engine.forcefields import ForceField
+from ipi.engine.forces import Forces, ForceComponent
+from ipi.utils.depend import dstrip
+from ipi.utils.units import Constants
 from ..common import xyz_generator as xyz_gen
 
 test_Trajectories_print_traj_prms = [
@@ -266,3 +274,98 @@ def test_Trajectories_print_traj(prepare_Trajectories_print_traj, mocker):
     npt.assert_almost_equal(atoms.q, expected_position[bead], 5)
     npt.assert_equal(atoms.names, expected_names[: system.beads.natoms])
     npt.assert_almost_equal(cell.h, expected_cell * unit_conv)
+
+
+class FFHarmonic(ForceField):
+    """Returns the forces of a harmonic potential with Hessian K, and counts
+    the evaluations."""
+
+    def __init__(self, K, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.K = K
+        self.nevals = 0
+
+    def poll(self):
+        with self._threadlock:
+            for r in self.requests:
+                if r["status"] == "Queued":
+                    self.nevals += 1
+                    f = -self.K @ r["pos"]
+                    r["result"] = [-0.5 * f @ r["pos"], f, np.eye(3), {"raw": ""}]
+                    r["status"] = "Done"
+                    r._event_done.set()
+
+
+def harmonic_displaced_forces(K):
+    """Returns a replacement for Properties.displaced_forces that evaluates
+    each configuration directly, one after the other."""
+
+    def displaced_forces(qlist):
+        for q in qlist:
+            f = -q @ K
+            pots = -0.5 * (f * q).sum(axis=1)
+            yield (
+                types.SimpleNamespace(q=q, qc=q.mean(axis=0)),
+                types.SimpleNamespace(f=f, pots=pots, pot=pots.sum()),
+            )
+
+    return displaced_forces
+
+
+def test_displaced_estimators():
+    """Properties: displaced-path estimators evaluated in chunks"""
+
+    natoms, nbeads = 5, 4
+    A = np.random.uniform(-1, 1, size=(3 * natoms, 3 * natoms))
+    K = 0.1 * A @ A.T
+
+    beads = Beads(natoms, nbeads)
+    beads.m[:] = np.random.uniform(1000, 3000, size=natoms)
+    beads.names[:] = ["H", "O", "H", "O", "H"]
+    beads.q = np.random.uniform(-0.1, 0.1, size=(nbeads, 3 * natoms))
+    cell = Cell(np.eye(3) * 10.0)
+    ff = FFHarmonic(K, name="harm")
+    forces = Forces()
+    forces.bind(
+        beads, cell, [ForceComponent("harm", mts_weights=[1.0])], {"harm": ff}, [], None
+    )
+    kT = 1e-3
+    system = types.SimpleNamespace(
+        ensemble=types.SimpleNamespace(temp=kT / Constants.kb),
+        motion=None,
+        beads=beads,
+        nm=types.SimpleNamespace(omegan2=(nbeads * kT / Constants.hbar) ** 2),
+        cell=cell,
+        forces=forces,
+        simul=None,
+        _propertylock=threading.Lock(),
+    )
+
+    props = ipi.engine.properties.Properties()
+    props.bind(system)
+    # smaller chunks than the number of atoms, so that several are used
+    props._DISPLACED_CHUNK = 2
+    direct = ipi.engine.properties.Properties()
+    direct.bind(system)
+    direct.displaced_forces = harmonic_displaced_forces(K)
+
+    # name, arguments, number of selected atoms
+    estimators = [
+        ("get_linlin", dict(ux="0.1", uy="0.2", uz="-0.1"), natoms),
+        ("get_linlin", dict(ux="0.1", atom="H"), 3),
+        ("get_isotope_yama", dict(alpha="2.0"), natoms),
+        ("get_isotope_yama", dict(alpha="2.0", atom="3"), 1),
+        ("get_isotope_zetasc", dict(alpha="2.0"), natoms),
+        ("get_isotope_zetasc_4th", dict(alpha="2.0", atom="O"), 2),
+    ]
+    forces.pot  # evaluates the physical system first
+    for name, kwargs, nsel in estimators:
+        nevals = ff.nevals
+        value = getattr(props, name)(**kwargs)
+        # one force evaluation per bead of each displaced configuration
+        assert ff.nevals - nevals == nbeads * nsel
+        npt.assert_allclose(value, getattr(direct, name)(**kwargs), rtol=1e-10)
+    assert len(props._dclones) == 2
+
+    # the physical system is left untouched
+    npt.assert_allclose(forces.f, -dstrip(beads.q) @ K)
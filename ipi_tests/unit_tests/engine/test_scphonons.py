@@ -0,0 +1,43 @@
+"""Tests the storage of the samples of the SCP mover."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from ipi.engine.motion.scphonons import load_samples
+
+
+def record(isc, imc, dof):
+    x = np.full(dof, isc + 0.1 * imc)
+    return np.concatenate([[isc, imc, -imc], x, -x])
+
+
+def test_load_samples(tmp_path):
+    """SCP: samples are read back from the binary store"""
+
+    dof = 6
+    fn = str(tmp_path / "scp.samples")
+    assert load_samples(fn, dof) == {}
+
+    rows = [record(0, i, dof) for i in range(4)]
+    rows += [record(1, i, dof) for i in (0, 1, 3)]
+    # a sample evaluated again replaces the previous one
+    rows.append(record(0, 2, dof) + np.r_[0, 0, 10, np.zeros(2 * dof)])
+    data = np.concatenate(rows)
+    # the last record is incomplete
+    data = np.concatenate([data, record(2, 0, dof)[:5]])
+    data.tofile(fn)
+
+    samples = load_samples(fn, dof)
+    assert sorted(samples) == [0, 1]
+    x, v, f = samples[0]
+    assert x.shape == (4, dof) and f.shape == (4, dof)
+    assert_allclose(v, [0, -1, 8, -3])
+    assert_allclose(x[:, 0], [0, 0.1, 0.2, 0.3])
+    assert_allclose(f, -x)
+    # only the samples before the first missing one are returned
+    assert len(samples[1][1]) == 2
@@ -0,0 +1,82 @@
+"""Tests the fused implementation of the normal-modes thermostats."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from ipi.engine.beads import Beads
+from ipi.engine.ensembles import Ensemble
+from ipi.engine.normalmodes import NormalModes
+from ipi.engine.thermostats import (
+    ThermoPILE_L,
+    ThermoPILE_G,
+    ThermoGLE,
+    ThermoNMGLE,
+    ThermoNMGLEG,
+)
+from ipi.utils.depend import depend_value
+from ipi.utils.prng import Random
+
+A = np.array([[0.1, 0.05, 0.0], [-0.05, 0.2, 0.03], [0.0, -0.03, 0.4]])
+
+
+class DummyMotion:
+    """The bits of a motion class needed to bind normal modes."""
+
+    def __init__(self, beads):
+        self.beads = beads
+        self._dt = depend_value(name="dt", value=1.0)
+
+
+def make_nm(natoms, nbeads):
+    beads = Beads(natoms, nbeads)
+    beads.m[:] = 1.0 + np.arange(natoms)
+    beads.p[:] = np.random.default_rng(1).normal(size=(nbeads, 3 * natoms))
+    nm = NormalModes()
+    nm.bind(Ensemble(temp=0.01), DummyMotion(beads), beads)
+    return nm
+
+
+thermostats = {
+    "pile_l": lambda nb: ThermoPILE_L(temp=0.04, tau=10),
+    "pile_g": lambda nb: ThermoPILE_G(temp=0.04, tau=10),
+    "nm_gle": lambda nb: ThermoNMGLE(
+        temp=0.04, A=np.array([A * (b + 1) for b in range(nb)])
+    ),
+    "nm_gle_g": lambda nb: ThermoNMGLEG(
+        temp=0.04, A=np.array([A * (b + 1) for b in range(nb)]), tau=10
+    ),
+    "gle": lambda nb: ThermoGLE(temp=0.04, A=A),
+}
+
+
+@pytest.mark.parametrize("mode", list(thermostats))
+@pytest.mark.parametrize("natoms,nbeads", [(5, 4), (20000, 2), (3, 1)])
+def test_fused(mode, natoms, nbeads):
+    """Thermostats: the fused step gives the same trajectory"""
+
+    if mode in ["nm_gle", "nm_gle_g"] and nbeads == 1:
+        pytest.skip("single bead NM-GLE")
+
+    results = []
+    for fused in [False, True]:
+        nm = make_nm(natoms, nbeads)
+        thermo = thermostats[mode](nbeads)
+        thermo.fused = fused
+        thermo.s = np.zeros(0)
+        if mode == "gle":
+            thermo.bind(beads=nm.beads, prng=Random(seed=3))
+        else:
+            thermo.bind(nm=nm, prng=Random(seed=3), fixdof=0)
+        for _ in range(3):
+            thermo.step()
+        results.append((nm.beads.p.copy(), thermo.ethermo, thermo.s.copy()))
+
+    assert_allclose(results[0][0], results[1][0], rtol=1e-12, atol=1e-12)
+    assert_allclose(results[0][1], results[1][1], rtol=1e-12)
+    assert_allclose(results[0][2], results[1][2], rtol=1e-12, atol=1e-12)
@@ -0,0 +1,331 @@
+"""Tests the socket interface, running the python driver in a thread."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import os
+import threading
+import time
+import types
+
+import numpy as np
+import pytest
+
+from ipi.engine.forcefields import FFSocket, ForceRequest
+from ipi.interfaces.sockets import Driver, InterfaceSocket, LatencyHistogram, Status
+from ipi.pes.harmonic import Harmonic_driver
+from drivers.py.driver import run_driver
+
+
+def run_client(errors, **kwargs):
+    """Runs the python driver, that may find the connection closed if i-PI
+    stops while it is still evaluating a structure. Any other error is
+    appended to errors."""
+
+    try:
+        run_driver(**kwargs)
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    except RuntimeError as err:
+        if str(err) != "Socket disconnected!":
+            errors.append(err)
+    except Exception as err:
+        errors.append(err)
+
+
+def run_steps(
+    address,
+    nsteps=20,
+    nbeads=4,
+    natoms=5,
+    nclients=2,
+    client_kwargs={},
+    drivers=None,
+    **kwargs
+):
+    """Runs nsteps force evaluations for nbeads structures through a unix
+    socket, and checks the harmonic forces returned by the clients. natoms
+    can also be a list, in which case the number of atoms changes at every
+    step, cycling through the list."""
+
+    if drivers is None:
+        drivers = [Harmonic_driver(1.0) for _ in range(nclients)]
+
+    iface = InterfaceSocket(address=address, mode="unix", timeout=0, **kwargs)
+    ff = FFSocket(name=address, interface=iface, dopbc=False)
+    ff.start()
+    errors = []
+    threads = [
+        threading.Thread(
+            target=run_client,
+            args=(errors,),
+            kwargs=dict(
+                unix=True,
+                address=address,
+                driver=driver,
+                **client_kwargs,
+            ),
+            daemon=True,
+        )
+        for driver in drivers
+    ]
+    try:
+        for t in threads:
+            t.start()
+
+        cell = types.SimpleNamespace(h=np.eye(3), ih=np.eye(3))
+        for step in range(nsteps):
+            nat = np.atleast_1d(natoms)[step % np.size(natoms)]
+            if ff.iactive is not None and len(ff.iactive) != 3 * nat:
+                # the active atoms are fixed the first time they are needed
+                ff.iactive = None
+            q = np.random.uniform(size=(nbeads, 3 * nat))
+            beads = [types.SimpleNamespace(q=qb) for qb in q]
+            reqs = [ff.queue(b, cell, reqid=i) for i, b in enumerate(beads)]
+            for b, r in zip(beads, reqs):
+                assert r._event_done.wait(timeout=10.0)
+                assert np.allclose(r["result"][0], 0.5 * (b.q**2).sum())
+                assert np.allclose(r["result"][1], -b.q)
+                ff.release(r)
+    finally:
+        ff.stop()
+        for t in threads:
+            t.join(timeout=10.0)
+    assert errors == []
+    return iface
+
+
+@pytest.mark.parametrize(
+    "consolidate_messages,event_driven,shmem",
+    [
+        (False, False, False),
+        (True, False, False),
+        (True, True, False),
+        (False, False, True),
+        (True, False, True),
+        (True, True, True),
+    ],
+)
+def test_roundtrip(consolidate_messages, event_driven, shmem):
+    """Sockets: force evaluations in threaded, polling and event-driven mode"""
+
+    address = "test_sockets_%d_%d%d%d" % (
+        os.getpid(),
+        consolidate_messages,
+        event_driven,
+        shmem,
+    )
+    iface = run_steps(
+        address,
+        consolidate_messages=consolidate_messages,
+        event_driven=event_driven,
+        client_kwargs=dict(shmem=shmem),
+    )
+    # in threaded mode the last jobs may be released before being checked
+    assert 0 < iface.latency_stats["finish"].n <= 20 * 4
+
+
+def test_shm_resize():
+    """Sockets: the shared-memory segment is remapped when natoms changes"""
+
+    address = "test_sockets_shm_resize_%d" % os.getpid()
+    run_steps(
+        address,
+        nsteps=6,
+        natoms=[5, 8],
+        nclients=1,
+        client_kwargs=dict(shmem=True),
+    )
+
+
+@pytest.mark.parametrize("event_driven", [False, True])
+def test_batch(event_driven, monkeypatch):
+    """Sockets: several structures sent to a client in a single message"""
+
+    nbatch = []
+    send_batch = Driver.dispatch_send_batch
+
+    def counting_send_batch(self, rlist):
+        nbatch.append(len(rlist))
+        return send_batch(self, rlist)
+
+    monkeypatch.setattr(Driver, "dispatch_send_batch", counting_send_batch)
+    address = "test_sockets_batch_%d_%d" % (os.getpid(), event_driven)
+    run_steps(
+        address,
+        nbeads=8,
+        event_driven=event_driven,
+        client_kwargs=dict(batch_size=4),
+    )
+    assert len(nbatch) > 0
+    assert max(nbatch) <= 4
+
+
+class HistoryHarmonic(Harmonic_driver):
+    """A harmonic driver that keeps a reference to all the structures it
+    has evaluated, and to their positions at the time."""
+
+    def __init__(self, *args, **kwargs):
+        self.history = []
+        super().__init__(*args, **kwargs)
+
+    def compute(self, cell, pos):
+        if isinstance(cell, list):
+            for c, p in zip(cell, pos):
+                self.history.append((c, p, c.copy(), p.copy()))
+        else:
+            self.history.append((cell, pos, cell.copy(), pos.copy()))
+        return super().compute(cell, pos)
+
+
+@pytest.mark.parametrize(
+    "mode,client_kwargs",
+    [("posdata", {}), ("shmem", dict(shmem=True)), ("batch", dict(batch_size=4))],
+)
+def test_driver_history(mode, client_kwargs):
+    """Sockets: the driver can keep the structures of previous steps"""
+
+    driver = HistoryHarmonic(1.0)
+    address = "test_sockets_history_%d_%s" % (os.getpid(), mode)
+    run_steps(address, nsteps=5, drivers=[driver], client_kwargs=client_kwargs)
+    assert len(driver.history) == 5 * 4
+    for cell, pos, cell0, pos0 in driver.history:
+        assert np.array_equal(cell, cell0)
+        assert np.array_equal(pos, pos0)
+
+
+def test_latency_histogram():
+    """Sockets: latency histogram percentiles"""
+
+    h = LatencyHistogram()
+    for dt in [1e-4] * 90 + [1e-1] * 10:
+        h.add(dt)
+    assert h.n == 100
+    assert np.isclose(h.mean(), (90 * 1e-4 + 10 * 1e-1) / 100)
+    assert 1e-4 <= h.percentile(50) < 1e-3
+    assert 1e-1 <= h.percentile(99) <= h.max
+
+
+class FakeClient:
+    """A client that is always ready, and that takes slowness * cost to
+    evaluate a request whose cost is given in the costs dictionary."""
+
+    def __init__(self, name, slowness):
+        self.name = name
+        self.speed = slowness
+        self.cid = next(Driver._cids)
+        self.slowness = 1.0
+        self.status = Status.Up | Status.Ready
+        self.lastreq = None
+        self.locked = False
+        self.caps = {}
+        self.batch = []
+        self.sent = []
+
+    def dispatch_send(self, r):
+        self.sent.append(r)
+        return True
+
+
+def test_cost_scheduling():
+    """Sockets: cost-aware dispatch to clients of different speed"""
+
+    iface = InterfaceSocket(match_mode="cost")
+    rng = np.random.default_rng(12345)
+    # the fast client comes first, so that it would get the cheap request if
+    # the requests were dispatched in order
+    fast, slow = FakeClient("fast", 1.0), FakeClient("slow", 10.0)
+    iface.clients = [fast, slow]
+    iface.jobs = []
+    costs = {0: 1.0, 1: 5.0}
+    used = {0: [], 1: []}
+    for step in range(20):
+        iface.requests = [
+            ForceRequest(id=i, status="Queued", active=np.arange(3)) for i in costs
+        ]
+        iface._dispatch_free_clients()
+        assert len(iface.jobs) == 2
+        for r, c, _ in iface.jobs:
+            # timings with some noise, and in either order
+            r["t_dispatched"] = 0.0
+            r["t_finished"] = costs[r["id"]] * c.speed * rng.uniform(0.7, 1.3)
+            used[r["id"]].append(c.name)
+        for r, c, _ in sorted(iface.jobs, key=lambda job: rng.uniform()):
+            iface._record_cost(r, c)
+        iface.jobs = []
+
+    # only the first time the expensive request goes to the slow client
+    assert used[1] == ["slow"] + ["fast"] * 19
+    assert np.isclose(iface.costs[1] / iface.costs[0], 5.0, rtol=0.3)
+    assert np.isclose(slow.slowness / fast.slowness, 10.0, rtol=0.3)
+
+
+def test_cost_speculation():
+    """Sockets: copies of slow requests sent to idle faster clients"""
+
+    iface = InterfaceSocket(match_mode="cost", speculative=True)
+    fast, slow = FakeClient("fast", 1.0), FakeClient("slow", 10.0)
+    fast.slowness, slow.slowness = 1.0, 10.0
+    iface.clients = [fast, slow]
+    iface.costs = {0: 1.0, 1: 5.0}
+
+    # the expensive request has just been sent to the slow client
+    r = ForceRequest(id=1, status="Running", start=time.time(), t_queued=0.0)
+    iface.requests = [r]
+    iface.jobs = [[r, slow, None]]
+    iface._dispatch_free_clients()
+    assert len(fast.sent) == 1
+    twin = fast.sent[0]
+    assert twin["primary"] is r and r["twin"] is twin
+    assert iface.jobs[-1] == [twin, fast, None]
+
+    # the copy returns first, and the slow result will be discarded
+    twin["result"] = "fast"
+    twin["t_dispatched"], twin["t_finished"] = 0.0, 5.0
+    twin["client"] = fast.name
+    iface._complete(twin, fast)
+    assert r["status"] == "Done" and r._event_done.is_set()
+    assert r["result"] == "fast" and "twin" not in r
+    assert iface.jobs[0][0] is not r and iface.jobs[0][0]["primary"] is r
+
+    # nothing is sent when the idle client would not finish first
+    r = ForceRequest(id=0, status="Running", start=time.time())
+    iface.requests = [r]
+    iface.jobs = [[r, fast, None]]
+    slow.sent = []
+    iface._dispatch_free_clients()
+    assert slow.sent == []
+
+
+def test_cost_bookkeeping():
+    """Sockets: running averages of request costs and client speeds"""
+
+    iface = InterfaceSocket(match_mode="cost")
+    fast = types.SimpleNamespace(cid=0, slowness=1.0)
+    slow = types.SimpleNamespace(cid=1, slowness=1.0)
+    for _ in range(20):
+        for rid, cost in [(0, 1.0), (1, 3.0)]:
+            r = {"id": rid, "t_dispatched": 0.0, "t_finished": cost}
+            iface._record_cost(r, fast)
+            r = {"id": rid, "t_dispatched": 0.0, "t_finished": 4 * cost}
+            iface._record_cost(r, slow)
+    assert np.isclose(slow.slowness / fast.slowness, 4.0, rtol=0.05)
+    assert np.isclose(iface.costs[1] / iface.costs[0], 3.0, rtol=0.05)
+
+    freec = [slow, fast]
+    iface.prlist = [{"id": 0}, {"id": 2}, {"id": 1}]
+    iface._sort_by_cost(freec)
+    assert freec == [fast, slow]
+    assert [r["id"] for r in iface.prlist] == [1, 2, 0]
+
+    # requests that have only been evaluated by one client say nothing about
+    # the speed of the clients, and their cost is just the time taken
+    iface = InterfaceSocket(match_mode="cost")
+    fast.slowness = slow.slowness = 1.0
+    for _ in range(20):
+        iface._record_cost({"id": 0, "t_dispatched": 0.0, "t_finished": 4.0}, slow)
+        iface._record_cost({"id": 1, "t_dispatched": 0.0, "t_finished": 3.0}, fast)
+    assert fast.slowness == slow.slowness == 1.0
+    assert iface.costs == {0: 4.0, 1: 3.0}
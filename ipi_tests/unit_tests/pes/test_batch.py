@@ -0,0 +1,49 @@
+"""Tests the batched evaluation of the python PES."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from ipi.pes.dummy import Dummy_driver
+from ipi.pes.harmonic import Harmonic_driver
+from ipi.pes.morse import MorseHarmonic_driver
+from ipi.pes.doublewell import DoubleWell_driver
+
+# driver class, init arguments, number of atoms
+drivers = [
+    (Dummy_driver, {}, 4),
+    (Harmonic_driver, {"k1": 1.3}, 4),
+    (Harmonic_driver, {"k1": 1.3, "k2": 2.1, "k3": 2.3}, 4),
+    (MorseHarmonic_driver, {}, 4),
+    (DoubleWell_driver, {}, 1),
+]
+
+
+@pytest.mark.parametrize("cls, kwargs, natoms", drivers)
+def test_compute_batch(cls, kwargs, natoms):
+    """compute_batch gives the same results as compute_structure"""
+
+    driver = cls(**kwargs)
+    cell = np.tile(np.eye(3) * 10.0, (5, 1, 1))
+    pos = np.random.uniform(-1.0, 1.0, size=(5, natoms, 3))
+
+    pot, force, vir, extras = driver.compute_batch(cell, pos)
+    assert pot.shape == (5,)
+    assert force.shape == pos.shape
+    assert vir.shape == cell.shape
+    assert len(extras) == 5
+    for i in range(5):
+        rpot, rforce, rvir, rextras = driver.compute_structure(cell[i], pos[i])
+        assert_allclose(pot[i], rpot)
+        assert_allclose(force[i], rforce)
+        assert_allclose(vir[i], rvir)
+
+    # lists of structures are evaluated through compute_batch
+    results = driver(list(cell), list(pos))
+    assert len(results) == 5
+    assert_allclose([r[0] for r in results], pot)
@@ -0,0 +1,70 @@
+"""Tests the i-PI binary trajectory format."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose, assert_equal
+
+from ipi.engine.atoms import Atoms
+from ipi.engine.cell import Cell
+from ipi.utils.io import print_file, iter_file
+from ipi.utils.io.backends.io_ipb import memmap_ipb
+
+
+def make_frames(nframes=5, natoms=6):
+    """Returns random positions and cells."""
+
+    q = np.random.uniform(-5.0, 5.0, size=(nframes, 3 * natoms))
+    h = np.triu(np.random.uniform(5.0, 10.0, size=(nframes, 3, 3)))
+    return q, h
+
+
+def write_frames(filename, mode, q, h, fmode="w"):
+    atoms = Atoms(q.shape[1] // 3)
+    atoms.names[:] = ["O", "H", "H"] * (atoms.natoms // 3)
+    with open(filename, fmode) as f:
+        for i in range(len(q)):
+            atoms.q[:] = q[i]
+            title = "Step: %10d  Bead: %5d" % (10 * i, 0)
+            print_file(mode, atoms, Cell(h[i]), f, title=title)
+
+
+@pytest.mark.parametrize("mode, rtol", [("ipb", 0.0), ("ipb32", 1e-6)])
+def test_roundtrip(tmp_path, mode, rtol):
+    """ipb: frames read back with iter_file and memmap_ipb"""
+
+    q, h = make_frames()
+    filename = str(tmp_path / ("traj." + mode))
+    write_frames(filename, mode, q, h)
+
+    with open(filename) as f:
+        frames = list(iter_file(mode, f))
+    assert len(frames) == len(q)
+    for i, frame in enumerate(frames):
+        assert_allclose(frame["atoms"].q, q[i], rtol=rtol)
+        assert_allclose(frame["cell"].h, h[i], rtol=rtol)
+        assert list(frame["atoms"].names[:3]) == ["O", "H", "H"]
+        assert "Step: %10d" % (10 * i) in frame["comment"]
+
+    header, data = memmap_ipb(filename)
+    assert header["natoms"] == q.shape[1] // 3
+    assert_equal(data["step"], 10 * np.arange(len(q)))
+    assert_allclose(data["data"].reshape(q.shape), q, rtol=rtol)
+
+
+def test_append(tmp_path):
+    """ipb: appending to an existing file, as after a restart"""
+
+    q, h = make_frames()
+    filename = str(tmp_path / "traj.ipb")
+    write_frames(filename, "ipb", q[:2], h[:2])
+    write_frames(filename, "ipb", q[2:], h[2:], fmode="a")
+
+    header, data = memmap_ipb(filename)
+    assert len(data) == len(q)
+    assert_equal(data["data"].reshape(q.shape), q)
+    assert_equal(data["cell"], h)
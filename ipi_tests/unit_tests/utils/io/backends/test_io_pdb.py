@@ -0,0 +1,62 @@
+"""Tests writing and reading PDB files."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import io
+
+import numpy as np
+import numpy.testing as npt
+
+import ipi.utils.io.backends.io_pdb as io_pdb
+from ipi.engine.beads import Beads
+from ipi.engine.cell import Cell
+
+
+def make_beads(natoms, nbeads):
+    beads = Beads(natoms, nbeads)
+    beads.q[:] = np.random.uniform(-10, 10, size=(nbeads, 3 * natoms))
+    beads.names[:] = np.random.choice(["H", "O", "Cl"], size=natoms)
+    return beads
+
+
+def test_print_pdb():
+    """A configuration written to pdb is read back"""
+
+    beads = make_beads(6, 1)
+    cell = Cell(np.diag([5.0, 6.0, 7.0]))
+    filedesc = io.StringIO()
+    io_pdb.print_pdb(beads[0], cell, filedesc=filedesc, title="positions{angstrom}")
+    filedesc.seek(0)
+
+    comment, tcell, tqatoms, tnames, _ = io_pdb.read_pdb(filedesc)
+    assert "positions{angstrom}" in comment
+    npt.assert_allclose(tcell, cell.h, atol=1e-3)
+    npt.assert_allclose(tqatoms, beads.q[0], atol=1e-3)
+    npt.assert_array_equal(tnames, beads.names)
+
+
+def test_print_pdb_path():
+    """All the beads are written, with the springs between them"""
+
+    natoms, nbeads = 4, 3
+    beads = make_beads(natoms, nbeads)
+    filedesc = io.StringIO()
+    io_pdb.print_pdb_path(beads, Cell(np.eye(3) * 5), filedesc=filedesc)
+    lines = filedesc.getvalue().splitlines()
+
+    atoms = [l for l in lines if l.startswith("ATOM")]
+    assert [int(l[6:11]) for l in atoms] == list(range(1, natoms * nbeads + 1))
+    q = np.array([[float(l[31:39]), float(l[39:47]), float(l[47:55])] for l in atoms])
+    npt.assert_allclose(q.flatten(), beads.q.flatten(), atol=1e-3)
+
+    conect = [tuple(map(int, l[6:].split())) for l in lines if l.startswith("CONECT")]
+    expected = [(i + 1, (nbeads - 1) * natoms + i + 1) for i in range(natoms)] + [
+        (j * natoms + i + 1, (j + 1) * natoms + i + 1)
+        for j in range(nbeads - 1)
+        for i in range(natoms)
+    ]
+    assert conect == expected
+    assert lines[-1] == "END"
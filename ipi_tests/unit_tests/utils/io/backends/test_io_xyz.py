@@ -2,6 +2,7 @@
 # pylint: disable=C0111,W0621,R0914,C0301
 # +easier to find important problems
 
+import io
 import re
 import tempfile as tmp
 import filecmp
@@ -16,6 +17,7 @@ import ipi.utils.io.backends.io_xyz as io_xyz
 import ipi.utils.mathtools as mt
 
 from ipi.engine.atoms import Atoms
+from ipi.engine.beads import Beads
 from ipi.engine.cell import Cell
 from ipi.utils.units import Elements
 
@@ -285,6 +287,72 @@ def test_print_xyz(create_random_xyz_traj_to_write):
     os.remove(filedesc_test.name)
 
 
+def test_print_xyz_path():
+    """All the beads are written as consecutive xyz frames"""
+
+    natoms, nbeads = 5, 3
+    beads = Beads(natoms, nbeads)
+    beads.q[:] = np.random.uniform(-10, 10, size=(nbeads, 3 * natoms))
+    beads.names[:] = ["H", "O", "Cl", "H", "C"]
+    cell = Cell(mt.abc2h(5.1, 5.2, 5.0, 91 * deg2rad, 89 * deg2rad, 90 * deg2rad))
+
+    filedesc = io.StringIO()
+    io_xyz.print_xyz_path(beads, cell, filedesc=filedesc, atoms_conv=0.5)
+    filedesc.seek(0)
+
+    for j in range(nbeads):
+        comment, tcell, tqatoms, tnames, _ = io_xyz.read_xyz(filedesc)
+        assert comment.startswith("# bead: %d CELL(abcABC):" % j)
+        npt.assert_allclose(tcell, cell.h, atol=1e-4)
+        npt.assert_allclose(tqatoms, beads.q[j] * 0.5, rtol=1e-5)
+        npt.assert_array_equal(tnames, beads.names)
+    with pytest.raises(EOFError):
+        io_xyz.read_xyz(filedesc)
+
+
+def test_read_xyz_frames():
+    """Blocks of frames are read as with consecutive calls to read_xyz"""
+
+    genh = "0.5 0.0 0.0 0.1 1.0 0.0 0.2 0.3 1.5"
+    comments = [
+        "# CELL(abcABC): 5.1 5.2 5.0 91.0 89.0 90.0 Step: 0",
+        "# CELL{H}: " + cell_string,
+        "# CELL[GENH]: " + genh + " Step: 2",
+        "no cell",
+        "# CELL(abcABC): 6.0 6.0 6.0 90.0 90.0 90.0 Step: 4",
+    ]
+    names = ["O", "H", "H", "Cl"]
+    text = ""
+    for comment in comments:
+        text += "%d\n%s\n" % (len(names), comment)
+        for name in names:
+            text += "%s %f %f %f\n" % ((name,) + tuple(np.random.uniform(-5, 5, 3)))
+
+    single = io.StringIO(text)
+    blocks = io.StringIO(text)
+    for nframes in [2, 2, 2]:
+        tcomments, tcells, tdata, tnames, tmasses = io_xyz.read_xyz_frames(
+            blocks, nframes
+        )
+        assert len(tcomments) == min(nframes, len(comments))
+        for k in range(len(tcomments)):
+            comment, cell, data, rnames, masses = io_xyz.read_xyz(single)
+            assert tcomments[k] == comment
+            npt.assert_allclose(tcells[k], cell)
+            npt.assert_allclose(tdata[k], data, rtol=1e-12, atol=1e-12)
+            npt.assert_array_equal(tnames, rnames)
+            npt.assert_array_equal(tmasses, masses)
+        comments = comments[len(tcomments) :]
+    with pytest.raises(EOFError):
+        io_xyz.read_xyz_frames(blocks, 2)
+
+    text = "2\n\nH 0 0 0\nO 0 0 0\n2\n\nO 0 0 0\nH 0 0 0\n"
+    with pytest.raises(ValueError):
+        io_xyz.read_xyz_frames(io.StringIO(text), 2)
+    with pytest.raises(ValueError):
+        io_xyz.read_xyz(io.StringIO("3\n\nH 0 0 0\nO 0 0 0\n"))
+
+
 # def test_print_xyz(atoms, cell, filedesc=sys.stdout, title="")
 
 
@@ -0,0 +1,41 @@
+"""Tests reading trajectories in blocks of frames."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from ipi.engine.atoms import Atoms
+from ipi.engine.cell import Cell
+from ipi.utils.io import print_file, iter_file, iter_file_batches
+
+
+@pytest.mark.parametrize("mode", ["xyz", "pdb"])
+def test_iter_file_batches(tmp_path, mode):
+    """Blocks of frames match the frames read one by one"""
+
+    filename = str(tmp_path / ("traj." + mode))
+    atoms = Atoms(4)
+    atoms.names[:] = ["O", "H", "H", "C"]
+    cell = Cell(np.diag([10.0, 11.0, 12.0]))
+    with open(filename, "w") as f:
+        for i in range(7):
+            atoms.q[:] = np.random.uniform(size=12)
+            print_file(mode, atoms, cell, f, title="Step: %d" % i, units="angstrom")
+
+    with open(filename) as f:
+        frames = list(iter_file(mode, f))
+    with open(filename) as f:
+        blocks = list(iter_file_batches(mode, f, 3))
+
+    assert [len(b["comments"]) for b in blocks] == [3, 3, 1]
+    data = np.concatenate([b["data"] for b in blocks])
+    cells = np.concatenate([b["cells"] for b in blocks])
+    for k, frame in enumerate(frames):
+        assert_allclose(data[k], frame["atoms"].q)
+        assert_allclose(cells[k], frame["cell"].h)
+        assert list(blocks[0]["names"]) == list(frame["atoms"].names)
@@ -0,0 +1,60 @@
+"""Tests random access to trajectory frames through FrameIndex."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import os
+
+import numpy as np
+import pytest
+from numpy.testing import assert_equal
+
+from ipi.engine.atoms import Atoms
+from ipi.engine.cell import Cell
+from ipi.utils.io import print_file, iter_file
+from ipi.utils.io.io_index import FrameIndex
+
+
+def write_trajectory(filename, mode, nframes=7, natoms=4):
+    """Writes a trajectory with random positions."""
+
+    atoms = Atoms(natoms)
+    atoms.names[:] = "H"
+    cell = Cell(np.eye(3) * 10.0)
+    with open(filename, "w") as f:
+        for i in range(nframes):
+            atoms.q[:] = np.random.uniform(size=3 * natoms)
+            print_file(mode, atoms, cell, f, title="Step: %d" % i)
+
+
+@pytest.mark.parametrize("mode", ["xyz", "pdb", "ipb"])
+def test_index(tmp_path, mode):
+    """FrameIndex: random access gives the same frames as reading in sequence"""
+
+    filename = str(tmp_path / ("traj." + mode))
+    write_trajectory(filename, mode)
+    with open(filename) as f:
+        frames = [r["atoms"].q.copy() for r in iter_file(mode, f)]
+
+    findex = FrameIndex(filename, mode)
+    assert len(findex) == len(frames)
+    for i in [3, 0, 6, 2]:
+        assert_equal(findex.read(i)["atoms"].q, frames[i])
+    with pytest.raises(EOFError):
+        findex.read(len(frames))
+    findex.close()
+    assert os.path.exists(filename + ".idx.npz")
+
+
+def test_index_cache(tmp_path):
+    """FrameIndex: the cached index is rebuilt when the file changes"""
+
+    filename = str(tmp_path / "traj.xyz")
+    write_trajectory(filename, "xyz", nframes=3)
+    assert len(FrameIndex(filename)) == 3
+
+    write_trajectory(filename, "xyz", nframes=5)
+    os.utime(filename, ns=(0, 0))
+    assert len(FrameIndex(filename)) == 5
@@ -179,3 +179,51 @@ def test_strided_slice_refresh_via_parent():
     sx_new = np.asarray(sx).copy()
     assert counter[0] == 2
     assert np.array_equal(sx_new, np.asarray(full)[0::3])
+
+
+def make_chain():
+    """Returns x -> y -> z, and a counter of the evaluations of z."""
+    x = dp.depend_array(name="x", value=np.zeros(3))
+    y = dp.depend_value(name="y", func=lambda: 2 * x.sum(), dependencies=[x])
+    count = [0]
+
+    def get_z():
+        count[0] += 1
+        return y.get() + 1
+
+    z = dp.depend_value(name="z", func=get_z, dependencies=[y])
+    z.get()
+    return x, y, z, count
+
+
+def test_dbatch():
+    """Depend: taints issued in a batch are propagated when it exits."""
+    x, y, z, count = make_chain()
+    with dp.dbatch():
+        x[0] = 1.0
+        x[1:] = 2.0
+        with dp.dbatch():
+            x[2] = 3.0
+        # the propagation is deferred to the outermost block
+        assert not z.tainted()
+    assert y.tainted() and z.tainted()
+    assert z.get() == 13.0 and count[0] == 2
+
+
+def test_dfreeze():
+    """Depend: a frozen graph taints through flat lists of dependants,
+    which follow later changes to the graph."""
+    x, y, z, count = make_chain()
+    dp.dfreeze()
+    try:
+        x[0] = 1.0
+        assert y.tainted() and z.tainted()
+        assert z.get() == 3.0
+
+        w = dp.depend_value(name="w", func=lambda: z.get() * 2, dependencies=[z])
+        assert w.get() == 6.0
+        x[1:] = 1.0
+        assert w.tainted()
+        assert w.get() == 14.0
+    finally:
+        dp.dfreeze(False)
@@ -0,0 +1,94 @@
+"""Tests the instrumentation of the depend machinery."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+
+import ipi.utils.depend as dp
+from ipi.utils.depprofile import DependProfiler
+
+
+class Chain:
+    def __init__(self):
+        self._x = dp.depend_array(name="x", value=np.ones(3))
+        self._y = dp.depend_value(
+            name="y", func=lambda: 2 * self._x.sum(), dependencies=[self._x]
+        )
+        self._z = dp.depend_value(name="z", func=self.get_z, dependencies=[self._y])
+
+    def get_z(self):
+        return self._y.get() + 1
+
+
+def test_profiler_counts():
+    """Depend profiler: refreshes, taints and fan-out"""
+
+    chain = Chain()
+    chain._z.get()
+    prof = DependProfiler()
+    orig = dp.depend_base.taint
+    prof.enable()
+    try:
+        for i in range(3):
+            chain._x[0] = i
+            assert chain._z.get() == 2 * (i + 2) + 1
+    finally:
+        prof.disable()
+    assert dp.depend_base.taint is orig
+
+    z = prof.stats["z [Chain.get_z]"]
+    assert z.refreshes == 3
+    assert z.time >= z.selftime >= 0
+    y = [s for k, s in prof.stats.items() if k.startswith("y [")][0]
+    assert y.refreshes == 3
+    x = prof.stats["x"]
+    assert x.cascades == 3
+    assert x.fanout == 6 and x.maxfanout == 2
+    assert prof.ncascades == 3
+
+    report = prof.report(sort="refreshes")
+    assert "z [Chain.get_z]" in report
+    dot = prof.dot()
+    assert dot.startswith("digraph") and dot.count("->") == 2
+
+    # nothing is recorded once the profiler is disabled
+    chain._x[0] = 10
+    chain._z.get()
+    assert prof.stats["z [Chain.get_z]"].refreshes == 3
+
+
+def test_profiler_batch_and_freeze():
+    """Depend profiler: batched and frozen taints keep their behaviour"""
+
+    chain = Chain()
+    chain._z.get()
+    prof = DependProfiler()
+    orig = dp.depend_base._taint_dependants
+    prof.enable()
+    try:
+        with dp.dbatch():
+            chain._x[0] = 2
+            chain._x[1] = 3
+            # the propagation is still deferred to the end of the batch
+            assert not chain._y.tainted()
+        assert chain._y.tainted() and chain._z.tainted()
+        assert chain._z.get() == 2 * 6 + 1
+        x = prof.stats["x"]
+        assert x.cascades == 1 and x.fanout == 2
+
+        dp.dfreeze()
+        try:
+            chain._x[0] = 5
+            assert chain._x._flat is not None  # went through the flat lists
+            assert chain._z.tainted()
+            assert chain._z.get() == 2 * 9 + 1
+        finally:
+            dp.dfreeze(False)
+        assert x.cascades == 2 and x.fanout == 4
+    finally:
+        prof.disable()
+    assert dp.depend_base._taint_dependants is orig
+    assert prof.stats["z [Chain.get_z]"].refreshes == 2
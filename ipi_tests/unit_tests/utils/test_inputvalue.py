@@ -0,0 +1,31 @@
+"""Tests reading and writing arrays through the input classes."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+from numpy.testing import assert_equal
+
+from ipi.utils.inputvalue import InputArray
+from ipi.utils.io.inputs.io_xml import xml_parse_string
+
+
+def test_array_npy(tmp_path):
+    """Tests that arrays written as .npy files are read back exactly."""
+
+    value = np.random.uniform(size=(4, 30))
+    fname = str(tmp_path / "q.npy")
+    np.save(fname, value.flatten())
+
+    arr = InputArray(dtype=float, default=np.zeros(0))
+    arr.store(value)
+    arr.mode.store("npy")
+    arr._text = fname
+    xml = arr.write("q")
+    assert fname in xml and "[" not in xml
+
+    parsed = InputArray(dtype=float, default=np.zeros(0))
+    parsed.parse(xml_parse_string(xml).fields[0][1])
+    assert_equal(parsed.fetch(), value)
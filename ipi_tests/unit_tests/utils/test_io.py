@@ -11,8 +11,10 @@ Otherwise, replace all the with statements with f = filestream.
 
 import filecmp
 import os
+import shutil
 
 import numpy as np
+import pytest
 from numpy.testing import assert_equal
 
 from ..common.folder import local
@@ -215,6 +217,33 @@ def test_read_output_high_verbosity():
         assert len(v) == 3, f"`{k}` has the wrong size: {len(v)}"
 
 
+def test_read_output_selection(tmp_path):
+    """Test reading a subset of the properties and frames of an output file."""
+
+    file = str(tmp_path / "prop.high.out")
+    shutil.copy(local("prop.high.out"), file)
+    a, b = read_output(file)
+
+    c, d = read_output(file, properties=["dipole(1)", "time"], start=1, stride=2)
+    assert list(c.keys()) == ["dipole(1)", "time"]
+    assert d["time"] == b["time"]
+    assert_equal(c["dipole(1)"], a["dipole(1)"][1::2].squeeze())
+    assert_equal(c["time"], a["time"][1::2].squeeze())
+
+    c, _ = read_output(file, properties=["potential", "Efield"], stop=1, squeeze=False)
+    assert c["potential"].shape == (1, 1) and c["Efield"].shape == (1, 3)
+    assert_equal(c["Efield"][0], a["Efield"][0])
+
+    # the second call reads the binary copy
+    for _ in range(2):
+        c, _ = read_output(file, properties=["dipole(0)"], start=1, cache=True)
+        assert_equal(c["dipole(0)"], a["dipole(0)"][1:])
+    assert os.path.exists(file + ".cache.npz")
+
+    with pytest.raises(ValueError):
+        read_output(file, properties=["nothing"])
+
+
 if __name__ == "__main__":
     test_read_output_low_verbosity()
     test_read_output_low_verbosity()
@@ -0,0 +1,79 @@
+"""Tests the removal of the external modes from dynamical matrices."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from ipi.utils.phonontools import external_modes, project_modes
+from ipi.utils.hesstools import clean_hessian
+
+
+def reference_modes(asr, q, m, ism):
+    """Builds the external modes one degree of freedom at a time."""
+
+    natoms = len(m)
+    com = np.dot(q.reshape((natoms, 3)).T, m) / m.sum()
+    qminuscom = q.reshape((natoms, 3)) - com
+    moi = np.zeros((3, 3), float)
+    for k in range(natoms):
+        cross = np.cross(qminuscom[k], np.identity(3))
+        moi -= np.dot(cross, cross) * m[k]
+    U = np.linalg.eig(moi)[1]
+    R = np.dot(qminuscom, U)
+
+    D = np.zeros((3 if asr == "crystal" else 6, 3 * natoms), float)
+    D[0] = np.tile([1, 0, 0], natoms) / ism
+    D[1] = np.tile([0, 1, 0], natoms) / ism
+    D[2] = np.tile([0, 0, 1], natoms) / ism
+    if asr == "poly":
+        for i in range(3 * natoms):
+            iatom, idof = i // 3, i % 3
+            D[3, i] = (R[iatom, 1] * U[idof, 2] - R[iatom, 2] * U[idof, 1]) / ism[i]
+            D[4, i] = (R[iatom, 2] * U[idof, 0] - R[iatom, 0] * U[idof, 2]) / ism[i]
+            D[5, i] = (R[iatom, 0] * U[idof, 1] - R[iatom, 1] * U[idof, 0]) / ism[i]
+    return D / np.linalg.norm(D, axis=1)[:, np.newaxis]
+
+
+@pytest.mark.parametrize("asr", ["crystal", "poly"])
+def test_project_modes(asr):
+    """External modes: the low-rank projection matches the dense one"""
+
+    rng = np.random.default_rng(12345)
+    natoms = 7
+    m = rng.uniform(1, 20, natoms)
+    ism = np.repeat(m, 3) ** -0.5
+    q = rng.normal(size=3 * natoms)
+    dm = rng.normal(size=(3 * natoms, 3 * natoms))
+
+    # the sign of the rotational modes is arbitrary, so compares the
+    # projectors on the space of the external modes
+    D = external_modes(asr, q, m, ism)[0]
+    Dref = reference_modes(asr, q, m, ism)
+    assert D.shape == Dref.shape
+    assert_allclose(np.dot(D.T, D), np.dot(Dref.T, Dref), atol=1e-12)
+
+    T = np.eye(3 * natoms) - np.dot(D.T, D)
+    assert_allclose(project_modes(dm, D), np.dot(T.T, np.dot(dm, T)), atol=1e-12)
+
+
+def test_clean_hessian():
+    """External modes: clean_hessian removes translations and rotations"""
+
+    rng = np.random.default_rng(12345)
+    natoms, nbeads = 4, 3
+    m = rng.uniform(1, 20, natoms)
+    m3 = np.repeat(np.tile(m, nbeads), 3)
+    q = rng.normal(size=(nbeads, 3 * natoms))
+    h = rng.normal(size=(3 * natoms * nbeads, 3 * natoms * nbeads))
+    h = np.dot(h, h.T) * 1e-6
+
+    d, w = clean_hessian(h, q, natoms, nbeads, m, m3, "poly")
+    assert d.shape == (3 * natoms * nbeads - 6,)
+    assert w.shape == (3 * natoms * nbeads, 3 * natoms * nbeads - 6)
+    D = external_modes("poly", q, np.tile(m, nbeads), m3**-0.5)[0]
+    assert_allclose(np.dot(D, w), 0, atol=1e-8)
@@ -0,0 +1,88 @@
+"""Tests the generation of random numbers."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from ipi.inputs.prng import InputRandom
+from ipi.utils.io import NumpyEncoder
+from ipi.utils.io.inputs.io_xml import xml_parse_string
+from ipi.utils.prng import Random
+
+
+def test_threaded_fill():
+    """PRNG: threaded fill writes in place and is reproducible"""
+
+    prng = Random(seed=12345, n_threads=4)
+    out = np.zeros((8, 300))
+    prng.gfill(out)
+    assert np.all(out != 0)
+    assert abs(out.mean()) < 0.1 and abs(out.std() - 1) < 0.1
+
+    # a non-contiguous view is filled, and the rest is left untouched
+    first = out.copy()
+    prng.gfill(out[:, :200])
+    assert np.all(out[:, :200] != first[:, :200])
+    assert np.array_equal(out[:, 200:], first[:, 200:])
+
+    # same seed and number of threads, same numbers
+    other = Random(seed=12345, n_threads=4)
+    assert np.array_equal(other.gvec((8, 300)), first)
+
+
+def test_concurrent_fill():
+    """PRNG: fills from concurrent threads return only when filled"""
+
+    prng = Random(seed=3, n_threads=4)
+    failed = []
+
+    def fill():
+        out = np.empty((4, 1000))
+        for _ in range(200):
+            out[:] = np.nan
+            prng.gfill(out)
+            if np.isnan(out).any():
+                failed.append(out.copy())
+
+    threads = [threading.Thread(target=fill) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not failed
+
+
+def test_checkpoint():
+    """PRNG: all the streams are restored from the state"""
+
+    prng = Random(seed=7, n_threads=3)
+    prng.gvec(1000)
+    state = json.loads(json.dumps(prng.state, cls=NumpyEncoder))
+    restart = Random(state=state, n_threads=3)
+    assert np.array_equal(prng.gvec(1000), restart.gvec(1000))
+    assert prng.g == restart.g
+
+    with pytest.raises(ValueError):
+        Random(state=state, n_threads=2)
+
+
+def test_restart_xml():
+    """PRNG: a threaded generator is written to and read back from xml"""
+
+    prng = Random(seed=7, n_threads=2)
+    prng.gvec(100)
+    iprng = InputRandom()
+    iprng.store(prng)
+    xml = xml_parse_string(iprng.write("prng"))
+    iprng = InputRandom()
+    iprng.parse(xml.fields[0][1])
+    restart = iprng.fetch()
+    assert restart.n_threads == 2
+    assert np.array_equal(prng.gvec(100), restart.gvec(100))
@@ -0,0 +1,67 @@
+"""Tests the tracing of force requests."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import json
+
+import numpy as np
+
+from ipi.utils.tracing import RequestTracer
+
+
+def fake_request(t0, client):
+    return {
+        "t_queued": t0,
+        "t_dispatched": t0 + 1.0,
+        "t_finished": t0 + 3.0,
+        "client": client,
+    }
+
+
+def test_ring_buffer():
+    """Request tracer: oldest records are overwritten"""
+
+    tracer = RequestTracer(capacity=4)
+    for i in range(6):
+        tracer.step = i
+        tracer.record(
+            fake_request(10.0 * i, i % 2), "ff", bead=i, t_collected=10.0 * i + 4.0
+        )
+
+    recs = tracer.records()
+    assert tracer.nrecorded == 6
+    assert recs["step"].tolist() == [2, 3, 4, 5]
+    assert recs["client"].tolist() == [0, 1, 0, 1]
+    assert np.all(recs["t_collected"] - recs["t_finished"] == 1.0)
+
+
+def test_export():
+    """Request tracer: Chrome trace and summary"""
+
+    tracer = RequestTracer()
+    tracer.step = 0
+    tracer.record(fake_request(0.0, 0), "sock", bead=0, t_collected=4.0)
+    tracer.record(fake_request(0.0, 1), "sock", bead=1, t_collected=4.0)
+    # a forcefield that does not fill in the dispatch time
+    tracer.record(
+        {"t_queued": 1.0, "t_dispatched": 0, "t_finished": 2.0},
+        "direct",
+        t_collected=2.5,
+    )
+
+    trace = json.loads(json.dumps(tracer.chrome_trace()))
+    events = trace["traceEvents"]
+    names = {e["args"]["name"] for e in events if e["name"] == "process_name"}
+    assert names == {"sock", "direct"}
+    driver = [e for e in events if e.get("cat") == "driver"]
+    assert len(driver) == 3
+    assert driver[0]["ts"] == 1e6 and driver[0]["dur"] == 2e6
+    assert driver[2]["ts"] == 1e6 and driver[2]["tid"] == 0
+    assert len([e for e in events if e.get("cat") == "queue"]) == 6
+
+    summary = tracer.summary()
+    assert "Forcefield sock: 2 requests" in summary
+    assert "direct" in summary
@@ -29,14 +29,10 @@ import glob
 from ipi.utils.messages import verbosity
 
 from ipi.utils.io import read_file
+from ipi.scripting.parsing import read_output
 from ipi.utils.units import unit_to_internal, unit_to_user, Constants
 
 verbosity.low = "low"
-time_index, potentialEnergy_index = (
-    0,
-    0,
-)  # global variables for time step and potential energy units
-potentialEnergyUnit = None  # potential energy unit in input file prefix.out
 temperature = None  # simulation temperature
 skipSteps = 0  # steps to skip for thermalization
 
@@ -67,13 +63,12 @@ def totalEnergy(prefix, temp, ss=0):
     for filename in sorted(glob.glob(prefix + ".for*")):
         ifor.append(open(filename, "r"))
 
-    iU = None  # input potential energy and simulation time file
+    fn_iU = None  # input potential energy and simulation time file
     for filename in sorted(glob.glob(prefix + ".out")):
-        iU = open(filename, "r")
+        fn_iU = filename
 
-    global potentialEnergyUnit, timeUnit
-    timeUnit, potentialEnergyUnit = extractUnits(
-        iU
+    timeUnit, potentialEnergyUnit, times, potentials = read_U(
+        fn_iU
     )  # extracting simulation time and potential energy units
 
     iE = open(prefix + ".energy" + ".dat", "w")
@@ -107,7 +102,9 @@ def totalEnergy(prefix, temp, ss=0):
                     f = np.zeros((nbeads, 3 * natoms))
                 q[i, :] = pos
                 f[i, :] = force
-            time, U = read_U(iU)
+            if ifr >= len(times):
+                raise EOFError
+            time, U = times[ifr], potentials[ifr]
         except EOFError:  # finished reading files
             sys.exit(0)
 
@@ -188,92 +185,33 @@ def totalEnergy(prefix, temp, ss=0):
             ifr += 1
 
 
-def extractUnits(filedescU):
-    """
-    Extracting potential energy and time step units.
-    Also this function looking for the simulation time
-    and potential energy position in the prefix.out
-    file. Thus, this file can contain any number of
-    output properties in arbitrary ordering.
+def read_U(filename):
+    """Reads the simulation time and the potential energy from the prefix.out
+    file, which can contain any number of output properties in arbitrary
+    ordering. Potential energy is transformed into internal units.
 
     Args:
-       filedesc: An open readable file object from a xyz formatted file.
+       filename: The name of the prefix.out file.
 
     Returns:
-       Simulation time and potential energy units.
+       The simulation time and potential energy units, and arrays with the
+       simulation time and the potential energy of each frame.
     """
 
-    global potentialEnergy_index, time_index
-
-    text = []
-    read = True
-    while read:  # the loop reads all lines which have # as a first word
-        position = filedescU.tell()
-        line = filedescU.readline()
-        if line == "":
-            raise EOFError("The file descriptor hit EOF.")
-        elif line.split()[0] == "#":
-            text.append(line)
-        else:
-            filedescU.seek(position)
-            read = False
-
-    timeUnit, potentialEnergyUnit = None, None
-
-    line_index = 0
-    for line in text:
-        ind = 0
-        try:
-            ind = line.find("potential{")
-            if ind != -1:
-                potentialEnergy_index = int(line_index)
-                line = line[ind + 10 :]
-                ind = line.find("}")
-                unit = line[:ind]
-                potentialEnergyUnit = unit
-        except ValueError:
-            pass
-        try:
-            ind = line.find("time{")
-            if ind != -1:
-                time_index = int(line_index)
-                line = line[ind + 5 :]
-                ind = line.find("}")
-                unit = line[:ind]
-                timeUnit = unit
-        except ValueError:
-            pass
-        line_index += 1
-
-    if timeUnit is None or potentialEnergyUnit is None:
+    try:
+        values, info = read_output(
+            filename, properties=["time", "potential"], squeeze=False
+        )
+    except ValueError:
+        values, info = None, None
+    if info is None or info["time"][0] is None or info["potential"][0] is None:
         print("Cannot read time and potential energy units")
         sys.exit(1)
 
-    return timeUnit, potentialEnergyUnit
-
-
-def read_U(filedesc):
-    """Takes a file which contains simulation time and potential energy information and
-       returns these data. Potential energy is transformed into internal units.
-
-    Args:
-       filedesc: An open readable file object.
-
-    Returns:
-       The simulation time and potential energy of the system.
-    """
-
-    line = filedesc.readline()
-    if line == "":
-        raise EOFError("The file descriptor hit EOF.")
-
-    line = line.strip()
-    line = line.split()
-    time = float(line[time_index])
-    U = float(line[potentialEnergy_index])
-    U = unit_to_internal("energy", potentialEnergyUnit, U)
+    timeUnit, potentialEnergyUnit = info["time"][0], info["potential"][0]
+    U = unit_to_internal("energy", potentialEnergyUnit, values["potential"][:, 0])
 
-    return time, U
+    return timeUnit, potentialEnergyUnit, values["time"][:, 0], U
 
 
 def main(*arg):
@@ -6,6 +6,7 @@ import argparse
 import numpy as np
 from ipi.inputs.simulation import InputSimulation
 from ipi.utils.io.inputs import io_xml
+from ipi.engine.motion.scphonons import load_samples
 
 
 # Disable
@@ -42,6 +43,8 @@ def get_A(path2iipi):
     # Obtains various parameters and relevant filenames.
     prefix = simul.outtemplate.prefix + "." + simul.syslist[0].motion.prefix
     max_iter = simul.syslist[0].motion.max_iter
+    max_steps = simul.syslist[0].motion.max_steps
+    dof = 3 * simul.syslist[0].beads.natoms
     batch_exp = simul.syslist[0].motion.batch_weight_exponent
     kbT = float(simul.syslist[0].ensemble.temp)
     beta = 1.0 / kbT
@@ -62,6 +65,9 @@ def get_A(path2iipi):
     x_list = []
     v_list = []
 
+    # Reads the samples of all the SCP iterations.
+    samples = load_samples(prefix + ".samples", dof)
+
     for i in range(max_iter):
         try:
             # Imports the q, iD, x, f from the i^th  SCP iteration.
@@ -80,10 +86,13 @@ def get_A(path2iipi):
             hw_list.append(np.loadtxt(prefix + ".w." + str(i))[nz:])
             # x  -> the samples drawn from the canonical density of the trial distribution.
             # v  -> the potential enegry of the samples.
-            x_list.append(np.loadtxt(prefix + ".x." + str(i)))
-            v_list.append(np.loadtxt(prefix + ".v." + str(i)))
+            x, v = samples[i][:2]
+            if len(v) < max_steps:
+                break
+            x_list.append(x)
+            v_list.append(v)
 
-        except IOError:
+        except (IOError, KeyError):
             break
 
     print("# Finished Import")
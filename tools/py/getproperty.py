@@ -11,52 +11,38 @@ Syntax:
    geproperty.py propertyfile propertyname [skip]
 """
 
-
 import sys
-import re
 from ipi.utils.messages import warning
+from ipi.scripting.parsing import _read_header
 
 
 def main(inputfile, propertyname="potential", skip="0"):
     skip = int(skip)
 
-    # opens & parses the input file
-    ifile = open(inputfile, "r")
-
-    reprop = re.compile(" ([0-9]*) *--> " + propertyname)
-    #    reunit = re.compile("{(.*)}")
-
-    # now reads the file one frame at a time, and outputs only the required column(s)
-    icol = -1
-    step = 0
-    while True:
-        try:
-            line = ifile.readline()
-            if len(line) == 0:
-                raise EOFError
-            while line[0] == "#":  # fast forward if line is a comment
-                rm = reprop.search(line)
-                if not (rm is None):
-                    if icol >= 0:
-                        warning(
-                            "Multiple instances of the specified property "
-                            + propertyname
-                            + " have been found"
-                        )
-                        raise EOFError
-                    icol = int(rm.group(1)) - 1
-                line = ifile.readline()
-                if len(line) == 0:
-                    raise EOFError
-            if icol < 0:
-                warning("Could not find " + propertyname + " in file " + inputfile)
-                raise EOFError
-            line = line.split()
-            if step >= skip:
-                print(line[icol])
-            step += 1
-        except EOFError:
-            break
+    with open(inputfile, "r") as ifile:
+        # parses the header, to find the (first) column of the property
+        header, line = _read_header(ifile)
+        icol = [prop[1] for prop in header if prop[0] == propertyname]
+        if len(icol) == 0:
+            warning("Could not find " + propertyname + " in file " + inputfile)
+            return
+        if len(icol) > 1:
+            warning(
+                "Multiple instances of the specified property "
+                + propertyname
+                + " have been found"
+            )
+            return
+        icol = icol[0]
+
+        # outputs the column as it is written in the file
+        step = 0
+        while line is not None:
+            if line.strip() != "" and line[0] != "#":
+                if step >= skip:
+                    print(line.split()[icol])
+                step += 1
+            line = next(ifile, None)
 
 
 if __name__ == "__main__":
@@ -29,10 +29,10 @@ import numpy as np
 import sys
 import glob
 import os
-import re
 
 from ipi.utils.units import unit_to_internal, unit_to_user, Constants
 from ipi.utils.io import read_file
+from ipi.scripting.parsing import read_output
 
 
 def potentialEnergy(prefix, temp, ss=0, unit=""):
@@ -83,15 +83,14 @@ def potentialEnergy(prefix, temp, ss=0, unit=""):
 
     # open input and output files
     ifor = [open(fn, "r") for fn in fns_for]
-    iU = open(fns_iU, "r")
     iE = open(fn_out_en, "w")
 
     # Some constants
     beta = 1.0 / (Constants.kb * temperature)
     const = Constants.hbar**2 * beta**2 / (24.0 * nbeads**3)
 
-    timeUnit, potentialEnergyUnit, potentialEnergy_index, time_index = extractUnits(
-        iU
+    timeUnit, potentialEnergyUnit, times, potentials = read_U(
+        fns_iU
     )  # extracting simulation time
     # and potential energy units
 
@@ -120,7 +119,9 @@ def potentialEnergy(prefix, temp, ss=0, unit=""):
                     m, natoms = ret["masses"], ret["natoms"]
                     f = np.zeros((nbeads, 3 * natoms))
                 f[i, :] = ret["data"]
-            U, time = read_U(iU, potentialEnergyUnit, potentialEnergy_index, time_index)
+            if ifr >= len(times):
+                raise EOFError
+            U, time = potentials[ifr], times[ifr]
         except EOFError:  # finished reading files
             sys.exit(0)
 
@@ -164,80 +165,33 @@ def potentialEnergy(prefix, temp, ss=0, unit=""):
             ifr += 1
 
 
-def extractUnits(filedescU):
-    """
-    Extracting potential energy and time step units.
-    Also this function looking for the simulation time
-    and potential energy position in the prefix.out
-    file. Thus, this file can contain any number of
-    output properties in arbitrary ordering.
+def read_U(filename):
+    """Reads the simulation time and the potential energy from the prefix.out
+    file, which can contain any number of output properties in arbitrary
+    ordering. Potential energy is transformed into internal units.
 
     Args:
-       filedesc: An open readable file object from a xyz formatted file.
+       filename: The name of the prefix.out file.
 
     Returns:
-       Simulation time and potential energy units.
+       The simulation time and potential energy units, and arrays with the
+       simulation time and the potential energy of each frame.
     """
 
-    text = []
-    read = True
-    while read:  # the loop reads all lines which have # as a first word
-        position = filedescU.tell()
-        line = filedescU.readline()
-        if line == "":
-            raise EOFError("The file descriptor hit EOF.")
-        elif line.split()[0] == "#":
-            text.append(line)
-        else:
-            filedescU.seek(position)
-            read = False
-
-    timeUnit, potentialEnergyUnit = None, None
-    potentialEnergy_index, time_index = 0, 0
-
-    potential_re = re.compile(r"potential\{[a-z]*\}")
-    time_re = re.compile(r"time\{[a-z]*\}")
-
-    line_index = 0
-    for line in text:
-        pot = potential_re.search(line)
-        time = time_re.search(line)
-        if pot is not None:
-            potentialEnergyUnit = pot.group()[:-1].split("{")[1]
-            potentialEnergy_index = line_index
-        if time is not None:
-            timeUnit = time.group()[:-1].split("{")[1]
-            time_index = line_index
-        line_index += 1
-
-    if timeUnit is None or potentialEnergyUnit is None:
+    try:
+        values, info = read_output(
+            filename, properties=["time", "potential"], squeeze=False
+        )
+    except ValueError:
+        values, info = None, None
+    if info is None or info["time"][0] is None or info["potential"][0] is None:
         print("Cannot read time and potential energy units")
         sys.exit(1)
 
-    return timeUnit, potentialEnergyUnit, potentialEnergy_index, time_index
-
-
-def read_U(filedesc, potentialEnergyUnit, potentialEnergy_index, time_index):
-    """Takes a file which contains simulation time and potential energy information and
-       returns these data. Potential energy is transformed into internal units.
-
-    Args:
-       filedesc: An open readable file object.
-
-    Returns:
-       The simulation time and potential energy of the system.
-    """
-
-    line = filedesc.readline()
-    if line == "":
-        raise EOFError("The file descriptor hit EOF.")
-
-    line = line.strip().split()
-    time = float(line[time_index])
-    U = float(line[potentialEnergy_index])
-    U = unit_to_internal("energy", potentialEnergyUnit, U)
+    timeUnit, potentialEnergyUnit = info["time"][0], info["potential"][0]
+    U = unit_to_internal("energy", potentialEnergyUnit, values["potential"][:, 0])
 
-    return U, time
+    return timeUnit, potentialEnergyUnit, values["time"][:, 0], U
 
 
 def main(*arg):